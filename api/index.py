@@ -1,16 +1,57 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 import logging
-from .middleware import log_requests
+from .middleware import admission_control, log_requests
+from .utils.background import background_queue
+from .utils.circuit import CircuitOpen
+from .utils.deadline import DeadlineExceeded
+from .utils.logging_setup import configure_logging
+from .utils.manifest_documents import manifest_publisher
+from .utils.pdf_ingest import ingest_queue
 from .routes.user import router as user_router
 from .routes.admin import router as admin_router
 
 
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger("api3")
 
-app = FastAPI()
 
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    yield
+    # Let queued post-response side effects finish before the worker exits;
+    # ingest first, since finished ingests schedule document rebuilds.
+    ingest_queue.drain()
+    manifest_publisher.flush()
+    background_queue.drain()
 
+
+app = FastAPI(lifespan=_lifespan)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def _deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    logger.info("Deadline exceeded for %s %s", request.method, request.url.path)
+    return JSONResponse(status_code=504, content={"detail": "Upstream timed out"})
+
+
+@app.exception_handler(CircuitOpen)
+async def _circuit_open(request: Request, exc: CircuitOpen):
+    logger.info("%s circuit open; rejecting %s %s", exc.name, request.method, request.url.path)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily unavailable"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.middleware("http")
+async def _admission_control(request: Request, call_next):
+    return await admission_control(request, call_next)
+
+
+# Registered last so it wraps admission control and logs shed requests too
 @app.middleware("http")
 async def _log_requests(request: Request, call_next):
     return await log_requests(request, call_next)
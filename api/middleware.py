@@ -1,17 +1,75 @@
 import logging
+import time
+import uuid
 from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from .utils.admission import Overloaded, admission_pools, classify_route
+from .utils.deadline import request_deadline
+from .utils.logging_setup import request_id_var
+from .utils.memory_diag import check_rss_watermark
+from .utils.profiler import requested_profile_token, run_profiled
 
 logger = logging.getLogger("api3")
 
 
 async def log_requests(request: Request, call_next):
-    """Simple request logging middleware."""
-    logger.info(f"{request.method} {request.url.path}")
+    """Request logging middleware.
+
+    Tags every log record written during the request with a request id
+    (the caller's `X-Request-ID` or Vercel's `X-Vercel-Id` if present), and
+    logs status and duration on completion.
+    """
+    request_id = (request.headers.get("x-request-id") or request.headers.get("x-vercel-id") or uuid.uuid4().hex)[:128]
+    token = request_id_var.set(request_id)
+    method, path = request.method, request.url.path
+    started = time.perf_counter()
+    logger.info("%s %s", method, path)
     try:
-        response = await call_next(request)
-        logger.info(f"-> {response.status_code} {request.method} {request.url.path}")
+        with request_deadline():
+            response = await call_next(request)
+        duration_ms = round((time.perf_counter() - started) * 1000.0, 2)
+        logger.info(
+            "-> %s %s %s",
+            response.status_code, method, path,
+            extra={"method": method, "path": path, "status": response.status_code, "duration_ms": duration_ms},
+        )
+        response.headers["X-Request-ID"] = request_id
+        check_rss_watermark()
         return response
     except Exception as e:
-        logger.exception(f"Unhandled error for {request.method} {request.url.path}: {e}")
+        duration_ms = round((time.perf_counter() - started) * 1000.0, 2)
+        logger.exception(
+            "Unhandled error for %s %s: %s",
+            method, path, e,
+            extra={"method": method, "path": path, "status": 500, "duration_ms": duration_ms},
+        )
         raise
+    finally:
+        request_id_var.reset(token)
+
 
+async def admission_control(request: Request, call_next):
+    """Run each request inside its route class's concurrency pool.
+
+    Requests beyond a pool's limit and wait queue get 503 + Retry-After
+    without touching the handler. Admitted requests that carry an admin
+    profiling token run under the profiler. This check lives here rather
+    than in its own middleware so that requests without a token pay
+    nothing extra.
+    """
+    route_class = classify_route(request.method, request.url.path, request.query_params.get("path") or "")
+    pool = admission_pools[route_class]
+    try:
+        async with pool.slot():
+            token = requested_profile_token(request)
+            if token:
+                return await run_profiled(request, call_next, token)
+            return await call_next(request)
+    except Overloaded as e:
+        logger.info("Shedding %s %s: %s", request.method, request.url.path, e)
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server busy, retry shortly"},
+            headers={"Retry-After": str(e.retry_after)},
+        )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class FormData(BaseModel):
@@ -34,7 +34,10 @@ class PdfAssetBase(BaseModel):
 
 
 class PdfAssetCreate(PdfAssetBase):
-    pass
+    # Set on rows for deduplicated uploads (see `/admin/upload-url`).
+    content_sha256: Optional[str] = None
+    storage_bucket: Optional[str] = None
+    storage_path: Optional[str] = None
 
 
 class PdfAssetUpdate(BaseModel):
@@ -56,3 +59,18 @@ class AdminPasswordResetRequest(BaseModel):
     reset_token: str
     new_password: str
 
+
+
+class UploadUrlBatchRequest(BaseModel):
+    module: str
+    lesson: Optional[str] = ""
+    filenames: List[str]
+    # Optional SHA-256 per filename, same order, for deduplication.
+    sha256: Optional[List[Optional[str]]] = None
+
+
+class UploadFinalizeRequest(BaseModel):
+    is_default: Optional[bool] = None
+    score_min: Optional[int] = None
+    score_max: Optional[int] = None
+    active: Optional[bool] = None
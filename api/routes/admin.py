@@ -1,35 +1,93 @@
 import logging
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Request, Form, Response
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 
 from ..models import (
     AdminLoginRequest,
     AdminPasswordResetRequest,
     PdfAssetCreate,
     PdfAssetUpdate,
+    UploadFinalizeRequest,
+    UploadUrlBatchRequest,
 )
 from ..utils.admin_auth import (
     SESSION_COOKIE,
     SESSION_TTL_SECONDS,
+    apply_admin_user_update,
     as_bool,
-    build_password_update_payload,
+    PROFILE_TTL_SECONDS,
+    create_profile_token,
     create_reset_token,
     create_session_token,
     decode_reset_payload,
     fetch_admin_user,
     hash_password,
     requires_password_change,
+    split_password_update_payload,
     update_admin_user,
     verify_password,
     verify_reset_token,
 )
-from ..utils.admin_checks import require_admin
-from ..utils.core_supabase import build_supabase_public, create_signed_upload_url
+from ..utils.admin_checks import derive_upload_path, require_admin
+from ..utils.admission import admission_pools
+from ..utils.background import background_queue
+from ..utils.cache import all_caches
+from ..utils.circuit import CircuitOpen, all_circuits, rest_circuit
+from ..utils.core_supabase import (
+    build_supabase_public,
+    create_service_client,
+    create_signed_upload_url,
+    create_signed_upload_urls,
+)
+from ..utils.common import client_ip
+from ..utils.content_store import deduplicated_upload, find_content, normalize_sha256, register_content
 from ..utils.crypto_utils import mask_email_for_log
+from ..utils.deadline import call_with_retry
+from ..utils.http_cache import conditional_json
+from ..utils.logging_setup import logging_stats
+from ..utils.login_limiter import login_limiter
+from ..utils.manifest_documents import manifest_publisher
+from ..utils.manifest_snapshot import snapshot_stats
+from ..utils.manifest_version import mark_manifest_changed
+from ..utils.memory_diag import (
+    cache_sizes,
+    diff_snapshots,
+    rss_stats,
+    set_tracing,
+    store_snapshot,
+    top_sites,
+    tracing_stats,
+)
+from ..utils.pdf_ingest import pdf_ingest_stats, schedule_ingest
+from ..utils.pdf_proxy import pdf_proxy_stats
+from ..utils.profiler import (
+    PROFILE_HEADER,
+    PROFILE_QUERY_PARAM,
+    list_profiles,
+    read_profile_dump,
+    render_profile,
+)
+from ..utils.resumable_upload import (
+    UploadSessionError,
+    create_upload_session,
+    finalize_upload,
+    load_upload_session,
+    upload_progress,
+)
+from ..utils.storage_reconcile import reconcile_storage_manifest
+from ..utils.user_content import manifest_etag
 
 router = APIRouter(prefix="/admin")
 logger = logging.getLogger("api3.routes.admin")
 
+UPLOAD_BATCH_MAX_FILES = 100
+UPLOAD_BATCH_WORKERS = 8
+# Admin listings sit behind a session cookie, so only the browser may keep
+# them and it must revalidate (cheaply, via ETag) on every use.
+ADMIN_PDFS_CACHE_CONTROL = "private, no-cache"
+
 
 @router.get("/me")
 async def admin_me(request: Request):
@@ -37,16 +95,127 @@ async def admin_me(request: Request):
     return {"email": email, "is_admin": True}
 
 
+@router.get("/metrics")
+async def admin_metrics(request: Request):
+    _ = require_admin(request)
+    return {
+        "background": background_queue.stats(),
+        "caches": {name: cache.stats() for name, cache in all_caches().items()},
+        "circuits": {name: circuit.stats() for name, circuit in all_circuits().items()},
+        "admission": {name: pool.stats() for name, pool in admission_pools.items()},
+        "login_limiter": login_limiter.stats(),
+        "logging": logging_stats(),
+        "manifest_snapshot": snapshot_stats(),
+        "manifest_documents": manifest_publisher.stats(),
+        "pdf_proxy": pdf_proxy_stats(),
+        "pdf_ingest": pdf_ingest_stats(),
+    }
+
+
+@router.get("/memory")
+async def admin_memory(request: Request):
+    """RSS, tracemalloc status and per-cache sizes for this worker."""
+    _ = require_admin(request)
+    return {"rss": rss_stats(), "tracemalloc": tracing_stats(), "caches": cache_sizes()}
+
+
+@router.post("/memory/tracing")
+async def admin_memory_tracing(request: Request, enabled: bool = True, frames: int = 1):
+    """Start (or with `enabled=false` stop) tracemalloc, keeping `frames` frames per allocation."""
+    _ = require_admin(request)
+    return set_tracing(enabled, frames)
+
+
+@router.post("/memory/snapshots")
+async def admin_memory_snapshot(request: Request, label: Optional[str] = None):
+    _ = require_admin(request)
+    try:
+        return await run_in_threadpool(store_snapshot, label)
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="tracemalloc is not running; POST /admin/memory/tracing first")
+
+
+@router.get("/memory/top")
+async def admin_memory_top(request: Request, limit: int = 20, group_by: str = "lineno"):
+    _ = require_admin(request)
+    try:
+        return {"sites": await run_in_threadpool(top_sites, limit, group_by)}
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="tracemalloc is not running; POST /admin/memory/tracing first")
+
+
+@router.get("/memory/diff")
+async def admin_memory_diff(request: Request, base: str, against: Optional[str] = None, limit: int = 20, group_by: str = "lineno"):
+    """Allocation growth from snapshot `base` to snapshot `against`, or to now."""
+    _ = require_admin(request)
+    try:
+        return await run_in_threadpool(diff_snapshots, base, against, limit, group_by)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="tracemalloc is not running; POST /admin/memory/tracing first")
+
+
+@router.post("/profile-token")
+async def admin_create_profile_token(request: Request):
+    """Mint a short-lived token that turns on profiling for requests carrying it."""
+    email = require_admin(request)
+    admin_row = fetch_admin_user(email) or {}
+    token = create_profile_token(email, str(admin_row.get("password_hash") or ""))
+    return {
+        "token": token,
+        "header": PROFILE_HEADER,
+        "query_param": PROFILE_QUERY_PARAM,
+        "expires_in": PROFILE_TTL_SECONDS,
+    }
+
+
+@router.get("/profiles")
+async def admin_list_profiles(request: Request):
+    _ = require_admin(request)
+    return {"items": list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+async def admin_get_profile(request: Request, profile_id: str, sort: str = "cumulative", limit: int = 50, format: str = "text"):
+    """Stored profile as a pstats text report, or the raw dump with `format=pstats`."""
+    _ = require_admin(request)
+    if format == "pstats":
+        data = read_profile_dump(profile_id)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return Response(
+            content=data,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+        )
+    report = render_profile(profile_id, sort=sort, limit=limit)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(report)
+
+
 @router.post("/login")
-async def admin_login(body: AdminLoginRequest, response: Response):
+async def admin_login(body: AdminLoginRequest, request: Request, response: Response):
     raw_email = (body.email or "").strip()
     password = (body.password or "").strip()
     if not raw_email or not password:
         raise HTTPException(status_code=400, detail="Email and password are required")
 
-    admin_row = fetch_admin_user(raw_email)
+    ip = client_ip(request)
+    retry_after = login_limiter.retry_after(raw_email, ip)
+    if retry_after:
+        logger.info("Admin login rate limited: %s", mask_email_for_log(raw_email))
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    admin_row = fetch_admin_user(raw_email, use_cache=False)
     if not admin_row:
-        logger.info(f"Admin login failed (no user): {mask_email_for_log(raw_email)}")
+        login_limiter.record_failure(raw_email, ip)
+        logger.info("Admin login failed (no user): %s", mask_email_for_log(raw_email))
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     email = admin_row.get("email") or raw_email
@@ -60,14 +229,17 @@ async def admin_login(body: AdminLoginRequest, response: Response):
         or admin_row.get("password_temp")
     )
 
-    matched, is_hashed = verify_password(password, stored_value)
+    # bcrypt runs off the event loop so cheap routes keep being served
+    matched, is_hashed = await run_in_threadpool(verify_password, password, stored_value)
     if not matched:
-        logger.info(f"Admin login failed (bad password): {mask_email_for_log(email)}")
+        login_limiter.record_failure(raw_email, ip)
+        logger.info("Admin login failed (bad password): %s", mask_email_for_log(email))
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    login_limiter.record_success(raw_email)
 
     if requires_password_change(admin_row, is_hashed):
         reset_token = create_reset_token(email, str(stored_value) if stored_value else None)
-        logger.info(f"Admin login requires password change: {mask_email_for_log(email)}")
+        logger.info("Admin login requires password change: %s", mask_email_for_log(email))
         return {
             "ok": True,
             "requires_password_change": True,
@@ -84,7 +256,7 @@ async def admin_login(body: AdminLoginRequest, response: Response):
         max_age=SESSION_TTL_SECONDS,
         path="/",
     )
-    logger.info(f"Admin login success: {mask_email_for_log(email)}")
+    logger.info("Admin login success: %s", mask_email_for_log(email))
     return {"ok": True, "requires_password_change": False, "email": email}
 
 
@@ -97,7 +269,7 @@ async def admin_update_password(body: AdminPasswordResetRequest, response: Respo
     if not email:
         raise HTTPException(status_code=400, detail="Invalid reset token")
 
-    admin_row = fetch_admin_user(email)
+    admin_row = fetch_admin_user(email, use_cache=False)
     if not admin_row:
         raise HTTPException(status_code=400, detail="Admin not found")
 
@@ -122,11 +294,13 @@ async def admin_update_password(body: AdminPasswordResetRequest, response: Respo
     if len(new_password) < 8:
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters")
 
-    new_hash = hash_password(new_password)
-    update_payload = build_password_update_payload(admin_row, new_hash)
+    new_hash = await run_in_threadpool(hash_password, new_password)
+    update_payload, deferred_payload = split_password_update_payload(admin_row, new_hash)
     updated = update_admin_user(email, update_payload)
     if not updated:
         raise HTTPException(status_code=500, detail="Failed to update password")
+    if deferred_payload:
+        background_queue.submit(apply_admin_user_update, email, deferred_payload)
 
     session_token = create_session_token(canonical_email, new_hash)
     response.set_cookie(
@@ -138,7 +312,7 @@ async def admin_update_password(body: AdminPasswordResetRequest, response: Respo
         max_age=SESSION_TTL_SECONDS,
         path="/",
     )
-    logger.info(f"Admin password updated: {mask_email_for_log(canonical_email)}")
+    logger.info("Admin password updated: %s", mask_email_for_log(canonical_email))
     return {"ok": True, "email": canonical_email}
 
 
@@ -161,9 +335,8 @@ async def admin_logout(response: Response):
 async def admin_list_pdfs(request: Request, module: Optional[str] = None, lesson: Optional[str] = None, limit: int = 50, offset: int = 0):
     _ = require_admin(request)
     try:
-        from supabase import create_client as _create_client
         _public, service_key, supabase_url = build_supabase_public()
-        admin = _create_client(supabase_url, service_key)
+        admin = create_service_client(supabase_url, service_key)
         q = (
             admin.table("pdf_assets")
             .select("id,module,lesson,path,is_default,score_min,score_max,active,created_at,updated_at")
@@ -181,11 +354,14 @@ async def admin_list_pdfs(request: Request, module: Optional[str] = None, lesson
             q = q.range(offset, offset + max(0, int(limit)) - 1)
         else:
             q = q.limit(max(1, min(int(limit or 50), 200)))
-        res = q.execute()
+        res = rest_circuit.call(call_with_retry, q.execute)
         items = getattr(res, "data", None) or []
-        return {"items": items}
+        etag = manifest_etag(items, module=module_filter, lesson=lesson_filter, limit=limit, offset=offset)
+        return conditional_json(request, etag, ADMIN_PDFS_CACHE_CONTROL, lambda: {"items": items})
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.info(f"admin_list_pdfs error: {e}")
+        logger.info("admin_list_pdfs error: %s", e)
         raise HTTPException(status_code=500, detail="Failed to list pdf_assets")
 
 
@@ -193,9 +369,8 @@ async def admin_list_pdfs(request: Request, module: Optional[str] = None, lesson
 async def admin_create_pdf(request: Request, body: PdfAssetCreate):
     _ = require_admin(request)
     try:
-        from supabase import create_client as _create_client
         _public, service_key, supabase_url = build_supabase_public()
-        admin = _create_client(supabase_url, service_key)
+        admin = create_service_client(supabase_url, service_key)
         payload = body.dict()
         module_value = (payload.get("module") or "").strip()
         path_value = (payload.get("path") or "").strip()
@@ -205,11 +380,42 @@ async def admin_create_pdf(request: Request, body: PdfAssetCreate):
         payload["module"] = module_value
         payload["path"] = path_value
         payload["lesson"] = (lesson_value or "").strip() or None
-        res = admin.table("pdf_assets").insert(payload).execute()
+        try:
+            digest = normalize_sha256(payload.pop("content_sha256", None))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        storage_bucket = (payload.pop("storage_bucket", None) or "").strip()
+        storage_path = (payload.pop("storage_path", None) or "").strip()
+        if bool(storage_bucket) != bool(storage_path):
+            raise HTTPException(status_code=400, detail="storage_bucket and storage_path go together")
+        if storage_bucket:
+            # A shared object must be the one the content index holds for this digest;
+            # anything else would let a row point at an arbitrary stored object.
+            if not digest:
+                raise HTTPException(status_code=400, detail="content_sha256 is required with storage_bucket")
+            entry = (await run_in_threadpool(find_content, [digest])).get(digest)
+            if entry is None or (entry["bucket"], entry["path"]) != (storage_bucket, storage_path):
+                raise HTTPException(status_code=400, detail="storage_bucket/storage_path do not match content_sha256")
+            # Only send the dedup columns when used, so older schemas keep working.
+            payload["content_sha256"] = digest
+            payload["storage_bucket"] = storage_bucket
+            payload["storage_path"] = storage_path
+        res = rest_circuit.call(admin.table("pdf_assets").insert(payload).execute)
+        mark_manifest_changed()
+        manifest_publisher.schedule(module_value)
         data = getattr(res, "data", None) or []
+        if digest and not storage_bucket:
+            # This row owns a fresh upload: once its bytes are hashed, the digest is
+            # recorded on the row and later copies of the same bytes can share it.
+            background_queue.submit(register_content, digest, module_value, path_value, [r.get("id") for r in data])
+        schedule_ingest([r.get("id") for r in data])
         return {"item": data[0] if data else None}
+    except HTTPException:
+        raise
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.info(f"admin_create_pdf error: {e}")
+        logger.info("admin_create_pdf error: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create pdf_asset")
 
 
@@ -217,9 +423,8 @@ async def admin_create_pdf(request: Request, body: PdfAssetCreate):
 async def admin_update_pdf(item_id: str, request: Request, body: PdfAssetUpdate):
     _ = require_admin(request)
     try:
-        from supabase import create_client as _create_client
         _public, service_key, supabase_url = build_supabase_public()
-        admin = _create_client(supabase_url, service_key)
+        admin = create_service_client(supabase_url, service_key)
         update = body.dict(exclude_unset=True)
         if not update:
             return {"item": None}
@@ -236,11 +441,27 @@ async def admin_update_pdf(item_id: str, request: Request, body: PdfAssetUpdate)
             if not update_path:
                 raise HTTPException(status_code=400, detail="path cannot be empty")
             update["path"] = update_path
-        res = admin.table("pdf_assets").update(update).eq("id", item_id).execute()
+        previous_modules = []
+        if "module" in update:
+            # Moving a row changes two modules' documents; look up the one it leaves.
+            prev = rest_circuit.call(admin.table("pdf_assets").select("module").eq("id", item_id).execute)
+            previous_modules = [r.get("module") for r in (getattr(prev, "data", None) or [])]
+        res = rest_circuit.call(admin.table("pdf_assets").update(update).eq("id", item_id).execute)
+        mark_manifest_changed()
         data = getattr(res, "data", None) or []
+        for module_name in {r.get("module") for r in data} | set(previous_modules):
+            manifest_publisher.schedule(module_name)
+        if "path" in update or "module" in update:
+            # The module names the bucket, so either may point the row at a
+            # different object: its metadata and thumbnail are stale.
+            schedule_ingest([r.get("id") for r in data], force=True)
         return {"item": data[0] if data else None}
+    except HTTPException:
+        raise
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.info(f"admin_update_pdf error: {e}")
+        logger.info("admin_update_pdf error: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update pdf_asset")
 
 
@@ -248,14 +469,18 @@ async def admin_update_pdf(item_id: str, request: Request, body: PdfAssetUpdate)
 async def admin_delete_pdf(item_id: str, request: Request):
     _ = require_admin(request)
     try:
-        from supabase import create_client as _create_client
         _public, service_key, supabase_url = build_supabase_public()
-        admin = _create_client(supabase_url, service_key)
-        res = admin.table("pdf_assets").delete().eq("id", item_id).execute()
+        admin = create_service_client(supabase_url, service_key)
+        res = rest_circuit.call(admin.table("pdf_assets").delete().eq("id", item_id).execute)
+        mark_manifest_changed()
         data = getattr(res, "data", None) or []
+        for module_name in {r.get("module") for r in data}:
+            manifest_publisher.schedule(module_name)
         return {"deleted": len(data)}
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.info(f"admin_delete_pdf error: {e}")
+        logger.info("admin_delete_pdf error: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete pdf_asset")
 
 
@@ -267,37 +492,166 @@ async def admin_create_upload_url(
     module: str = Form(...),
     lesson: str = Form(""),
     filename: str = Form(...),
+    resumable: bool = Form(False),
+    size: Optional[int] = Form(None),
+    sha256: str = Form(""),
 ):
     """Return a signed upload URL and token for direct browser upload.
 
     Client should perform a PUT to the returned signed_url with the file body.
+    With `resumable=true` and the file `size`, returns a resumable upload
+    session instead (see `/admin/uploads`). With the file's `sha256`, bytes
+    already in storage are not uploaded again: the response has
+    `deduplicated: true` and the shared object's `storage_bucket`/`storage_path`.
     """
-    _ = require_admin(request)
+    admin_email = require_admin(request)
     try:
         _public, service_key, supabase_url = build_supabase_public()
         module_name = (module or "").strip()
         if not module_name:
             raise HTTPException(status_code=400, detail="module is required")
-        safe_name = filename.split("/")[-1]
-        lp = (lesson or "").strip()
-        prefix = lp.strip("/ ")
-        final_path = ""
-        if prefix:
-            segments = prefix.split("/")
-            last_segment = segments[-1]
-            if "." in last_segment:
-                final_path = prefix
-            else:
-                final_path = "/".join(filter(None, [prefix, safe_name]))
-        else:
-            final_path = safe_name
-        final_path = final_path.lstrip("/")
-        info = create_signed_upload_url(supabase_url, service_key, module_name, final_path)
+        try:
+            digest = normalize_sha256(sha256)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        final_path = derive_upload_path(lesson, filename)
+        shared = await run_in_threadpool(deduplicated_upload, module_name, final_path, digest)
+        if shared:
+            return shared
+        if resumable:
+            return await run_in_threadpool(create_upload_session, admin_email, module_name, lesson, final_path, size, digest)
+        info = await run_in_threadpool(create_signed_upload_url, supabase_url, service_key, module_name, final_path)
         if not info:
             raise HTTPException(status_code=500, detail="Failed to create signed upload URL")
-        return {"module": module_name, "path": final_path, **info}
+        return {"module": module_name, "path": final_path, "deduplicated": False, "sha256": digest, **info}
     except HTTPException:
         raise
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.info(f"admin_create_upload_url error: {e}")
+        logger.info("admin_create_upload_url error: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create signed upload URL")
+
+
+@router.post("/upload-urls")
+async def admin_create_upload_urls(request: Request, body: UploadUrlBatchRequest):
+    """Return signed upload URLs for several files of one module/lesson at once.
+
+    Paths follow the same rules as `/admin/upload-url`; URLs are minted
+    concurrently so the browser can start all PUTs in parallel. `sha256`,
+    when given, lists each file's digest in `filenames` order; files whose
+    bytes are already stored come back `deduplicated` without an upload URL.
+    """
+    _ = require_admin(request)
+    module_name = (body.module or "").strip()
+    if not module_name:
+        raise HTTPException(status_code=400, detail="module is required")
+    digests = list(body.sha256 or [])
+    if digests and len(digests) != len(body.filenames or []):
+        raise HTTPException(status_code=400, detail="sha256 must list one digest per filename")
+    try:
+        files = [
+            ((f or "").strip(), normalize_sha256(digests[i]) if digests else None)
+            for i, f in enumerate(body.filenames or [])
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    files = [(name, digest) for name, digest in files if name]
+    if not files:
+        raise HTTPException(status_code=400, detail="filenames are required")
+    if len(files) > UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {UPLOAD_BATCH_MAX_FILES} files per batch")
+    try:
+        _public, service_key, supabase_url = build_supabase_public()
+        planned = [(name, derive_upload_path(body.lesson, name), digest) for name, digest in files]
+        counts = {}
+        for _name, path, _digest in planned:
+            counts[path] = counts.get(path, 0) + 1
+        stored = await run_in_threadpool(find_content, [digest for _name, _path, digest in planned if digest])
+        unique_paths = [p for p in counts if p and counts[p] == 1]
+        to_sign = [p for _name, p, digest in planned if p in unique_paths and digest not in stored]
+        minted = await run_in_threadpool(
+            create_signed_upload_urls, supabase_url, service_key, module_name, to_sign, UPLOAD_BATCH_WORKERS
+        )
+        items = []
+        for name, path, digest in planned:
+            info = minted.get(path)
+            shared = stored.get(digest) if digest else None
+            if not path:
+                items.append({"filename": name, "path": path, "error": "Invalid filename"})
+            elif counts[path] > 1:
+                items.append({"filename": name, "path": path, "error": "Multiple files resolve to the same path"})
+            elif shared:
+                items.append({
+                    "filename": name,
+                    "path": path,
+                    "deduplicated": True,
+                    "sha256": digest,
+                    "storage_bucket": shared["bucket"],
+                    "storage_path": shared["path"],
+                })
+            elif not info:
+                items.append({"filename": name, "path": path, "error": "Failed to create signed upload URL"})
+            else:
+                items.append({"filename": name, "path": path, "deduplicated": False, "sha256": digest, **info})
+        return {"module": module_name, "items": items}
+    except HTTPException:
+        raise
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.info("admin_create_upload_urls error: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to create signed upload URLs")
+
+
+@router.get("/uploads/{upload_id}")
+async def admin_upload_status(upload_id: str, request: Request):
+    """Bytes of a resumable upload that storage holds so far; resume from `offset`."""
+    _ = require_admin(request)
+    try:
+        session = load_upload_session(upload_id)
+        progress = await run_in_threadpool(upload_progress, session)
+        return {"module": session["module"], "path": session["path"], **progress}
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.info("admin_upload_status error: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to read upload status")
+
+
+@router.post("/uploads/{upload_id}/finalize")
+async def admin_finalize_upload(upload_id: str, request: Request, body: Optional[UploadFinalizeRequest] = None):
+    """Create the manifest row for a completed resumable upload."""
+    _ = require_admin(request)
+    try:
+        session = load_upload_session(upload_id)
+        fields = body.dict(exclude_unset=True) if body else {}
+        return await run_in_threadpool(finalize_upload, session, fields)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.info("admin_finalize_upload error: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to finalize upload")
+
+
+@router.post("/reconcile")
+async def admin_reconcile_storage(request: Request, module: Optional[str] = None, deactivate: bool = False):
+    """Report manifest rows without storage objects and objects without rows.
+
+    Pass `deactivate=true` to switch dangling rows off in the same call.
+    """
+    _ = require_admin(request)
+    try:
+        modules = [m for m in (module or "").split(",") if m.strip()] or None
+        return await run_in_threadpool(reconcile_storage_manifest, modules=modules, deactivate=deactivate)
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.info("admin_reconcile_storage error: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to reconcile storage")
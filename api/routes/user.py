@@ -1,6 +1,9 @@
+import json
 import logging
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from ..models import (
     AuthData,
@@ -9,12 +12,42 @@ from ..models import (
     AdminPasswordResetRequest,
     PdfAssetCreate,
     PdfAssetUpdate,
+    UploadFinalizeRequest,
+    UploadUrlBatchRequest,
+)
+from ..utils.core_supabase import (
+    build_supabase_public,
+    fetch_profile_admin_sdk,
+    is_duplicate_signup_error,
+    signup_response_is_duplicate,
+    upsert_profile_admin_sdk,
 )
-from ..utils.core_supabase import build_supabase_public, admin_get_user_by_email_rest, fetch_profile_admin_sdk
 from ..utils.admin_checks import handle_admin_upload, normalize_admin_path
+from ..utils.background import background_queue
+from ..utils.circuit import CircuitOpen, auth_circuit
+from ..utils.deadline import is_transient_error
 from ..utils.crypto_utils import decrypt_auth_payload, aesgcm_encrypt_profile, mask_email_for_log
-from ..utils.common import normalize_email
-from ..utils.user_content import fetch_pdfs_from_manifest
+from ..utils.common import client_ip, normalize_email
+from ..utils.content_store import object_location
+from ..utils.email_index import email_already_registered, email_index
+from ..utils.http_cache import conditional_json, etag_matches
+from ..utils.login_limiter import login_limiter
+from ..utils.pdf_ingest import PDF_THUMBNAIL_BUCKET
+from ..utils.pdf_proxy import ObjectNotFound, PdfFileResponse, cached_object, fill_cache, open_object_stream, stream_and_cache
+from ..utils.user_content import (
+    PDF_DOWNLOAD_BATCH_LIMIT,
+    PDF_DOWNLOAD_CACHE_CONTROL,
+    PDF_DOWNLOAD_MODE,
+    PDFS_CACHE_CONTROL,
+    manifest_etag,
+    manifest_rows_by_id,
+    query_manifest_rows,
+    sign_manifest_rows,
+    signed_url_for,
+    signed_urls_by_id,
+    signing_epoch,
+    unsigned_manifest_rows,
+)
 from .admin import (
     admin_login as _admin_login_handler,
     admin_update_password as _admin_update_password_handler,
@@ -23,11 +56,37 @@ from .admin import (
     admin_create_pdf as _admin_create_pdf,
     admin_update_pdf as _admin_update_pdf,
     admin_delete_pdf as _admin_delete_pdf,
+    admin_create_upload_urls as _admin_create_upload_urls,
+    admin_upload_status as _admin_upload_status,
+    admin_finalize_upload as _admin_finalize_upload,
+    admin_create_profile_token as _admin_create_profile_token,
+    admin_list_profiles as _admin_list_profiles,
+    admin_get_profile as _admin_get_profile,
+    admin_metrics as _admin_metrics,
+    admin_memory as _admin_memory,
+    admin_memory_tracing as _admin_memory_tracing,
+    admin_memory_snapshot as _admin_memory_snapshot,
+    admin_memory_top as _admin_memory_top,
+    admin_memory_diff as _admin_memory_diff,
+    admin_reconcile_storage as _admin_reconcile_storage,
 )
 
 router = APIRouter()
 logger = logging.getLogger("api3.routes.user")
 
+DUPLICATE_EMAIL_DETAIL = "Email already registered. Please log in instead."
+ADMIN_DIAGNOSTIC_PATHS = ("admin/profile-token", "admin/profiles", "admin/memory", "admin/metrics")
+
+
+def _reject_if_login_limited(email: Optional[str], ip: str) -> None:
+    retry_after = login_limiter.retry_after(email, ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(retry_after)},
+        )
+
 
 async def _proxy_admin_pdfs_request(target: str, request: Request):
     fragment = normalize_admin_path(target)
@@ -80,15 +139,93 @@ async def _proxy_admin_pdfs_request(target: str, request: Request):
     raise HTTPException(status_code=405, detail='Method not allowed for admin/pdfs')
 
 
+async def _proxy_admin_uploads_request(raw_target: str, request: Request):
+    # Upload ids are case-sensitive tokens, so split the raw path rather than
+    # the lowercased one from normalize_admin_path.
+    parts = [s for s in str(raw_target).replace('\\', '/').split('?', 1)[0].split('/') if s]
+    lowered = [s.lower() for s in parts]
+    start = next((i for i in range(len(lowered) - 1) if lowered[i:i + 2] == ['admin', 'uploads']), None)
+    rest = parts[start + 2:] if start is not None else []
+    method = request.method.upper()
+    if len(rest) == 1 and method == 'GET':
+        return await _admin_upload_status(rest[0], request)
+    if len(rest) == 2 and rest[1].lower() == 'finalize' and method == 'POST':
+        body = await request.body()
+        try:
+            data = UploadFinalizeRequest(**(json.loads(body) if body.strip() else {}))
+        except ValueError:
+            raise HTTPException(status_code=400, detail='Invalid JSON body')
+        return await _admin_finalize_upload(rest[0], request, data)
+    raise HTTPException(status_code=404, detail="Not found")
+
+
+async def _proxy_admin_diagnostics_request(target: str, request: Request):
+    parts = [segment for segment in normalize_admin_path(target).split('/') if segment]
+    method = request.method.upper()
+    if parts == ['admin', 'profile-token'] and method == 'POST':
+        return await _admin_create_profile_token(request)
+    if parts[:2] == ['admin', 'profiles'] and method == 'GET':
+        if len(parts) == 2:
+            return await _admin_list_profiles(request)
+        if len(parts) == 3:
+            try:
+                limit_val = int(request.query_params.get('limit', 50))
+            except Exception:
+                limit_val = 50
+            return await _admin_get_profile(
+                request,
+                profile_id=parts[2],
+                sort=request.query_params.get('sort') or 'cumulative',
+                limit=limit_val,
+                format=request.query_params.get('format') or 'text',
+            )
+    if parts == ['admin', 'metrics'] and method == 'GET':
+        return await _admin_metrics(request)
+    if parts[:2] == ['admin', 'memory']:
+        qp = request.query_params
+
+        def _int(name: str, default: int) -> int:
+            try:
+                return int(qp.get(name, default))
+            except Exception:
+                return default
+
+        sub = parts[2] if len(parts) == 3 else ''
+        if len(parts) == 2 and method == 'GET':
+            return await _admin_memory(request)
+        if sub == 'tracing' and method == 'POST':
+            enabled = (qp.get('enabled') or 'true').lower() in {'true', '1', 'yes', 'on'}
+            return await _admin_memory_tracing(request, enabled=enabled, frames=_int('frames', 1))
+        if sub == 'snapshots' and method == 'POST':
+            return await _admin_memory_snapshot(request, label=qp.get('label'))
+        if sub == 'top' and method == 'GET':
+            return await _admin_memory_top(request, limit=_int('limit', 20), group_by=qp.get('group_by') or 'lineno')
+        if sub == 'diff' and method == 'GET':
+            if not qp.get('base'):
+                raise HTTPException(status_code=400, detail="base is required")
+            return await _admin_memory_diff(
+                request,
+                base=qp.get('base'),
+                against=qp.get('against'),
+                limit=_int('limit', 20),
+                group_by=qp.get('group_by') or 'lineno',
+            )
+    raise HTTPException(status_code=404, detail="Not found")
+
+
 @router.get("/")
 async def root():
     return {"message": "FastAPI index3 root alive"}
 
 
 @router.post("/auth")
-async def auth(data: AuthData, response: Response):
+async def auth(data: AuthData, request: Request, response: Response):
     mode = (data.mode or "").lower().strip()
-    decrypted = decrypt_auth_payload(data.enc) if getattr(data, "enc", None) else None
+    ip = client_ip(request)
+    # Per-IP check first: a blocked client should not cost an RSA decrypt.
+    if mode == "login":
+        _reject_if_login_limited(None, ip)
+    decrypted = await run_in_threadpool(decrypt_auth_payload, data.enc) if getattr(data, "enc", None) else None
     if getattr(data, "enc", None) and decrypted is None:
         raise HTTPException(status_code=400, detail="Invalid encrypted payload")
     email = normalize_email((decrypted or {}).get("email") or (data.email or ""))
@@ -97,12 +234,14 @@ async def auth(data: AuthData, response: Response):
     last_name = (decrypted or {}).get("last_name") or data.last_name
     return_key_b64 = (decrypted or {}).get("rtk") or None
     try:
-        logger.info(f"Auth request: mode={mode}, email={mask_email_for_log(email)}")
+        logger.info("Auth request: mode=%s, email=%s", mode, mask_email_for_log(email))
     except Exception:
         pass
 
     if mode not in {"login", "signup"}:
         raise HTTPException(status_code=400, detail="Invalid mode. Use 'login' or 'signup'.")
+    if mode == "login":
+        _reject_if_login_limited(email, ip)
 
     try:
         public_client, service_key, supabase_url = build_supabase_public()
@@ -111,10 +250,16 @@ async def auth(data: AuthData, response: Response):
 
     try:
         if mode == "login":
-            res = public_client.auth.sign_in_with_password({
-                "email": email,
-                "password": password,
-            })
+            try:
+                res = auth_circuit.call(public_client.auth.sign_in_with_password, {
+                    "email": email,
+                    "password": password,
+                })
+            except Exception as e:
+                if not isinstance(e, CircuitOpen) and not is_transient_error(e):
+                    login_limiter.record_failure(email, ip)
+                raise
+            login_limiter.record_success(email)
             user = getattr(res, "user", None)
             session = getattr(res, "session", None)
             profile = None
@@ -123,7 +268,7 @@ async def auth(data: AuthData, response: Response):
                 uemail = getattr(user, "email", None) or (user.get("email") if isinstance(user, dict) else None)
                 profile = fetch_profile_admin_sdk(supabase_url, service_key, user_id=uid, email=uemail)
             except Exception as e:
-                logger.info(f"Profile enrichment skipped: {e}")
+                logger.info("Profile enrichment skipped: %s", e)
 
             user_meta_name = None
             meta_dict = {}
@@ -189,12 +334,6 @@ async def auth(data: AuthData, response: Response):
                 "message": "Login successful" if session else "Login response received",
             }
         else:
-            if service_key and admin_get_user_by_email_rest(supabase_url, service_key, email):
-                raise HTTPException(
-                    status_code=409,
-                    detail="Email already registered. Please log in instead.",
-                )
-
             if not (first_name and str(first_name).strip()) or not (last_name and str(last_name).strip()):
                 raise HTTPException(status_code=400, detail="first_name and last_name are required for signup")
 
@@ -206,32 +345,32 @@ async def auth(data: AuthData, response: Response):
             }
             payload["options"] = {"data": metadata}
 
-            res = public_client.auth.sign_up(payload)
-            user = getattr(res, "user", None)
-            session = getattr(res, "session", None)
+            # The local index answers most signups (new emails) without a network
+            # call; anything it misses is still caught from sign_up itself.
+            if email_already_registered(email):
+                raise HTTPException(status_code=409, detail=DUPLICATE_EMAIL_DETAIL)
             try:
-                if service_key and user:
-                    from supabase import create_client as _create_client
-                    admin_client = _create_client(supabase_url, service_key)
-                    uid = getattr(user, "id", None) or (user.get("id") if isinstance(user, dict) else None)
-                    profile_payload = {
-                        "id": uid,
-                        "first_name": str(first_name).strip(),
-                        "last_name": str(last_name).strip(),
-                        "full_name": (f"{str(first_name).strip()} {str(last_name).strip()}").strip(),
-                    }
-                    try:
-                        admin_client.table("profiles").upsert(profile_payload).execute()
-                    except Exception:
-                        try:
-                            admin_client.table("profiles").upsert({
-                                "id": uid,
-                                "full_name": profile_payload["full_name"],
-                            }).execute()
-                        except Exception as e2:
-                            logger.info(f"Profiles upsert failed: {e2}")
+                res = auth_circuit.call(public_client.auth.sign_up, payload)
             except Exception as e:
-                logger.info(f"Profiles creation skipped: {e}")
+                if is_duplicate_signup_error(e):
+                    email_index.add(email)
+                    raise HTTPException(status_code=409, detail=DUPLICATE_EMAIL_DETAIL)
+                raise
+            user = getattr(res, "user", None)
+            session = getattr(res, "session", None)
+            email_index.add(email)
+            if signup_response_is_duplicate(user):
+                raise HTTPException(status_code=409, detail=DUPLICATE_EMAIL_DETAIL)
+            if service_key and user:
+                uid = getattr(user, "id", None) or (user.get("id") if isinstance(user, dict) else None)
+                background_queue.submit(
+                    upsert_profile_admin_sdk,
+                    supabase_url,
+                    service_key,
+                    uid,
+                    metadata["first_name"],
+                    metadata["last_name"],
+                )
             return {
                 "mode": mode,
                 "user": {"id": getattr(user, "id", None), "email": getattr(user, "email", None)} if user else None,
@@ -242,6 +381,8 @@ async def auth(data: AuthData, response: Response):
                 } if session else None,
                 "message": "Signup initiated" if user else "Signup response received",
             }
+    except (HTTPException, CircuitOpen):
+        raise
     except Exception as e:
         msg = str(e)
         raise HTTPException(status_code=409, detail=msg)
@@ -257,18 +398,29 @@ async def auth_root(request: Request, response: Response):
     if qp == "admin/upload-url":
         # Handle admin signed upload URL creation here to avoid JSON parsing
         return await handle_admin_upload(request)
+    if qp == "admin/upload-urls":
+        body = await request.json()
+        data = UploadUrlBatchRequest(**body)
+        return await _admin_create_upload_urls(request, data)
     if qp == "admin/login":
         body = await request.json()
         data = AdminLoginRequest(**body)
-        return await _admin_login_handler(data, response)
+        return await _admin_login_handler(data, request, response)
     if qp == "admin/password":
         body = await request.json()
         data = AdminPasswordResetRequest(**body)
         return await _admin_update_password_handler(data, response)
     if qp == "admin/logout":
         return await _admin_logout_handler(response)
+    if qp == "admin/reconcile":
+        deactivate = (request.query_params.get("deactivate") or "").lower() in {"true", "1", "yes", "on"}
+        return await _admin_reconcile_storage(request, module=request.query_params.get("module"), deactivate=deactivate)
     if qp.startswith("admin/pdfs"):
         return await _proxy_admin_pdfs_request(qp, request)
+    if qp.startswith(ADMIN_DIAGNOSTIC_PATHS):
+        return await _proxy_admin_diagnostics_request(qp, request)
+    if qp.startswith("admin/uploads/"):
+        return await _proxy_admin_uploads_request(request.query_params.get("path"), request)
     if qp.startswith("admin"):
         raise HTTPException(status_code=404, detail="Not found")
 
@@ -278,46 +430,7 @@ async def auth_root(request: Request, response: Response):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
     data = AuthData(**body)
-    return await auth(data, response)
-
-
-@router.post("/{_path:path}")
-async def auth_any_path(_path: str, request: Request, response: Response):
-    normalized_path = normalize_admin_path(_path)
-    qp_normalized = normalize_admin_path(request.query_params.get("path"))
-    if normalized_path == "admin/upload-url" or qp_normalized == "admin/upload-url":
-        return await handle_admin_upload(request)
-    if normalized_path == "admin/login" or qp_normalized == "admin/login":
-        body = await request.json()
-        data = AdminLoginRequest(**body)
-        return await _admin_login_handler(data, response)
-    if normalized_path == "admin/password" or qp_normalized == "admin/password":
-        body = await request.json()
-        data = AdminPasswordResetRequest(**body)
-        return await _admin_update_password_handler(data, response)
-    if normalized_path == "admin/logout" or qp_normalized == "admin/logout":
-        return await _admin_logout_handler(response)
-    if normalized_path.startswith("admin/pdfs") or qp_normalized.startswith("admin/pdfs"):
-        target = qp_normalized if qp_normalized.startswith("admin/pdfs") else normalized_path
-        return await _proxy_admin_pdfs_request(target, request)
-    if normalized_path.startswith("admin") or qp_normalized.startswith("admin"):
-        raise HTTPException(status_code=404, detail="Not found")
-    try:
-        body = await request.json()
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid JSON body")
-    data = AuthData(**body)
-    return await auth(data, response)
-
-
-@router.get("/{_path:path}")
-async def get_any_path(_path: str, request: Request):
-    normalized_path = normalize_admin_path(_path)
-    qp_normalized = normalize_admin_path(request.query_params.get("path"))
-    if normalized_path.startswith("admin/pdfs") or qp_normalized.startswith("admin/pdfs"):
-        target = qp_normalized if qp_normalized.startswith("admin/pdfs") else normalized_path
-        return await _proxy_admin_pdfs_request(target, request)
-    return {"route": _path or "/", "message": "FastAPI index3 alive"}
+    return await auth(data, request, response)
 
 
 @router.post("/profile")
@@ -327,7 +440,7 @@ async def get_profile(req: ProfileReq, request: Request):
         if not token:
             raise HTTPException(status_code=401, detail="Not authenticated")
         public_client, service_key, supabase_url = build_supabase_public()
-        user_res = public_client.auth.get_user(token)
+        user_res = auth_circuit.call(public_client.auth.get_user, token)
         user = getattr(user_res, "user", None)
         if not user:
             raise HTTPException(status_code=401, detail="Invalid session")
@@ -358,24 +471,241 @@ async def get_profile(req: ProfileReq, request: Request):
         if not enc_blob:
             raise HTTPException(status_code=400, detail="Encryption unavailable")
         return {"enc_profile": enc_blob["enc_profile"], "iv": enc_blob["iv"], "alg": enc_blob.get("alg", "AES-GCM")}
-    except HTTPException:
+    except (HTTPException, CircuitOpen):
         raise
     except Exception as e:
-        logger.info(f"/profile error: {e}")
+        logger.info("/profile error: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch profile")
 
 
+def _pdfs_listing(
+    if_none_match: Optional[str],
+    module: str,
+    lesson: Optional[str],
+    score: Optional[int],
+    limit: int,
+    sign: bool,
+) -> Tuple[str, Optional[dict]]:
+    """ETag and body for `/pdfs`; the body is None when the client already has it."""
+    rows = query_manifest_rows(module=module, lesson=lesson, score=score, limit=limit)
+    if not sign:
+        # Metadata only: clients follow `download_url` for the PDFs they open.
+        etag = manifest_etag(rows, module=module, lesson=lesson, score=score, limit=limit, sign=False)
+        if etag_matches(if_none_match, etag):
+            return etag, None
+        return etag, {"items": unsigned_manifest_rows(rows, module=module)}
+    # Signed bodies go stale with their URLs, so the validator rolls over with them.
+    etag = manifest_etag(rows, module=module, lesson=lesson, score=score, limit=limit, epoch=signing_epoch())
+    if etag_matches(if_none_match, etag):
+        return etag, None
+    return etag, {"items": sign_manifest_rows(rows, module=module)}
+
+
 @router.get("/pdfs")
-async def list_pdfs(module: str, lesson: Optional[str] = None, score: Optional[int] = None, limit: int = 10):
+async def list_pdfs(
+    request: Request,
+    module: str,
+    lesson: Optional[str] = None,
+    score: Optional[int] = None,
+    limit: int = 10,
+    sign: bool = True,
+):
+    module = (module or "").strip()
     if not module:
         raise HTTPException(status_code=400, detail="module is required")
     try:
         limit = max(1, min(int(limit or 10), 100))
     except Exception:
         limit = 10
+    lesson = (lesson or "").strip() or None
     try:
-        items = fetch_pdfs_from_manifest(module=module, lesson=lesson, score=score, limit=limit)
-        return {"items": items}
+        etag, payload = await run_in_threadpool(
+            _pdfs_listing,
+            request.headers.get("if-none-match"),
+            module=module,
+            lesson=lesson,
+            score=score,
+            limit=limit,
+            sign=sign,
+        )
+        return conditional_json(request, etag, PDFS_CACHE_CONTROL, lambda: payload)
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.info(f"/pdfs manifest error: {e}")
+        logger.info("/pdfs manifest error: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch PDFs from manifest")
+
+
+@router.get("/pdfs/download")
+async def download_pdfs_batch(ids: str):
+    wanted = [i.strip() for i in (ids or "").split(",") if i.strip()]
+    if not wanted:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(wanted) > PDF_DOWNLOAD_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {PDF_DOWNLOAD_BATCH_LIMIT} ids per request")
+    try:
+        items = await run_in_threadpool(signed_urls_by_id, wanted)
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.info("/pdfs/download error: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to sign PDF URLs")
+    return {"items": items}
+
+
+async def _pdf_row(item_id: str) -> dict:
+    row = (await run_in_threadpool(manifest_rows_by_id, [item_id])).get(item_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="PDF not found")
+    return row
+
+
+async def _pdf_content_response(row: dict, request: Request) -> Response:
+    """Serve a PDF's bytes: from the local disk cache, else streamed from storage while caching."""
+    bucket, path = object_location(row)
+    filename = row["path"].rsplit("/", 1)[-1]
+    headers = {"Cache-Control": PDF_DOWNLOAD_CACHE_CONTROL}
+    byte_range = request.headers.get("range")
+    local, etag = await run_in_threadpool(cached_object, bucket, path)
+    if etag:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+    if local is None and byte_range:
+        # PDF viewers fetch by range; cache the whole object first so the
+        # next range is served from disk. Objects too large to cache, and
+        # ranges arriving while another request fills the cache, fall
+        # through to a ranged storage GET below.
+        local, etag = await run_in_threadpool(fill_cache, bucket, path, etag)
+        if etag:
+            headers["ETag"] = etag
+    if local is not None:
+        return PdfFileResponse(
+            local, headers=headers, media_type="application/pdf", filename=filename, content_disposition_type="inline"
+        )
+    client, resp = await run_in_threadpool(open_object_stream, bucket, path, byte_range)
+    for name in ("Content-Length", "Content-Range", "Accept-Ranges", "ETag"):
+        if resp.headers.get(name):
+            headers[name] = resp.headers[name]
+    headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    if resp.status_code == 206:
+        # Too large to cache: storage answered the range itself.
+        def _relay():
+            try:
+                yield from resp.iter_bytes()
+            finally:
+                resp.close()
+                client.close()
+
+        return StreamingResponse(_relay(), status_code=206, media_type="application/pdf", headers=headers)
+    return StreamingResponse(stream_and_cache(bucket, path, client, resp), media_type="application/pdf", headers=headers)
+
+
+@router.get("/pdfs/{item_id}/content")
+async def pdf_content(item_id: str, request: Request):
+    item_id = (item_id or "").strip()
+    try:
+        return await _pdf_content_response(await _pdf_row(item_id), request)
+    except (HTTPException, CircuitOpen):
+        raise
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="PDF not found")
+    except Exception as e:
+        logger.info("/pdfs/%s/content error: %s", item_id, e)
+        raise HTTPException(status_code=500, detail="Failed to fetch PDF")
+
+
+@router.get("/pdfs/{item_id}/download")
+async def download_pdf(item_id: str, request: Request):
+    if PDF_DOWNLOAD_MODE == "proxy":
+        return await pdf_content(item_id, request)
+    item_id = (item_id or "").strip()
+    try:
+        row = await _pdf_row(item_id)
+        url = await run_in_threadpool(signed_url_for, *object_location(row))
+    except (HTTPException, CircuitOpen):
+        raise
+    except Exception as e:
+        logger.info("/pdfs/%s/download error: %s", item_id, e)
+        raise HTTPException(status_code=500, detail="Failed to sign PDF URL")
+    if not url:
+        raise HTTPException(status_code=500, detail="Failed to sign PDF URL")
+    return RedirectResponse(url, status_code=302, headers={"Cache-Control": PDF_DOWNLOAD_CACHE_CONTROL})
+
+
+@router.get("/pdfs/{item_id}/thumbnail")
+async def pdf_thumbnail(item_id: str):
+    """Redirect to a signed URL for the first-page PNG made at ingest; 404 until there is one."""
+    item_id = (item_id or "").strip()
+    try:
+        row = await _pdf_row(item_id)
+        if not row.get("thumbnail_path"):
+            raise HTTPException(status_code=404, detail="Thumbnail not found")
+        url = await run_in_threadpool(signed_url_for, PDF_THUMBNAIL_BUCKET, row["thumbnail_path"])
+    except (HTTPException, CircuitOpen):
+        raise
+    except Exception as e:
+        logger.info("/pdfs/%s/thumbnail error: %s", item_id, e)
+        raise HTTPException(status_code=500, detail="Failed to sign thumbnail URL")
+    if not url:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    return RedirectResponse(url, status_code=302, headers={"Cache-Control": PDF_DOWNLOAD_CACHE_CONTROL})
+
+
+# Catch-alls stay last so the concrete routes above are matched first.
+@router.post("/{_path:path}")
+async def auth_any_path(_path: str, request: Request, response: Response):
+    normalized_path = normalize_admin_path(_path)
+    qp_normalized = normalize_admin_path(request.query_params.get("path"))
+    if normalized_path == "admin/upload-url" or qp_normalized == "admin/upload-url":
+        return await handle_admin_upload(request)
+    if normalized_path == "admin/upload-urls" or qp_normalized == "admin/upload-urls":
+        body = await request.json()
+        data = UploadUrlBatchRequest(**body)
+        return await _admin_create_upload_urls(request, data)
+    if normalized_path == "admin/login" or qp_normalized == "admin/login":
+        body = await request.json()
+        data = AdminLoginRequest(**body)
+        return await _admin_login_handler(data, request, response)
+    if normalized_path == "admin/password" or qp_normalized == "admin/password":
+        body = await request.json()
+        data = AdminPasswordResetRequest(**body)
+        return await _admin_update_password_handler(data, response)
+    if normalized_path == "admin/logout" or qp_normalized == "admin/logout":
+        return await _admin_logout_handler(response)
+    if normalized_path == "admin/reconcile" or qp_normalized == "admin/reconcile":
+        deactivate = (request.query_params.get("deactivate") or "").lower() in {"true", "1", "yes", "on"}
+        return await _admin_reconcile_storage(request, module=request.query_params.get("module"), deactivate=deactivate)
+    if normalized_path.startswith("admin/pdfs") or qp_normalized.startswith("admin/pdfs"):
+        target = qp_normalized if qp_normalized.startswith("admin/pdfs") else normalized_path
+        return await _proxy_admin_pdfs_request(target, request)
+    if normalized_path.startswith(ADMIN_DIAGNOSTIC_PATHS) or qp_normalized.startswith(ADMIN_DIAGNOSTIC_PATHS):
+        target = qp_normalized if qp_normalized.startswith(ADMIN_DIAGNOSTIC_PATHS) else normalized_path
+        return await _proxy_admin_diagnostics_request(target, request)
+    if normalized_path.startswith("admin/uploads/") or qp_normalized.startswith("admin/uploads/"):
+        raw = request.query_params.get("path") if qp_normalized.startswith("admin/uploads/") else _path
+        return await _proxy_admin_uploads_request(raw, request)
+    if normalized_path.startswith("admin") or qp_normalized.startswith("admin"):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        body = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    data = AuthData(**body)
+    return await auth(data, request, response)
+
+
+@router.get("/{_path:path}")
+async def get_any_path(_path: str, request: Request):
+    normalized_path = normalize_admin_path(_path)
+    qp_normalized = normalize_admin_path(request.query_params.get("path"))
+    if normalized_path.startswith("admin/pdfs") or qp_normalized.startswith("admin/pdfs"):
+        target = qp_normalized if qp_normalized.startswith("admin/pdfs") else normalized_path
+        return await _proxy_admin_pdfs_request(target, request)
+    if normalized_path.startswith(ADMIN_DIAGNOSTIC_PATHS) or qp_normalized.startswith(ADMIN_DIAGNOSTIC_PATHS):
+        target = qp_normalized if qp_normalized.startswith(ADMIN_DIAGNOSTIC_PATHS) else normalized_path
+        return await _proxy_admin_diagnostics_request(target, request)
+    if normalized_path.startswith("admin/uploads/") or qp_normalized.startswith("admin/uploads/"):
+        raw = request.query_params.get("path") if qp_normalized.startswith("admin/uploads/") else _path
+        return await _proxy_admin_uploads_request(raw, request)
+    return {"route": _path or "/", "message": "FastAPI index3 alive"}
@@ -13,7 +13,6 @@ from .crypto_utils import (
 )
 from .core_supabase import (
     build_supabase_public,
-    admin_get_user_by_email_rest,
     fetch_profile_admin_sdk,
     create_signed_storage_url,
 )
@@ -25,7 +24,6 @@ __all__ = [
     "aesgcm_encrypt_profile",
     "mask_email_for_log",
     "build_supabase_public",
-    "admin_get_user_by_email_rest",
     "fetch_profile_admin_sdk",
     "create_signed_storage_url",
 ]
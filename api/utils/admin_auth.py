@@ -14,13 +14,24 @@ try:
 except Exception:  # pragma: no cover - optional dependency guard
     bcrypt = None  # type: ignore
 
-from .core_supabase import build_supabase_public
+from .cache import TTLCache
+from .common import normalize_email
+from .core_supabase import build_supabase_public, create_service_client
+from .circuit import CircuitOpen, rest_circuit
+from .deadline import call_with_retry
 
 logger = logging.getLogger("api3.admin_auth")
 
 SESSION_COOKIE = "admin_session"
 SESSION_TTL_SECONDS = 60 * 60 * 12  # 12 hours
 RESET_TTL_SECONDS = 60 * 10  # 10 minutes
+PROFILE_TTL_SECONDS = 60 * 15  # 15 minutes
+ADMIN_ROW_CACHE_SECONDS = float(os.getenv("ADMIN_ROW_CACHE_SECONDS") or 30)
+
+# Every admin request re-reads its admin_users row; found rows are kept briefly.
+# Rows carry `password_hash` (sessions are signed with it), so they stay in
+# process and never reach a shared CACHE_BACKEND.
+admin_row_cache = TTLCache("admin_rows", ttl_seconds=ADMIN_ROW_CACHE_SECONDS, max_entries=256, backend="memory")
 
 
 def _get_secret() -> bytes:
@@ -46,13 +57,16 @@ def _sign(body: str, password_hash: Optional[str], purpose: str) -> str:
     return _b64url(digest)
 
 
-def _generate_token(email: str, password_hash: Optional[str], ttl_seconds: int, purpose: str) -> str:
-    payload = {
+def _generate_token(
+    email: str, password_hash: Optional[str], ttl_seconds: int, purpose: str, claims: Optional[Dict[str, Any]] = None
+) -> str:
+    payload = dict(claims or {})
+    payload.update({
         "email": email,
         "exp": int(time.time()) + ttl_seconds,
         "nonce": secrets.token_urlsafe(12),
         "purpose": purpose,
-    }
+    })
     body_bytes = json.dumps(payload, separators=(",", ":")).encode("utf-8")
     body = _b64url(body_bytes)
     signature = _sign(body, password_hash, purpose)
@@ -66,7 +80,7 @@ def _decode_payload(token: str) -> Optional[Dict[str, Any]]:
         if isinstance(data, dict):
             return data
     except Exception as exc:
-        logger.info(f"Failed to decode admin token payload: {exc}")
+        logger.info("Failed to decode admin token payload: %s", exc)
     return None
 
 
@@ -126,6 +140,30 @@ def verify_reset_token(token: str, password_hash: Optional[str]) -> Optional[Dic
     return _verify_token(token, password_hash, "reset")
 
 
+def create_profile_token(email: str, password_hash: str) -> str:
+    return _generate_token(email, password_hash, PROFILE_TTL_SECONDS, "profile")
+
+
+def decode_profile_payload(token: str) -> Optional[Dict[str, Any]]:
+    payload = _decode_payload(token)
+    if payload and payload.get("purpose") == "profile":
+        return payload
+    return None
+
+
+def verify_profile_token(token: str, password_hash: str) -> Optional[Dict[str, Any]]:
+    return _verify_token(token, password_hash, "profile")
+
+
+def create_upload_token(email: str, session: Dict[str, Any], ttl_seconds: int) -> str:
+    """Self-contained resumable upload session; not tied to the password, so it survives a re-login."""
+    return _generate_token(email, None, ttl_seconds, "upload", claims=session)
+
+
+def verify_upload_token(token: str) -> Optional[Dict[str, Any]]:
+    return _verify_token(token, None, "upload")
+
+
 def hash_password(password: str) -> str:
     if bcrypt is None:
         raise RuntimeError("bcrypt library not installed. Install via 'pip install bcrypt'.")
@@ -189,19 +227,31 @@ def requires_password_change(row: Dict[str, Any], password_is_hashed: bool) -> b
 
 
 def build_admin_client():
-    try:
-        from supabase import create_client as _create_client
-    except Exception as exc:
-        raise RuntimeError("Supabase client not installed") from exc
-
     public_client, service_key, supabase_url = build_supabase_public()
     if not service_key:
         raise RuntimeError("Supabase service role key required for admin operations")
-    client = _create_client(supabase_url, service_key)
+    client = create_service_client(supabase_url, service_key)
     return client
 
 
-def fetch_admin_user(email: str) -> Optional[Dict[str, Any]]:
+def fetch_admin_user(email: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """Look up an admin row by email, trying exact, lowercased and case-insensitive matches.
+
+    Found rows are cached for ADMIN_ROW_CACHE_SECONDS. Pass `use_cache=False`
+    where a stale row would wrongly reject a credential, e.g. at login.
+    """
+    cache_key = normalize_email(email)
+    if use_cache and cache_key:
+        cached = admin_row_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    row = _query_admin_user(email)
+    if row and cache_key:
+        admin_row_cache.set(cache_key, row)
+    return row
+
+
+def _query_admin_user(email: str) -> Optional[Dict[str, Any]]:
     try:
         client = build_admin_client()
         attempts = []
@@ -217,28 +267,33 @@ def fetch_admin_user(email: str) -> Optional[Dict[str, Any]]:
                 query = query.eq("email", value)
             else:
                 query = query.ilike("email", value)
-            res = query.execute()
+            res = rest_circuit.call(call_with_retry, query.execute)
             data = getattr(res, "data", None)
             if isinstance(data, list) and data:
                 return data[0]
             if isinstance(data, dict) and data:
                 return data
+    except CircuitOpen:
+        # Fail fast instead of reporting "no such admin" while the DB is down.
+        raise
     except Exception as exc:
-        logger.info(f"fetch_admin_user failed for {email}: {exc}")
+        logger.info("fetch_admin_user failed for %s: %s", email, exc)
     return None
 
 
 def update_admin_user(email: str, updates: Dict[str, Any]) -> bool:
     try:
         client = build_admin_client()
-        res = client.table("admin_users").update(updates).eq("email", email).execute()
+        res = rest_circuit.call(client.table("admin_users").update(updates).eq("email", email).execute)
         data = getattr(res, "data", None)
         if data is None:
             return True
         return bool(data)
     except Exception as exc:
-        logger.info(f"update_admin_user failed for {email}: {exc}")
+        logger.info("update_admin_user failed for %s: %s", email, exc)
         return False
+    finally:
+        admin_row_cache.delete(normalize_email(email))
 
 
 def build_password_update_payload(row: Dict[str, Any], new_password_hash: str) -> Dict[str, Any]:
@@ -254,3 +309,21 @@ def build_password_update_payload(row: Dict[str, Any], new_password_hash: str) -
     if "password_temp" in row:
         payload["password_temp"] = None
     return payload
+
+
+def split_password_update_payload(row: Dict[str, Any], new_password_hash: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split a password update into (critical, deferrable) column sets.
+
+    Timestamp refreshes can run after the response, but only where the row
+    already has a value: an empty timestamp makes `requires_password_change`
+    return True, so clearing it must land before the new session is used.
+    """
+    payload = build_password_update_payload(row, new_password_hash)
+    deferred = {key: payload.pop(key) for key in RESET_TIMESTAMP_FIELDS if key in payload and row.get(key)}
+    return payload, deferred
+
+
+def apply_admin_user_update(email: str, updates: Dict[str, Any]) -> None:
+    """`update_admin_user` for background use: raises so the queue can retry."""
+    if not update_admin_user(email, updates):
+        raise RuntimeError("admin_users update failed")
@@ -1,20 +1,31 @@
 import logging
 from typing import Optional, Dict
 from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 
 from .admin_auth import (
     SESSION_COOKIE,
     as_bool,
+    decode_profile_payload,
     decode_session_payload,
     fetch_admin_user,
     requires_password_change,
+    verify_profile_token,
     verify_session_token,
 )
+from .circuit import CircuitOpen
+from .content_store import deduplicated_upload, normalize_sha256
 from .core_supabase import build_supabase_public, create_signed_upload_url
+from .resumable_upload import UploadSessionError, create_upload_session
 
 logger = logging.getLogger("api3.admin_checks")
 
 
+def _token_matches(admin_row: Dict, token: str, verify) -> bool:
+    stored_hash = admin_row.get("password_hash")
+    return bool(stored_hash and verify(token, str(stored_hash)))
+
+
 def require_admin(request: Request) -> str:
     """Ensure the current session user is an active admin.
 
@@ -30,6 +41,9 @@ def require_admin(request: Request) -> str:
         raise HTTPException(status_code=401, detail="Invalid session")
 
     admin_row = fetch_admin_user(email)
+    if admin_row and not _token_matches(admin_row, token, verify_session_token):
+        # The cached row may predate a password change made on another worker.
+        admin_row = fetch_admin_user(email, use_cache=False)
     if not admin_row:
         raise HTTPException(status_code=401, detail="Admin not found")
 
@@ -50,6 +64,33 @@ def require_admin(request: Request) -> str:
     return email
 
 
+def admin_for_profile_token(token: str) -> Optional[str]:
+    """Return the admin email a profiling token was minted for, or None.
+
+    Applies the same checks as `require_admin`, so disabling the admin or
+    changing their password revokes outstanding tokens.
+    """
+    payload = decode_profile_payload(token)
+    email = (payload or {}).get("email")
+    if not email:
+        return None
+    admin_row = fetch_admin_user(email)
+    if admin_row and not _token_matches(admin_row, token, verify_profile_token):
+        admin_row = fetch_admin_user(email, use_cache=False)
+    if not admin_row:
+        return None
+    if "active" in admin_row and not as_bool(admin_row.get("active")):
+        return None
+    stored_hash = admin_row.get("password_hash")
+    if not stored_hash or not str(stored_hash).startswith("$2"):
+        return None
+    if not verify_profile_token(token, str(stored_hash)):
+        return None
+    if requires_password_change(admin_row, True):
+        return None
+    return email
+
+
 def normalize_admin_path(value: Optional[str]) -> str:
     """Normalize admin path fragments for routing checks.
 
@@ -72,35 +113,66 @@ def normalize_admin_path(value: Optional[str]) -> str:
     return '/'.join(parts).lower()
 
 
+def derive_upload_path(lesson: Optional[str], filename: str) -> str:
+    """Build the storage object path for an uploaded file.
+
+    The lesson acts as a folder prefix unless its last segment already looks
+    like a filename, in which case it is used as the full object path.
+    """
+    safe_name = (filename or "").split("/")[-1]
+    prefix = (lesson or "").strip().strip("/ ")
+    if prefix:
+        segments = prefix.split("/")
+        last_segment = segments[-1]
+        if "." in last_segment:
+            final_path = prefix
+        else:
+            final_path = "/".join(filter(None, [prefix, safe_name]))
+    else:
+        final_path = safe_name
+    return final_path.lstrip("/")
+
+
 async def handle_admin_upload(request: Request) -> Dict[str, str]:
-    """Validate admin permissions and return a signed upload URL payload."""
+    """Validate admin permissions and return a signed upload URL payload.
+
+    With `resumable=true` and `size`, returns a resumable upload session instead.
+    With `sha256`, already stored bytes come back `deduplicated` (no upload needed).
+    """
     try:
-        require_admin(request)
+        email = require_admin(request)
         form = await request.form()
         module = (form.get("module") or "").strip()
         lesson = (form.get("lesson") or "").strip()
         filename = (form.get("filename") or "").strip()
         if not module or not filename:
             raise HTTPException(status_code=400, detail="module and filename are required")
-        safe_name = filename.split("/")[-1]
-        prefix = lesson.strip("/ ")
-        if prefix:
-            segments = prefix.split("/")
-            last_segment = segments[-1]
-            if "." in last_segment:
-                final_path = prefix
-            else:
-                final_path = "/".join(filter(None, [prefix, safe_name]))
-        else:
-            final_path = safe_name
-        final_path = final_path.lstrip("/")
+        try:
+            digest = normalize_sha256(form.get("sha256"))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        final_path = derive_upload_path(lesson, filename)
+        shared = await run_in_threadpool(deduplicated_upload, module, final_path, digest)
+        if shared:
+            return shared
+        if as_bool(form.get("resumable")):
+            try:
+                size = int(form.get("size") or 0)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="size must be an integer")
+            try:
+                return await run_in_threadpool(create_upload_session, email, module, lesson, final_path, size, digest)
+            except UploadSessionError as e:
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
         _public, service_key, supabase_url = build_supabase_public()
-        info = create_signed_upload_url(supabase_url, service_key, module, final_path)
+        info = await run_in_threadpool(create_signed_upload_url, supabase_url, service_key, module, final_path)
         if not info:
             raise HTTPException(status_code=500, detail="Failed to create signed upload URL")
-        return {"module": module, "path": final_path, **info}
+        return {"module": module, "path": final_path, "deduplicated": False, "sha256": digest, **info}
     except HTTPException:
         raise
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.info(f"admin/upload-url error: {e}")
+        logger.info("admin/upload-url error: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create signed upload URL")
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+CRYPTO = "crypto"
+UPSTREAM = "upstream"
+CHEAP = "cheap"
+
+CRYPTO_PATHS = ("auth", "admin/login", "admin/password")
+UPSTREAM_PREFIXES = ("profile", "admin/pdfs", "admin/upload-url", "admin/uploads", "admin/reconcile")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name) or default)
+
+
+class Overloaded(Exception):
+    """Raised when a route class is at capacity and its wait queue is full."""
+
+    def __init__(self, route_class: str, retry_after: int):
+        super().__init__(f"{route_class} pool overloaded")
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """Concurrency limit for one route class, with a short bounded wait queue.
+
+    Up to `limit` requests run at once; up to `max_waiting` more wait for a
+    slot. Anything beyond that is rejected immediately with Overloaded, so
+    a burst sheds load instead of growing latency without bound.
+    """
+
+    def __init__(self, name: str, limit: int, max_waiting: int, retry_after: int = 1):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_waiting = max(0, max_waiting)
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.active >= self.limit and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after)
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "max_waiting": self.max_waiting,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+admission_pools = {
+    CRYPTO: AdmissionPool(
+        CRYPTO,
+        _env_int("ADMISSION_CRYPTO_LIMIT", 2),
+        _env_int("ADMISSION_CRYPTO_QUEUE", 4),
+        retry_after=2,
+    ),
+    UPSTREAM: AdmissionPool(
+        UPSTREAM,
+        _env_int("ADMISSION_UPSTREAM_LIMIT", 8),
+        _env_int("ADMISSION_UPSTREAM_QUEUE", 16),
+    ),
+    CHEAP: AdmissionPool(
+        CHEAP,
+        _env_int("ADMISSION_CHEAP_LIMIT", 32),
+        _env_int("ADMISSION_CHEAP_QUEUE", 64),
+    ),
+}
+
+
+def classify_route(method: str, path: str, rewrite_path: str = "") -> str:
+    """Map a request to its route class.
+
+    `rewrite_path` is the `?path=` query param Vercel rewrites use, which
+    takes precedence over the URL path when present. Only `/auth` (RSA
+    decrypt) and the bcrypt admin login/password handlers are CRYPTO. The
+    POST catch-all hands any other non-admin path to `/auth`, so those count
+    as CRYPTO too; other admin POSTs are UPSTREAM or CHEAP.
+    """
+    target = (rewrite_path or path or "").strip("/").lower()
+    for prefix in ("api/index", "api"):
+        if target == prefix or target.startswith(prefix + "/"):
+            target = target[len(prefix):].lstrip("/")
+            break
+    if target.startswith(UPSTREAM_PREFIXES):
+        return UPSTREAM
+    if method == "POST" and (target in CRYPTO_PATHS or not target.startswith("admin")):
+        return CRYPTO
+    return CHEAP
@@ -0,0 +1,135 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("api3.background")
+
+
+class BackgroundQueue:
+    """Bounded in-process queue for side effects the client need not wait for.
+
+    Tasks run on a small pool of daemon worker threads started on first use.
+    A task that raises is retried with exponential backoff up to `max_retries`
+    times. When the queue is full, `submit` drops the task and returns False
+    rather than blocking the request. `drain` stops intake and waits for
+    queued work, and it is wired to app shutdown and interpreter exit.
+    """
+
+    def __init__(self, name: str, maxsize: int = 256, workers: int = 2, max_retries: int = 2, retry_backoff: float = 0.5):
+        self.name = name
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._in_flight = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "retried": 0, "dropped": 0}
+        self.last_error: Optional[str] = None
+
+    def _bump(self, key: str, delta: int = 1) -> None:
+        with self._stats_lock:
+            self._counters[key] += delta
+
+    def _ensure_workers(self) -> None:
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._work, name=f"{self.name}-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> bool:
+        """Enqueue `fn(*args, **kwargs)`; returns False if the task was dropped."""
+        if self._closed:
+            self._bump("dropped")
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((fn, args, kwargs))
+        except queue.Full:
+            self._bump("dropped")
+            logger.info("Background queue %s full; dropped %s", self.name, getattr(fn, '__name__', fn))
+            return False
+        self._bump("submitted")
+        return True
+
+    def _run(self, fn, args, kwargs) -> None:
+        attempt = 0
+        while True:
+            try:
+                fn(*args, **kwargs)
+                self._bump("completed")
+                return
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self._bump("failed")
+                    self.last_error = f"{getattr(fn, '__name__', fn)}: {e}"
+                    logger.info("Background task %s failed: %s", getattr(fn, '__name__', fn), e)
+                    return
+                self._bump("retried")
+                time.sleep(self.retry_backoff * (2 ** attempt))
+                attempt += 1
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            with self._stats_lock:
+                self._in_flight += 1
+            try:
+                self._run(*item)
+            finally:
+                with self._stats_lock:
+                    self._in_flight -= 1
+                self._queue.task_done()
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Stop accepting work and wait up to `timeout` seconds for the backlog.
+
+        Returns True if everything queued finished in time.
+        """
+        self._closed = True
+        if not self._threads:
+            return True
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._stats_lock:
+                busy = self._in_flight
+            if self._queue.unfinished_tasks == 0 and busy == 0:
+                break
+            time.sleep(0.05)
+        finished = self._queue.unfinished_tasks == 0
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        if not finished:
+            logger.info("Background queue %s drained with %s task(s) left", self.name, self._queue.qsize())
+        return finished
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            data = dict(self._counters)
+            data["in_flight"] = self._in_flight
+        data["depth"] = self._queue.qsize()
+        data["capacity"] = self._queue.maxsize
+        data["workers"] = len(self._threads)
+        data["closed"] = self._closed
+        data["last_error"] = self.last_error
+        return data
+
+
+background_queue = BackgroundQueue("side-effects")
+atexit.register(background_queue.drain)
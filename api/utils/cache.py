@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .cache_backends import MISSING, make_backend
+
+logger = logging.getLogger("api3.cache")
+
+ERROR_LOG_INTERVAL_SECONDS = 30.0
+
+
+class TTLCache:
+    """Small thread-safe cache with per-entry expiry and a bounded size.
+
+    Storage is delegated to the backend selected by CACHE_BACKEND:
+    - `memory` (default): a per-process LRU.
+    - `sqlite`: a file shared by the workers on one host.
+    - `redis`: any Redis-protocol server.
+
+    Pass `backend="memory"` to pin a cache to the process, for example when
+    it must keep working while the shared store is unreachable. Backend
+    errors count as misses and are logged at most every 30 s per cache, so
+    a cache outage degrades to uncached reads.
+
+    Every instance registers itself by name so invalidation hooks and
+    diagnostics can reach all caches without importing each owner module.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = 1024, backend: Optional[str] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._backend = make_backend(backend, name, max_entries)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._error_logged_at = 0.0
+        _REGISTRY[name] = self
+
+    @property
+    def backend(self) -> str:
+        return self._backend.name
+
+    def _failed(self, op: str, exc: Exception) -> None:
+        with self._stats_lock:
+            self.errors += 1
+            now = time.monotonic()
+            if now - self._error_logged_at < ERROR_LOG_INTERVAL_SECONDS:
+                return
+            self._error_logged_at = now
+        logger.info("Cache %s %s failed on %s backend: %s", self.name, op, self._backend.name, exc)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self._backend.get(key)
+        except Exception as e:
+            self._failed("get", e)
+            value = MISSING
+        with self._stats_lock:
+            if value is MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        try:
+            self._backend.set(key, value, ttl)
+        except Exception as e:
+            self._failed("set", e)
+
+    def delete(self, key: Hashable) -> None:
+        try:
+            self._backend.delete(key)
+        except Exception as e:
+            self._failed("delete", e)
+
+    def clear(self) -> None:
+        try:
+            self._backend.clear()
+        except Exception as e:
+            self._failed("clear", e)
+
+    def __len__(self) -> int:
+        try:
+            return self._backend.count() or 0
+        except Exception:
+            return 0
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Copy of the (key, value) pairs held in process; empty for shared backends."""
+        return self._backend.items()
+
+    def stored_bytes(self) -> Optional[int]:
+        """Bytes held by a shared backend, where it can tell; None otherwise."""
+        try:
+            return self._backend.stored_bytes()
+        except Exception:
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            entries = self._backend.count()
+        except Exception:
+            entries = None
+        return {
+            "backend": self._backend.name,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+_REGISTRY: Dict[str, TTLCache] = {}
+
+
+def get_cache(name: str) -> Optional[TTLCache]:
+    return _REGISTRY.get(name)
+
+
+def all_caches() -> Dict[str, TTLCache]:
+    return dict(_REGISTRY)
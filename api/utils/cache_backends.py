@@ -0,0 +1,342 @@
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from .circuit import cache_circuit
+
+CACHE_BACKEND = (os.getenv("CACHE_BACKEND") or "memory").lower()
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "api3-cache.sqlite3"
+)
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL") or "redis://127.0.0.1:6379/0"
+CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv("CACHE_REDIS_TIMEOUT_SECONDS") or 0.25)
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX") or "api3:"
+
+MISSING = object()
+
+
+def encode_key(key: Hashable) -> str:
+    """Stable text form of a cache key; tuples of str/int/None are the common case."""
+    if isinstance(key, str):
+        return key
+    return json.dumps(key, separators=(",", ":"), default=str)
+
+
+def encode_value(value: Any) -> bytes:
+    # JSON rather than pickle: shared stores must never be able to run code in the worker.
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def decode_value(data: bytes) -> Any:
+    return json.loads(data)
+
+
+class MemoryBackend:
+    """Per-process LRU with expiry. Values are stored as-is, not serialized."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self, namespace: str, max_entries: int):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is MISSING:
+                return MISSING
+            if entry[0] <= now:
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def count(self) -> Optional[int]:
+        return len(self._data)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        with self._lock:
+            return [(key, entry[1]) for key, entry in self._data.items()]
+
+    def stored_bytes(self) -> Optional[int]:
+        return None
+
+
+class SQLiteBackend:
+    """Cache table in a SQLite file shared by every worker on the host.
+
+    The default path is under /dev/shm, so the file lives in shared memory
+    where available. One connection per thread, WAL mode, no fsync: a lost
+    cache is only a cold cache.
+    """
+
+    name = "sqlite"
+    shared = True
+    PRUNE_EVERY = 64
+
+    _local = threading.local()
+
+    def __init__(self, namespace: str, max_entries: int, path: str = CACHE_SQLITE_PATH):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.path = path
+        self._writes = 0
+        # Small caches prune more often so they overshoot their bound by less.
+        self._prune_every = max(1, min(self.PRUNE_EVERY, max_entries // 8))
+
+    def _conn(self) -> sqlite3.Connection:
+        conns: Dict[str, sqlite3.Connection] = getattr(self._local, "conns", None) or {}
+        self._local.conns = conns
+        conn = conns.get(self.path)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " ns TEXT NOT NULL, k TEXT NOT NULL, v BLOB NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (ns, k)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (ns, expires_at)")
+            try:
+                os.chmod(self.path, 0o600)
+            except OSError:
+                pass
+            conns[self.path] = conn
+        return conn
+
+    def get(self, key: Hashable) -> Any:
+        row = self._conn().execute(
+            "SELECT v FROM cache WHERE ns = ? AND k = ? AND expires_at > ?",
+            (self.namespace, encode_key(key), time.time()),
+        ).fetchone()
+        return MISSING if row is None else decode_value(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (ns, k, v, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, encode_key(key), encode_value(value), time.time() + ttl_seconds),
+        )
+        self._writes += 1
+        if self._writes % self._prune_every == 0:
+            self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache WHERE ns = ? AND expires_at <= ?", (self.namespace, time.time()))
+        excess = (self.count() or 0) - self.max_entries
+        if excess > 0:
+            # Soonest-expiring first: the closest SQL gets to LRU without per-read writes.
+            conn.execute(
+                "DELETE FROM cache WHERE ns = ? AND k IN"
+                " (SELECT k FROM cache WHERE ns = ? ORDER BY expires_at LIMIT ?)",
+                (self.namespace, self.namespace, excess),
+            )
+
+    def delete(self, key: Hashable) -> None:
+        self._conn().execute("DELETE FROM cache WHERE ns = ? AND k = ?", (self.namespace, encode_key(key)))
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache WHERE ns = ?", (self.namespace,))
+
+    def count(self) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM cache WHERE ns = ? AND expires_at > ?", (self.namespace, time.time())
+        ).fetchone()
+        return int(row[0])
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        return []
+
+    def stored_bytes(self) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT COALESCE(SUM(LENGTH(k) + LENGTH(v)), 0) FROM cache WHERE ns = ?", (self.namespace,)
+        ).fetchone()
+        return int(row[0])
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RespClient:
+    """Minimal blocking RESP2 client, one socket per thread.
+
+    Covers the handful of commands the cache needs, so Redis, Valkey,
+    KeyDB or scripts/redis_standin.py work without an extra dependency.
+    """
+
+    def __init__(self, url: str = CACHE_REDIS_URL, timeout: float = CACHE_REDIS_TIMEOUT_SECONDS):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int((parsed.path or "/0").strip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        self._local.conn = conn
+        if self.password:
+            self.execute("AUTH", self.password)
+        if self.db:
+            self.execute("SELECT", self.db)
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def execute(self, *args) -> Any:
+        conn = getattr(self._local, "conn", None) or self._connect()
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            conn[0].sendall(b"".join(parts))
+            return self._read(conn[1])
+        except RespError:
+            raise
+        except Exception:
+            # Unknown stream position after a timeout or reset: start fresh next time.
+            self.close()
+            raise
+
+    def _read(self, reader) -> Any:
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            raise RespError(rest.decode("utf-8"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = reader.read(size + 2)
+            return data[:-2]
+        if kind == b"*":
+            size = int(rest)
+            if size < 0:
+                return None
+            return [self._read(reader) for _ in range(size)]
+        raise RespError(f"Unexpected reply type {kind!r}")
+
+
+_redis_client: Optional[RespClient] = None
+_redis_lock = threading.Lock()
+
+
+def redis_client() -> RespClient:
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = RespClient()
+    return _redis_client
+
+
+class RedisBackend:
+    """Keys `<CACHE_KEY_PREFIX><namespace>:<key>` in a Redis-protocol server, expired with PX.
+
+    Size bounds are left to the server's maxmemory policy; `max_entries`
+    is informational only.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, namespace: str, max_entries: int, client: Optional[RespClient] = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.client = client or redis_client()
+        self.prefix = f"{CACHE_KEY_PREFIX}{namespace}:"
+
+    def _key(self, key: Hashable) -> str:
+        return self.prefix + encode_key(key)
+
+    def _call(self, *args) -> Any:
+        return cache_circuit.call(self.client.execute, *args)
+
+    def get(self, key: Hashable) -> Any:
+        data = self._call("GET", self._key(key))
+        return MISSING if data is None else decode_value(data)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        self._call("SET", self._key(key), encode_value(value), "PX", max(1, int(ttl_seconds * 1000)))
+
+    def delete(self, key: Hashable) -> None:
+        self._call("DEL", self._key(key))
+
+    def _scan(self):
+        cursor = "0"
+        while True:
+            cursor, keys = self._call("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+            yield keys
+            if cursor == "0":
+                return
+
+    def clear(self) -> None:
+        for keys in self._scan():
+            if keys:
+                self._call("DEL", *keys)
+
+    def count(self) -> Optional[int]:
+        return sum(len(keys) for keys in self._scan())
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        return []
+
+    def stored_bytes(self) -> Optional[int]:
+        return None
+
+
+BACKENDS = {"memory": MemoryBackend, "sqlite": SQLiteBackend, "redis": RedisBackend}
+
+
+def make_backend(kind: Optional[str], namespace: str, max_entries: int):
+    cls = BACKENDS.get((kind or CACHE_BACKEND).lower())
+    if cls is None:
+        raise ValueError(f"Unknown cache backend {kind or CACHE_BACKEND!r}; expected one of {', '.join(BACKENDS)}")
+    return cls(namespace, max_entries)
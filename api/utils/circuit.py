@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .deadline import DeadlineExceeded, is_transient_error
+
+logger = logging.getLogger("api3.circuit")
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD") or 5)
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS") or 30)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit open")
+        self.name = name
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class CircuitBreaker:
+    """Per-dependency breaker: closed -> open after consecutive failures -> half-open probe.
+
+    Only transient failures (timeouts, connection errors, 429/5xx) count, so
+    a bad password or a missing column never trips it. While open, calls
+    raise CircuitOpen immediately. After `reset_seconds` a single probe is let
+    through; its success closes the circuit and its failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS,
+        is_failure: Callable[[BaseException], bool] = is_transient_error,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def _before_call(self) -> bool:
+        """Admit or reject a call; returns True if the call is the half-open probe."""
+        with self._lock:
+            self._counters["calls"] += 1
+            if self._state == CLOSED:
+                return False
+            waited = time.monotonic() - self._opened_at
+            if waited >= self.reset_seconds and not self._probing:
+                self._state = HALF_OPEN
+                self._probing = True
+                return True
+            self._counters["rejected"] += 1
+            retry_after = self.reset_seconds - waited if waited < self.reset_seconds else 1
+        raise CircuitOpen(self.name, retry_after)
+
+    def _on_success(self, probe: bool) -> None:
+        with self._lock:
+            if probe:
+                self._probing = False
+                logger.info("Circuit %s closed after successful probe", self.name)
+            self._state = CLOSED
+            self._failures = 0
+
+    def _on_failure(self, probe: bool, exc: Exception) -> None:
+        with self._lock:
+            if probe:
+                self._probing = False
+            if isinstance(exc, DeadlineExceeded):
+                # The caller ran out of time; says nothing about the dependency.
+                return
+            if not self.is_failure(exc):
+                if probe:
+                    # The dependency answered; it is up even if the call was bad.
+                    self._state = CLOSED
+                    self._failures = 0
+                return
+            self._counters["failures"] += 1
+            self._failures += 1
+            self.last_error = str(exc) or exc.__class__.__name__
+            if probe or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._counters["opened"] += 1
+                    logger.info("Circuit %s opened: %s", self.name, self.last_error)
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        probe = self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._on_failure(probe, e)
+            raise
+        self._on_success(probe)
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            data = dict(self._counters)
+            data["consecutive_failures"] = self._failures
+            opened_for = time.monotonic() - self._opened_at if self._state != CLOSED else 0.0
+        data["state"] = state
+        data["open_for_seconds"] = round(opened_for, 1)
+        data["last_error"] = self.last_error
+        return data
+
+
+auth_circuit = CircuitBreaker("auth")
+rest_circuit = CircuitBreaker("rest")
+storage_circuit = CircuitBreaker("storage")
+# Shared cache backend (redis): trips fast so an unreachable cache costs
+# one connect timeout every few seconds rather than one per lookup.
+cache_circuit = CircuitBreaker("cache", failure_threshold=3, reset_seconds=10)
+
+_CIRCUITS = {c.name: c for c in (auth_circuit, rest_circuit, storage_circuit, cache_circuit)}
+
+
+def all_circuits() -> Dict[str, CircuitBreaker]:
+    return dict(_CIRCUITS)
@@ -4,3 +4,13 @@ def normalize_email(email: str) -> str:
     except Exception:
         return email
 
+
+
+def client_ip(request) -> str:
+    """Best-effort caller IP: first `X-Forwarded-For` hop (set by Vercel), else the socket peer."""
+    forwarded = request.headers.get("x-forwarded-for") or ""
+    first = forwarded.split(",", 1)[0].strip()
+    if first:
+        return first
+    client = getattr(request, "client", None)
+    return getattr(client, "host", None) or ""
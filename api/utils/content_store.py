@@ -0,0 +1,282 @@
+import hashlib
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .circuit import CircuitOpen, rest_circuit
+from .core_supabase import build_supabase_public, create_service_client
+from .deadline import call_with_retry, is_transient_error, propagate_deadline
+from .manifest_documents import manifest_publisher
+from .manifest_version import mark_manifest_changed
+from .pdf_proxy import PDF_PROXY_CHUNK_BYTES, ObjectNotFound, head_object, open_object_stream
+
+logger = logging.getLogger("api3.content_store")
+
+CONTENT_TABLE = "content_objects"
+CONTENT_LOOKUP_WORKERS = 8
+# After the index table turns out to be missing, uploads skip deduplication this long.
+CONTENT_INDEX_RETRY_SECONDS = 300
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_index_state = {"retry_at": 0.0}
+
+
+def normalize_sha256(value: Optional[str]) -> Optional[str]:
+    """Lowercase hex digest, or None when `value` is empty; ValueError when it is malformed."""
+    digest = (value or "").strip().lower()
+    if not digest:
+        return None
+    if not _SHA256_RE.match(digest):
+        raise ValueError("sha256 must be 64 hex characters")
+    return digest
+
+
+def object_location(row: Dict[str, Any]) -> Tuple[str, str]:
+    """`(bucket, path)` of the object behind a manifest row.
+
+    Deduplicated rows name the shared object in `storage_bucket` /
+    `storage_path`; all others keep it at `path` in the module's bucket.
+    """
+    return row.get("storage_bucket") or row.get("module"), row.get("storage_path") or row.get("path")
+
+
+def _service_client():
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key:
+        raise RuntimeError("Supabase service role key required for the content index")
+    return create_service_client(supabase_url, service_key)
+
+
+def _index_available() -> bool:
+    return time.monotonic() >= _index_state["retry_at"]
+
+
+def _index_failed(e: Exception) -> None:
+    """Deduplication is an optimisation: log and let the upload go ahead."""
+    logger.info("%s unavailable, skipping deduplication: %s", CONTENT_TABLE, e)
+    if not isinstance(e, CircuitOpen) and not is_transient_error(e):
+        # Table not created yet: behave as if nothing is indexed for a while.
+        _index_state["retry_at"] = time.monotonic() + CONTENT_INDEX_RETRY_SECONDS
+
+
+def _object_present(entry: Dict[str, Any]) -> Optional[bool]:
+    """Whether the indexed object is still stored at its size; None when storage cannot tell."""
+    try:
+        headers = head_object(entry["bucket"], entry["path"])
+    except ObjectNotFound:
+        return False
+    except Exception as e:
+        logger.info("Content check for %s/%s failed: %s", entry["bucket"], entry["path"], e)
+        return None
+    size = entry.get("size")
+    length = headers.get("content-length")
+    return size is None or length is None or int(length) == int(size)
+
+
+def find_content(hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Index entries for `hashes` whose object is still stored, keyed by digest.
+
+    One query for the whole batch; each hit is confirmed with a HEAD (in
+    parallel) so an upload is never skipped in favour of a deleted object.
+    Entries whose object is gone or changed size are dropped from the index.
+    """
+    wanted = sorted({h for h in hashes if h})
+    if not wanted or not _index_available():
+        return {}
+    admin = _service_client()
+    try:
+        res = rest_circuit.call(
+            call_with_retry,
+            admin.table(CONTENT_TABLE).select("sha256,bucket,path,size").in_("sha256", wanted).execute,
+        )
+    except Exception as e:
+        _index_failed(e)
+        return {}
+    entries = getattr(res, "data", None) or []
+    if not entries:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(CONTENT_LOOKUP_WORKERS, len(entries))) as pool:
+        present = list(pool.map(propagate_deadline(_object_present), entries))
+    found: Dict[str, Dict[str, Any]] = {}
+    for entry, ok in zip(entries, present):
+        if ok:
+            found[entry["sha256"]] = entry
+        elif ok is False:
+            logger.info("Content index entry %s points at missing %s/%s", entry["sha256"], entry["bucket"], entry["path"])
+            forget_content([entry["sha256"]], admin)
+    return found
+
+
+def deduplicated_upload(module: str, path: str, sha256: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Upload-URL response for bytes that are already stored, or None when they must be uploaded.
+
+    The client skips the upload and creates its `pdf_assets` row with the
+    returned `storage_bucket` / `storage_path` and `content_sha256`.
+    """
+    if not sha256:
+        return None
+    entry = find_content([sha256]).get(sha256)
+    if entry is None:
+        return None
+    return {
+        "module": module,
+        "path": path,
+        "deduplicated": True,
+        "sha256": sha256,
+        "storage_bucket": entry["bucket"],
+        "storage_path": entry["path"],
+    }
+
+
+def register_content(sha256: str, bucket: str, path: str, row_ids: Optional[List[str]] = None) -> Optional[str]:
+    """Hash a freshly uploaded object and index it under its actual digest; the first object for a digest wins.
+
+    The client's `sha256` is only a claim and is never indexed unchecked:
+    the stored bytes are streamed and hashed here, so a wrong claim cannot
+    link later uploads to the wrong PDF. `row_ids` (the rows owning the
+    object) get the verified digest written to `content_sha256`. Reads the
+    whole object, so callers run it on the background queue. Returns the
+    digest indexed, or None. Best effort: a failure only means later
+    uploads of the same bytes are stored again.
+    """
+    if not sha256 or not _index_available():
+        return None
+    try:
+        actual, size = hash_object(bucket, path)
+    except Exception as e:
+        logger.info("Not indexing %s: %s/%s unreadable: %s", sha256, bucket, path, e)
+        return None
+    if actual != sha256:
+        logger.info("Claimed digest %s does not match %s/%s; indexing its actual digest %s", sha256, bucket, path, actual)
+    entry = {"sha256": actual, "bucket": bucket, "path": path, "size": size}
+    admin = _service_client()
+    try:
+        rest_circuit.call(
+            call_with_retry,
+            admin.table(CONTENT_TABLE).upsert(entry, on_conflict="sha256", ignore_duplicates=True).execute,
+        )
+    except Exception as e:
+        _index_failed(e)
+        return None
+    if row_ids:
+        try:
+            res = rest_circuit.call(
+                call_with_retry,
+                admin.table("pdf_assets").update({"content_sha256": actual}).in_("id", row_ids).execute,
+            )
+        except Exception as e:
+            logger.info("Recording content_sha256 on %s failed: %s", row_ids, e)
+            return actual
+        mark_manifest_changed()
+        for module in {r.get("module") for r in getattr(res, "data", None) or []}:
+            manifest_publisher.schedule(module)
+    return actual
+
+
+def forget_content(hashes: List[str], admin=None) -> None:
+    if not hashes:
+        return
+    admin = admin or _service_client()
+    try:
+        rest_circuit.call(admin.table(CONTENT_TABLE).delete().in_("sha256", hashes).execute)
+    except Exception as e:
+        logger.info("Content index delete failed: %s", e)
+
+
+def hash_object(bucket: str, path: str) -> Tuple[str, int]:
+    """SHA-256 and size of a stored object, streamed in PDF_PROXY_CHUNK_BYTES pieces."""
+    client, resp = open_object_stream(bucket, path)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        for chunk in resp.iter_bytes(PDF_PROXY_CHUNK_BYTES):
+            digest.update(chunk)
+            size += len(chunk)
+    finally:
+        resp.close()
+        client.close()
+    return digest.hexdigest(), size
+
+
+def _fetch_index(admin, page_size: int) -> List[Dict[str, Any]]:
+    entries: List[Dict[str, Any]] = []
+    while True:
+        q = (
+            admin.table(CONTENT_TABLE)
+            .select("sha256,bucket,path,size,verified_at")
+            .order("sha256", desc=False)
+            .range(len(entries), len(entries) + page_size - 1)
+        )
+        page = getattr(rest_circuit.call(call_with_retry, q.execute), "data", None) or []
+        entries.extend(page)
+        if len(page) < page_size:
+            return entries
+
+
+def _check_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        actual, size = hash_object(entry["bucket"], entry["path"])
+    except ObjectNotFound:
+        return {"status": "missing"}
+    except Exception as e:
+        return {"status": "error", "error": str(e) or e.__class__.__name__}
+    if actual != entry["sha256"]:
+        return {"status": "mismatch", "actual": actual, "actual_size": size}
+    return {"status": "ok", "size": size}
+
+
+def verify_content_objects(*, remove: bool = False, max_workers: int = 4, page_size: int = 1000) -> Dict[str, Any]:
+    """Re-hash every indexed object and compare it with its digest.
+
+    Matching entries get `verified_at` (and a missing `size`) stamped.
+    Missing and mismatched objects are reported with the manifest rows that
+    carry their digest; with `remove`, their index entries are deleted so
+    no further upload is deduplicated against them. Objects are streamed,
+    never held in memory, through a pool of `max_workers` downloads.
+    """
+    admin = _service_client()
+    entries = _fetch_index(admin, page_size)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        results = list(pool.map(propagate_deadline(_check_entry), entries))
+
+    verified = 0
+    bad: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    for entry, result in zip(entries, results):
+        where = {"sha256": entry["sha256"], "bucket": entry["bucket"], "path": entry["path"]}
+        if result["status"] == "ok":
+            stamp = {"verified_at": now}
+            if entry.get("size") is None:
+                stamp["size"] = result["size"]
+            rest_circuit.call(call_with_retry, admin.table(CONTENT_TABLE).update(stamp).eq("sha256", entry["sha256"]).execute)
+            verified += 1
+        elif result["status"] == "error":
+            errors.append({**where, "error": result["error"]})
+        else:
+            bad.append({**where, **result})
+
+    if bad:
+        res = rest_circuit.call(
+            call_with_retry,
+            admin.table("pdf_assets").select("id,module,path,content_sha256").in_("content_sha256", [b["sha256"] for b in bad]).execute,
+        )
+        rows_by_hash: Dict[str, List[Dict[str, Any]]] = {}
+        for row in getattr(res, "data", None) or []:
+            rows_by_hash.setdefault(row.get("content_sha256"), []).append(
+                {"id": row.get("id"), "module": row.get("module"), "path": row.get("path")}
+            )
+        for b in bad:
+            b["rows"] = rows_by_hash.get(b["sha256"], [])
+        if remove:
+            forget_content([b["sha256"] for b in bad], admin)
+
+    return {
+        "checked": len(entries),
+        "verified": verified,
+        "missing": [b for b in bad if b["status"] == "missing"],
+        "mismatched": [b for b in bad if b["status"] == "mismatch"],
+        "errors": errors,
+        "removed": len(bad) if remove else 0,
+    }
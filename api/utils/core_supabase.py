@@ -1,17 +1,91 @@
+import atexit
 import os
+import math
+import threading
 import json as _json
 import logging
-from typing import Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
 from urllib import request as _urlreq
 from urllib import parse as _urlparse
 
+from .cache import TTLCache
+from .circuit import CircuitOpen, auth_circuit, rest_circuit, storage_circuit
+from .deadline import UPSTREAM_TIMEOUT_SECONDS, call_with_retry, propagate_deadline, upstream_timeout
+
 logger = logging.getLogger("api3.supabase.core")
 
+PROFILE_CACHE_SECONDS = float(os.getenv("PROFILE_CACHE_SECONDS") or 120)
+profile_cache = TTLCache("profiles", ttl_seconds=PROFILE_CACHE_SECONDS, max_entries=2048)
+
 try:
     from supabase import create_client
 except Exception:
     create_client = None
 
+try:
+    from supabase import ClientOptions
+except Exception:
+    ClientOptions = None
+
+try:
+    import httpx as _httpx
+except Exception:
+    _httpx = None
+
+
+_shared_http_lock = threading.Lock()
+_shared_http: Dict[str, object] = {}
+
+
+def _apply_deadline_timeout(request) -> None:
+    # Runs per request, so each call is clipped to the deadline of the request
+    # that makes it, not the one that built the client.
+    request.extensions["timeout"] = _httpx.Timeout(upstream_timeout()).as_dict()
+
+
+def _shared_http_client():
+    """One httpx client (connection pool and SSL context) for every SDK client in the process."""
+    client = _shared_http.get("client")
+    if client is None:
+        with _shared_http_lock:
+            client = _shared_http.get("client")
+            if client is None:
+                client = _httpx.Client(
+                    timeout=UPSTREAM_TIMEOUT_SECONDS,
+                    event_hooks={"request": [_apply_deadline_timeout]},
+                )
+                _shared_http["client"] = client
+                atexit.register(client.close)
+    return client
+
+
+def _client_options():
+    """Client options whose HTTP timeouts fit the current request's deadline."""
+    if ClientOptions is None:
+        return None
+    timeout = upstream_timeout()
+    options = ClientOptions(
+        postgrest_client_timeout=timeout,
+        storage_client_timeout=max(1, int(math.ceil(timeout))),
+    )
+    # Newer SDKs share one httpx client across auth/rest/storage. Handing them
+    # the process-wide client reuses its connections, and its request hook
+    # bounds GoTrue calls too, which have no timeout option of their own.
+    if _httpx is not None and hasattr(options, "httpx_client"):
+        options.httpx_client = _shared_http_client()
+    return options
+
+
+def create_service_client(supabase_url: str, key: str):
+    """`create_client` with deadline-aware timeouts on every sub-client."""
+    if create_client is None:
+        raise RuntimeError("Supabase client not installed on server.")
+    options = _client_options()
+    if options is None:
+        return create_client(supabase_url, key)
+    return create_client(supabase_url, key, options)
+
 
 def build_supabase_public():
     """Create a Supabase client with anon or service key.
@@ -28,61 +102,77 @@ def build_supabase_public():
     if not supabase_url or not (anon_key or service_key):
         raise RuntimeError("Supabase environment not configured.")
 
-    public_client = create_client(supabase_url, anon_key or service_key)
+    public_client = create_service_client(supabase_url, anon_key or service_key)
     return public_client, service_key, supabase_url
 
 
-def admin_get_user_by_email_rest(supabase_url: str, service_key: str, email: str) -> bool:
-    """Check auth.users for a matching email via GoTrue Admin REST.
-
-    Returns True if a case-insensitive match is found; False otherwise.
-    """
-    if not service_key:
-        return False
-
-    base = supabase_url.rstrip("/") + "/auth/v1/admin/users"
+def _admin_get_json(url: str, service_key: str, timeout: float = 10):
     headers = {
         "apikey": service_key,
         "Authorization": f"Bearer {service_key}",
     }
-    email_q = _urlparse.urlencode({"email": email})
-    url = f"{base}?{email_q}"
-
-    def _fetch_json(u: str):
-        req = _urlreq.Request(u, headers=headers, method="GET")
-        with _urlreq.urlopen(req, timeout=10) as resp:
-            body = resp.read()
-            ct = resp.headers.get("content-type", "")
-            if "application/json" not in ct and not body.strip().startswith(b"{") and not body.strip().startswith(b"["):
-                raise ValueError("Non-JSON admin response")
-            return _json.loads(body.decode("utf-8"))
+    req = _urlreq.Request(url, headers=headers, method="GET")
+    with _urlreq.urlopen(req, timeout=upstream_timeout(timeout)) as resp:
+        body = resp.read()
+        ct = resp.headers.get("content-type", "")
+        if "application/json" not in ct and not body.strip().startswith(b"{") and not body.strip().startswith(b"["):
+            raise ValueError("Non-JSON admin response")
+        return _json.loads(body.decode("utf-8"))
 
-    try:
-        data = _fetch_json(url)
-        if isinstance(data, list):
-            return any(((u.get("email") or "").lower() == email.lower()) for u in data)
-        if isinstance(data, dict):
-            arr = data.get("users") or data.get("data") or []
-            if isinstance(arr, list):
-                return any(((getattr(u, "email", None) or u.get("email") or "").lower() == email.lower()) for u in arr)
-            if data.get("email"):
-                return (data.get("email") or "").lower() == email.lower()
-    except Exception as e:
-        logger.info(f"Admin email filter unsupported or failed: {e}")
 
-    # Fallback: list first page and filter client-side
+def list_auth_users_rest(supabase_url: str, service_key: str, page: int = 1, per_page: int = 1000) -> List[Dict]:
+    """Fetch one page of auth users via GoTrue Admin REST, newest first.
+
+    Raises on failure so sync jobs can keep their previous state.
+    """
+    if not service_key:
+        raise RuntimeError("Supabase service role key required to list users")
+    base = supabase_url.rstrip("/") + "/auth/v1/admin/users"
+    query = _urlparse.urlencode({"page": page, "per_page": per_page, "sort": "created_at desc"})
+    data = auth_circuit.call(call_with_retry, _admin_get_json, f"{base}?{query}", service_key)
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        items = data.get("users") or data.get("data") or []
+        return items if isinstance(items, list) else []
+    return []
+
+
+AUTH_EMAIL_FILTER_PAGE = 1000
+
+
+def auth_email_registered_rest(supabase_url: str, service_key: str, email: str) -> Optional[bool]:
+    """Exact "does auth.users hold this email?" via the GoTrue Admin `filter` query.
+
+    Never falls back to scanning a page of users. Returns None (unknown)
+    when the answer cannot be exact: no service key, a failed request, a
+    server that ignored `filter` (a returned email does not contain the
+    term), or a filtered result that may have been cut off by paging.
+    """
+    needle = (email or "").strip().lower()
+    if not service_key or not needle:
+        return None
+    base = supabase_url.rstrip("/") + "/auth/v1/admin/users"
+    query = _urlparse.urlencode({"filter": needle, "page": 1, "per_page": AUTH_EMAIL_FILTER_PAGE})
     try:
-        list_url = f"{base}?page=1&per_page=200"
-        data = _fetch_json(list_url)
-        items = []
-        if isinstance(data, list):
-            items = data
-        elif isinstance(data, dict):
-            items = data.get("users") or data.get("data") or []
-        return any(((getattr(u, "email", None) or (u.get("email") if isinstance(u, dict) else None) or "").lower() == email.lower()) for u in items)
+        data = auth_circuit.call(call_with_retry, _admin_get_json, f"{base}?{query}", service_key)
     except Exception as e:
-        logger.info(f"Admin list users failed: {e}")
-        return False
+        logger.info("Admin email filter failed: %s", e)
+        return None
+    items = data
+    if isinstance(data, dict):
+        items = data.get("users") or data.get("data") or []
+    if not isinstance(items, list):
+        return None
+    emails = [((u.get("email") if isinstance(u, dict) else None) or "").lower() for u in items]
+    if needle in emails:
+        return True
+    if any(needle not in e for e in emails):
+        logger.info("Admin users endpoint ignored the email filter")
+        return None
+    if len(emails) >= AUTH_EMAIL_FILTER_PAGE:
+        return None
+    return False
 
 
 def fetch_profile_admin_sdk(
@@ -91,11 +181,31 @@ def fetch_profile_admin_sdk(
     user_id: Optional[str] = None,
     email: Optional[str] = None,
 ) -> Optional[Dict]:
-    """Fetch a single profile using the Supabase Python client with service role key."""
+    """Fetch a single profile using the Supabase Python client with service role key.
+
+    Found profiles are cached for PROFILE_CACHE_SECONDS, keyed by user id
+    (or email when no id is given).
+    """
     if not service_key or create_client is None:
         return None
+    if user_id:
+        cache_key = ("id", user_id)
+    elif email:
+        cache_key = ("email", email.lower())
+    else:
+        return None
+    cached = profile_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    profile = _query_profile(supabase_url, service_key, user_id, email)
+    if profile:
+        profile_cache.set(cache_key, profile)
+    return profile
+
+
+def _query_profile(supabase_url: str, service_key: str, user_id: Optional[str], email: Optional[str]) -> Optional[Dict]:
     try:
-        admin_client = create_client(supabase_url, service_key)
+        admin_client = create_service_client(supabase_url, service_key)
         selectors = [
             "id,first_name,last_name,full_name",
             "id,full_name",
@@ -110,7 +220,7 @@ def fetch_profile_admin_sdk(
                     q = q.eq("email", email)
                 else:
                     return None
-                res = q.execute()
+                res = rest_circuit.call(call_with_retry, q.execute)
                 data = getattr(res, "data", None)
                 if isinstance(data, list) and data:
                     item = data[0]
@@ -120,20 +230,97 @@ def fetch_profile_admin_sdk(
                         "last_name": item.get("last_name"),
                         "full_name": item.get("full_name") or item.get("name"),
                     }
+            except CircuitOpen:
+                raise
             except Exception:
                 continue
     except Exception as e:
-        logger.info(f"Profile fetch (SDK) failed: {e}")
+        logger.info("Profile fetch (SDK) failed: %s", e)
     return None
 
 
+def upsert_profile_admin_sdk(
+    supabase_url: str,
+    service_key: str,
+    user_id: Optional[str],
+    first_name: str,
+    last_name: str,
+) -> bool:
+    """Upsert a `profiles` row for a new user, falling back to `full_name` only.
+
+    The `on_auth_user_created` trigger normally creates the row already; this
+    is a safety net for projects without it and runs on the background queue.
+    Raises when both upsert shapes fail so the queue can retry.
+    """
+    if not service_key or create_client is None or not user_id:
+        return False
+    full_name = f"{first_name} {last_name}".strip()
+    admin_client = create_service_client(supabase_url, service_key)
+    try:
+        rest_circuit.call(admin_client.table("profiles").upsert({
+            "id": user_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "full_name": full_name,
+        }).execute)
+    except CircuitOpen:
+        raise
+    except Exception:
+        rest_circuit.call(admin_client.table("profiles").upsert({"id": user_id, "full_name": full_name}).execute)
+    finally:
+        profile_cache.delete(("id", user_id))
+    return True
+
+
+DUPLICATE_SIGNUP_CODES = {"user_already_exists", "email_exists"}
+
+
+def is_duplicate_signup_error(exc: Exception) -> bool:
+    """True if a `sign_up` failure means the email is already registered."""
+    code = getattr(exc, "code", None)
+    if code in DUPLICATE_SIGNUP_CODES:
+        return True
+    message = str(exc).lower()
+    return "already registered" in message or "already exists" in message
+
+
+def signup_response_is_duplicate(user) -> bool:
+    """True if `sign_up` returned GoTrue's obfuscated user for an existing email.
+
+    With email confirmation enabled GoTrue does not error on duplicates; it
+    returns a user without identities instead.
+    """
+    if not user:
+        return False
+    identities = getattr(user, "identities", None)
+    if identities is None and isinstance(user, dict):
+        identities = user.get("identities")
+    return isinstance(identities, list) and len(identities) == 0
+
+
 def create_signed_storage_url(supabase_url: str, service_key: str, bucket: str, path: str, expires_in: int = 1800) -> Optional[str]:
-    """Create a time-limited signed URL for a storage object."""
+    """Create a time-limited signed URL for a storage object.
+
+    Returns None on failure, but raises CircuitOpen so callers can fall back.
+    """
     if not service_key or create_client is None:
         return None
+    try:
+        admin_client = create_service_client(supabase_url, service_key)
+        res = storage_circuit.call(call_with_retry, admin_client.storage.from_(bucket).create_signed_url, path, expires_in)
+        if isinstance(res, dict):
+            url = res.get("signedURL") or res.get("signedUrl") or res.get("signed_url")
+        else:
+            url = getattr(res, "signed_url", None)
+        return url
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.info("Signed URL generation failed for %s/%s: %s", bucket, path, e)
+        return None
 
 
-def create_signed_upload_url(supabase_url: str, service_key: str, bucket: str, path: str) -> Optional[Dict[str, str]]:
+def create_signed_upload_url(supabase_url: str, service_key: str, bucket: str, path: str, admin_client=None) -> Optional[Dict[str, str]]:
     """Create a signed upload URL for direct-from-browser upload to Storage.
 
     Returns dict { 'signed_url': str, 'token': str } or None on failure.
@@ -141,8 +328,9 @@ def create_signed_upload_url(supabase_url: str, service_key: str, bucket: str, p
     if not service_key or create_client is None:
         return None
     try:
-        admin_client = create_client(supabase_url, service_key)
-        res = admin_client.storage.from_(bucket).create_signed_upload_url(path)
+        if admin_client is None:
+            admin_client = create_service_client(supabase_url, service_key)
+        res = storage_circuit.call(admin_client.storage.from_(bucket).create_signed_upload_url, path)
         # SDK may return dict or object
         signed_url = getattr(res, "signed_url", None) or (res.get("signed_url") if isinstance(res, dict) else None)
         token = getattr(res, "token", None) or (res.get("token") if isinstance(res, dict) else None)
@@ -154,14 +342,82 @@ def create_signed_upload_url(supabase_url: str, service_key: str, bucket: str, p
                 elif not absolute_url.startswith("http://") and not absolute_url.startswith("https://"):
                     absolute_url = f"{supabase_url.rstrip('/')}/{absolute_url.lstrip('/')}"
             return {"signed_url": absolute_url, "token": token}
+    except CircuitOpen:
+        # Let the route answer 503 + Retry-After rather than a per-file failure.
+        raise
     except Exception as e:
-        logger.info(f"Signed upload URL generation failed for {bucket}/{path}: {e}")
+        logger.info("Signed upload URL generation failed for %s/%s: %s", bucket, path, e)
     return None
-    try:
-        admin_client = create_client(supabase_url, service_key)
-        res = admin_client.storage.from_(bucket).create_signed_url(path, expires_in)
-        url = getattr(res, "signed_url", None) or (res.get("signed_url") if isinstance(res, dict) else None)
-        return url
-    except Exception as e:
-        logger.info(f"Signed URL generation failed for {bucket}/{path}: {e}")
-        return None
+
+
+def create_signed_upload_urls(
+    supabase_url: str,
+    service_key: str,
+    bucket: str,
+    paths: List[str],
+    max_workers: int = 8,
+) -> Dict[str, Optional[Dict[str, str]]]:
+    """Mint signed upload URLs for many paths in one bucket concurrently.
+
+    Shares one service-role client across a bounded thread pool.
+    Returns {path: {'signed_url', 'token'} or None}.
+    """
+    if not paths:
+        return {}
+    if not service_key or create_client is None:
+        return {p: None for p in paths}
+    admin_client = create_service_client(supabase_url, service_key)
+    workers = max(1, min(max_workers, len(paths)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            propagate_deadline(lambda p: create_signed_upload_url(supabase_url, service_key, bucket, p, admin_client)),
+            paths,
+        )
+        return dict(zip(paths, results))
+
+
+def list_storage_objects(
+    supabase_url: str,
+    service_key: str,
+    bucket: str,
+    prefix: str = "",
+    page_size: int = 1000,
+    admin_client=None,
+) -> Tuple[List[str], List[str]]:
+    """List one folder level of a storage bucket, following pagination.
+
+    Returns (object_paths, folder_paths); both are full paths within the bucket.
+    Raises on upstream failure so callers can tell "empty" from "unknown".
+    Pass `admin_client` to reuse one service-role client across many folders.
+    """
+    if not service_key or create_client is None:
+        raise RuntimeError("Supabase service role key required for storage listing")
+    if admin_client is None:
+        admin_client = create_service_client(supabase_url, service_key)
+    bucket_api = admin_client.storage.from_(bucket)
+    prefix = (prefix or "").strip("/")
+    objects: List[str] = []
+    folders: List[str] = []
+    offset = 0
+    while True:
+        page = storage_circuit.call(
+            call_with_retry,
+            bucket_api.list,
+            prefix,
+            {"limit": page_size, "offset": offset, "sortBy": {"column": "name", "order": "asc"}},
+        )
+        page = page or []
+        for entry in page:
+            name = (entry or {}).get("name")
+            if not name or name == ".emptyFolderPlaceholder":
+                continue
+            full_path = f"{prefix}/{name}" if prefix else name
+            # Storage reports folders as entries without an object id
+            if entry.get("id") is None:
+                folders.append(full_path)
+            else:
+                objects.append(full_path)
+        if len(page) < page_size:
+            break
+        offset += page_size
+    return objects, folders
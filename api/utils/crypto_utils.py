@@ -75,7 +75,7 @@ def decrypt_auth_payload(enc_b64: str) -> Optional[Dict]:
             return None
         return data
     except Exception as e:
-        logger.info(f"Decryption failed: {e}")
+        logger.info("Decryption failed: %s", e)
         return None
 
 
@@ -114,5 +114,5 @@ def aesgcm_encrypt_profile(return_key_b64: Optional[str], profile: Dict) -> Opti
             "alg": "AES-GCM",
         }
     except Exception as e:
-        logger.info(f"AES-GCM encrypt failed: {e}")
+        logger.info("AES-GCM encrypt failed: %s", e)
         return None
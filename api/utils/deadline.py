@@ -0,0 +1,140 @@
+import contextvars
+import functools
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+from urllib import error as _urlerror
+
+try:
+    import httpx as _httpx
+except Exception:
+    _httpx = None
+
+logger = logging.getLogger("api3.deadline")
+
+# Vercel's default function limit is 10 s; leave headroom to send the error.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS") or 9)
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS") or 5)
+MIN_UPSTREAM_TIMEOUT_SECONDS = 0.05
+
+# PostgREST connection/timeout codes (sent with 503/504) and SQLSTATE classes
+# for connection loss, resource exhaustion and statement cancellation.
+TRANSIENT_DB_CODE_PREFIXES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003", "08", "53", "57")
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("api3_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The current request has no time budget left for another upstream call."""
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float] = None):
+    """Set the absolute deadline for everything run inside this block."""
+    budget = REQUEST_DEADLINE_SECONDS if seconds is None else seconds
+    token = _deadline.set(time.monotonic() + budget)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request budget, or None outside a request."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def upstream_timeout(cap: float = UPSTREAM_TIMEOUT_SECONDS) -> float:
+    """Timeout for the next upstream call: `cap`, clipped to the remaining budget.
+
+    Raises DeadlineExceeded when the budget is already spent, so callers fail
+    fast instead of starting a call that cannot finish in time.
+    """
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= MIN_UPSTREAM_TIMEOUT_SECONDS:
+        raise DeadlineExceeded("request deadline exceeded")
+    return min(cap, left)
+
+
+def propagate_deadline(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Carry the caller's deadline into `fn` when it runs on another thread."""
+    deadline = _deadline.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _deadline.set(deadline)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    return wrapper
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True for failures worth retrying: timeouts, connection errors, 429 and 5xx."""
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    if _httpx is not None:
+        if isinstance(exc, _httpx.TransportError):
+            return True
+        if isinstance(exc, _httpx.HTTPStatusError):
+            return exc.response.status_code == 429 or exc.response.status_code >= 500
+    if isinstance(exc, _urlerror.HTTPError):
+        return exc.code == 429 or exc.code >= 500
+    if isinstance(exc, (_urlerror.URLError, TimeoutError, ConnectionError)):
+        return True
+    if exc.__class__.__name__ == "AuthRetryableError":
+        return True
+    code = getattr(exc, "code", None)
+    if isinstance(code, str) and code.startswith(TRANSIENT_DB_CODE_PREFIXES):
+        return True
+    # SDK errors carry the HTTP status under different names; `code` may also
+    # hold a Postgres SQLSTATE, which falls outside the HTTP range.
+    for attr in ("status", "status_code", "code"):
+        try:
+            status = int(getattr(exc, attr, None))
+        except (TypeError, ValueError):
+            continue
+        if 100 <= status < 600:
+            return status == 429 or status >= 500
+    return False
+
+
+def call_with_retry(
+    fn: Callable[..., Any],
+    *args,
+    attempts: int = 3,
+    base_delay: float = 0.1,
+    max_delay: float = 1.0,
+    retry_if: Callable[[BaseException], bool] = is_transient_error,
+    **kwargs,
+) -> Any:
+    """Run an idempotent read, retrying transient failures with full-jitter backoff.
+
+    Only retries while the request budget can still cover the backoff sleep;
+    DeadlineExceeded is never retried.
+    """
+    for attempt in range(max(1, attempts)):
+        upstream_timeout()
+        try:
+            return fn(*args, **kwargs)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if attempt >= attempts - 1 or not retry_if(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            left = remaining()
+            if left is not None and delay >= left - MIN_UPSTREAM_TIMEOUT_SECONDS:
+                raise
+            logger.info("Retrying %s after error: %s", getattr(fn, '__name__', 'call'), e)
+            time.sleep(delay)
@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Optional, Set
+
+from .common import normalize_email
+from .core_supabase import auth_email_registered_rest, build_supabase_public, list_auth_users_rest
+
+logger = logging.getLogger("api3.email_index")
+
+EMAIL_INDEX_PAGE_SIZE = 1000
+EMAIL_INDEX_DELTA_SECONDS = float(os.getenv("EMAIL_INDEX_DELTA_SECONDS") or 300)
+EMAIL_INDEX_FULL_SECONDS = float(os.getenv("EMAIL_INDEX_FULL_SECONDS") or 6 * 3600)
+
+
+def _digest(email: str) -> int:
+    # 64-bit digest: 8 bytes per address in the packed array and no raw
+    # emails held in memory. Collisions are resolved by exact verification.
+    raw = hashlib.blake2b(normalize_email(email).encode("utf-8"), digest_size=8, person=b"api3-email").digest()
+    return int.from_bytes(raw, "big")
+
+
+class EmailIndex:
+    """Local set of hashed auth-user emails for signup duplicate checks.
+
+    Built from a full paginated sync of the GoTrue user directory into a
+    sorted `array('Q')`, kept fresh by `add()` on signup and by periodic
+    delta syncs that stop at the newest `created_at` already seen. Syncs run
+    on a background thread; lookups never touch the network for negatives.
+    """
+
+    def __init__(self):
+        self._packed = array("Q")
+        self._recent: Set[int] = set()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.ready = False
+        self.watermark = ""
+        self.full_synced_at = 0.0
+        self.delta_synced_at = 0.0
+        self.last_error: Optional[str] = None
+        self._retry_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._packed) + len(self._recent)
+
+    def might_contain(self, email: str) -> Optional[bool]:
+        """False if definitely unknown, True if possibly registered, None if not built yet."""
+        if not self.ready:
+            return None
+        key = _digest(email)
+        if key in self._recent:
+            return True
+        packed = self._packed
+        pos = bisect_left(packed, key)
+        return pos < len(packed) and packed[pos] == key
+
+    def add(self, email: str) -> None:
+        if not email:
+            return
+        with self._lock:
+            self._recent.add(_digest(email))
+
+    def _collect(self, supabase_url: str, service_key: str, stop_at: str = ""):
+        keys = set()
+        newest = stop_at
+        page = 1
+        while True:
+            users = list_auth_users_rest(supabase_url, service_key, page=page, per_page=EMAIL_INDEX_PAGE_SIZE)
+            reached_known = False
+            for user in users:
+                created = str(user.get("created_at") or "")
+                if stop_at and created and created <= stop_at:
+                    reached_known = True
+                    continue
+                if user.get("email"):
+                    keys.add(_digest(user["email"]))
+                if created > newest:
+                    newest = created
+            if reached_known or len(users) < EMAIL_INDEX_PAGE_SIZE:
+                return keys, newest
+            page += 1
+
+    def full_sync(self) -> None:
+        _public, service_key, supabase_url = build_supabase_public()
+        keys, newest = self._collect(supabase_url, service_key)
+        packed = array("Q", sorted(keys))
+        with self._lock:
+            # Signups that landed while the sync ran stay in `_recent`.
+            self._recent = {k for k in self._recent if k not in keys}
+            self._packed = packed
+            self.watermark = newest
+            self.ready = True
+        now = time.monotonic()
+        self.full_synced_at = now
+        self.delta_synced_at = now
+        logger.info("Email index built: %s entries", len(packed))
+
+    def delta_sync(self) -> None:
+        _public, service_key, supabase_url = build_supabase_public()
+        keys, newest = self._collect(supabase_url, service_key, stop_at=self.watermark)
+        with self._lock:
+            self._recent.update(keys)
+            if newest > self.watermark:
+                self.watermark = newest
+        self.delta_synced_at = time.monotonic()
+
+    def _run_sync(self) -> None:
+        try:
+            if not self.ready or time.monotonic() - self.full_synced_at >= EMAIL_INDEX_FULL_SECONDS:
+                self.full_sync()
+            else:
+                self.delta_sync()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            self._retry_at = time.monotonic() + EMAIL_INDEX_DELTA_SECONDS
+            logger.info("Email index sync failed: %s", e)
+        finally:
+            self._sync_lock.release()
+
+    def ensure_fresh(self) -> None:
+        """Start a background sync if the index is missing or stale; never blocks."""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return
+        if self.ready and now - self.delta_synced_at < EMAIL_INDEX_DELTA_SECONDS:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self._run_sync, name="email-index-sync", daemon=True).start()
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "entries": len(self),
+            "bytes": self._packed.itemsize * len(self._packed),
+            "watermark": self.watermark,
+            "last_error": self.last_error,
+        }
+
+
+email_index = EmailIndex()
+
+
+def email_already_registered(email: str) -> Optional[bool]:
+    """Answer "is this email registered?" locally where possible.
+
+    Returns False for index misses (no network call) and the exact GoTrue
+    filter lookup for index hits. None means unknown: the index is still
+    being built, or GoTrue could not answer exactly; callers then rely on
+    sign_up's own duplicate check.
+    """
+    email_index.ensure_fresh()
+    hit = email_index.might_contain(email)
+    if hit is None or hit is False:
+        return hit
+    _public, service_key, supabase_url = build_supabase_public()
+    return auth_email_registered_rest(supabase_url, service_key, email)
@@ -0,0 +1,51 @@
+import hashlib
+import json as _json
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+
+def compute_etag(*parts: Any) -> str:
+    """Return a strong ETag (quoted hex digest) for the given JSON-able parts."""
+    raw = _json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return '"' + hashlib.sha256(raw).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against `etag`.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    validator the CDN downgraded to W/"..." after compression still matches.
+    """
+    if not if_none_match:
+        return False
+    value = if_none_match.strip()
+    if value == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in value.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def conditional_json(
+    request: Request,
+    etag: str,
+    cache_control: str,
+    build_payload: Callable[[], Dict[str, Any]],
+) -> Response:
+    """Answer 304 when the client already has `etag`, else a JSON body.
+
+    `build_payload` is only called on a miss, so expensive work such as URL
+    signing is skipped entirely for revalidations.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(build_payload()), headers=headers)
@@ -0,0 +1,135 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or "INFO").upper()
+LOG_FORMAT = (os.getenv("LOG_FORMAT") or "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE") or 10000)
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="")
+
+# Attributes every LogRecord carries; anything else was passed via `extra=`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+# Args of these types cannot change before the writer thread formats them.
+_LAZY_ARG_TYPES = (str, int, float, bool, type(None), BaseException)
+
+_handler: Optional["NonBlockingQueueHandler"] = None
+_listener: Optional["_Listener"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id, extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + ".%03dZ" % record.msecs,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", "")
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller and defers formatting.
+
+    The stdlib handler renders every message on the calling thread. This one
+    only stamps the request id, and leaves `msg % args` to the writer thread
+    when the args are immutable. When the queue is full, records are dropped
+    and counted instead of stalling the request.
+    """
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(a, _LAZY_ARG_TYPES) for a in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # Tracebacks pin frames whose locals may change; render them now.
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Block for the stop sentinel so a full queue is still flushed on exit.
+        self.queue.put(self._sentinel)
+
+
+def configure_logging(stream=None, force: bool = False) -> None:
+    """Route all logging through a bounded queue to a background writer thread.
+
+    Like `logging.basicConfig`, this does nothing if the root logger already
+    has handlers, unless `force` is set. LOG_FORMAT=text keeps the old
+    `LEVEL:logger:message` lines.
+    """
+    global _handler, _listener
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return
+    shutdown_logging()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue: "queue.Queue" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler = NonBlockingQueueHandler(log_queue)
+    _listener = _Listener(log_queue, writer)
+    _listener.start()
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    if _handler is None:
+        return {"format": LOG_FORMAT, "pipeline": "inactive"}
+    return {
+        "format": LOG_FORMAT,
+        "pipeline": "queue",
+        "queued": _handler.queue.qsize(),
+        "capacity": LOG_QUEUE_SIZE,
+        "dropped": _handler.dropped,
+    }
+
+
+atexit.register(shutdown_logging)
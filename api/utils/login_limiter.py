@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .common import normalize_email
+
+LOGIN_FAILURES_PER_EMAIL = int(os.getenv("LOGIN_FAILURES_PER_EMAIL") or 5)
+LOGIN_FAILURES_PER_IP = int(os.getenv("LOGIN_FAILURES_PER_IP") or 20)
+LOGIN_FAILURE_WINDOW_SECONDS = float(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS") or 900)
+
+
+class FailedLoginLimiter:
+    """Sliding-window count of failed logins per email and per client IP.
+
+    Checked before any password hashing or RSA work, so repeated bad
+    guesses cannot be used to burn CPU. State is in-process and bounded to
+    `max_keys` keys (least recently touched evicted first).
+    """
+
+    def __init__(
+        self,
+        per_email: int = LOGIN_FAILURES_PER_EMAIL,
+        per_ip: int = LOGIN_FAILURES_PER_IP,
+        window_seconds: float = LOGIN_FAILURE_WINDOW_SECONDS,
+        max_keys: int = 10000,
+    ):
+        self.limits = {"email": per_email, "ip": per_ip}
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._failures: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.blocked = 0
+
+    def _keys(self, email: Optional[str], ip: Optional[str]):
+        if email:
+            yield ("email", normalize_email(email))
+        if ip:
+            yield ("ip", ip)
+
+    def _recent(self, key, now: float) -> Optional[deque]:
+        hits = self._failures.get(key)
+        if hits is None:
+            return None
+        while hits and hits[0] <= now - self.window_seconds:
+            hits.popleft()
+        if not hits:
+            del self._failures[key]
+            return None
+        return hits
+
+    def retry_after(self, email: Optional[str] = None, ip: Optional[str] = None) -> Optional[int]:
+        """Seconds until another attempt is allowed, or None if not limited."""
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for key in self._keys(email, ip):
+                hits = self._recent(key, now)
+                if hits is not None and len(hits) >= self.limits[key[0]]:
+                    wait = max(wait, hits[0] + self.window_seconds - now)
+            if wait > 0:
+                self.blocked += 1
+                return max(1, int(wait + 0.999))
+        return None
+
+    def record_failure(self, email: Optional[str] = None, ip: Optional[str] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key in self._keys(email, ip):
+                hits = self._failures.get(key)
+                if hits is None:
+                    hits = self._failures[key] = deque(maxlen=max(self.limits.values()))
+                hits.append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def record_success(self, email: Optional[str] = None) -> None:
+        if not email:
+            return
+        with self._lock:
+            self._failures.pop(("email", normalize_email(email)), None)
+
+    def items(self) -> List[Tuple[Hashable, deque]]:
+        with self._lock:
+            return list(self._failures.items())
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tracked_keys": len(self._failures), "blocked": self.blocked, **{f"per_{k}": v for k, v in self.limits.items()}}
+
+
+login_limiter = FailedLoginLimiter()
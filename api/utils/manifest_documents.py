@@ -0,0 +1,311 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from .cache import TTLCache
+from .circuit import rest_circuit, storage_circuit
+from .core_supabase import build_supabase_public, create_service_client
+from .deadline import call_with_retry
+from .manifest_version import read_manifest_version
+
+logger = logging.getLogger("api3.manifest_documents")
+
+MANIFEST_DOC_BUCKET = os.getenv("MANIFEST_DOC_BUCKET") or "manifests"
+MANIFEST_DOC_DEBOUNCE_SECONDS = float(os.getenv("MANIFEST_DOC_DEBOUNCE_SECONDS") or 2)
+MANIFEST_DOC_MAX_DELAY_SECONDS = float(os.getenv("MANIFEST_DOC_MAX_DELAY_SECONDS") or 10)
+# How long a missing or outdated document is remembered before storage is asked again.
+MANIFEST_DOC_RETRY_SECONDS = 30
+MANIFEST_DOC_MAX_ATTEMPTS = 3
+DOC_FORMAT = 3
+DOC_COLUMNS = (
+    "id", "lesson", "path", "is_default", "score_min", "score_max", "updated_at", "storage_bucket", "storage_path",
+    "page_count", "byte_size", "title", "thumbnail_path",
+)
+
+# Parsed documents keyed by (manifest version, module).
+manifest_doc_cache = TTLCache("manifest_documents", ttl_seconds=3600, max_entries=64)
+_MISSING_DOC = {"missing": True}
+
+
+def document_path(module: str) -> str:
+    return quote(module, safe="") + ".json"
+
+
+def _score_segments(rows: List[List[Any]], indices: List[int]) -> Tuple[List[int], List[List[int]]]:
+    """Breakpoints and, per interval between them, the rows whose score range covers it.
+
+    Interval 0 is everything below breakpoints[0]; interval i is
+    [breakpoints[i-1], breakpoints[i]). Which rows match is constant within
+    an interval, so a lookup is one bisect.
+    """
+    lo_col, hi_col = DOC_COLUMNS.index("score_min"), DOC_COLUMNS.index("score_max")
+    points = set()
+    for i in indices:
+        if rows[i][lo_col] is not None:
+            points.add(rows[i][lo_col])
+        if rows[i][hi_col] is not None:
+            points.add(rows[i][hi_col] + 1)
+    breakpoints = sorted(points)
+    probes = [breakpoints[0] - 1 if breakpoints else 0] + breakpoints
+    segments = []
+    for score in probes:
+        segments.append([
+            i for i in indices
+            if (rows[i][lo_col] is None or rows[i][lo_col] <= score)
+            and (rows[i][hi_col] is None or rows[i][hi_col] >= score)
+        ])
+    return breakpoints, segments
+
+
+def build_document(module: str, rows: List[Dict[str, Any]], version: int) -> Dict[str, Any]:
+    """Compact per-module manifest: rows in `lesson, path` order, grouped by lesson.
+
+    Each lesson entry holds the row range it spans, the default rows and the
+    pre-sorted score breakpoints with the rows matching each interval.
+    """
+    packed = [[row.get(col) for col in DOC_COLUMNS] for row in rows]
+    lesson_col = DOC_COLUMNS.index("lesson")
+    default_col = DOC_COLUMNS.index("is_default")
+    lessons = []
+    start = 0
+    while start < len(packed):
+        end = start
+        while end < len(packed) and packed[end][lesson_col] == packed[start][lesson_col]:
+            end += 1
+        indices = list(range(start, end))
+        breakpoints, segments = _score_segments(packed, indices)
+        lessons.append({
+            "lesson": packed[start][lesson_col],
+            "rows": [start, end],
+            "defaults": [i for i in indices if packed[i][default_col]],
+            "breakpoints": breakpoints,
+            "segments": segments,
+        })
+        start = end
+    return {
+        "format": DOC_FORMAT,
+        "module": module,
+        "version": version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "columns": list(DOC_COLUMNS),
+        "rows": packed,
+        "lessons": lessons,
+    }
+
+
+def match_document(doc: Dict[str, Any], lesson: Optional[str], score: Optional[int], limit: int) -> List[Dict[str, Any]]:
+    """Same filter and order as the `match_pdf_assets` RPC, answered from a document."""
+    columns = doc["columns"]
+    matched: List[int] = []
+    for entry in doc["lessons"]:
+        if lesson and entry["lesson"] != lesson:
+            continue
+        if score is None:
+            matched.extend(entry["defaults"])
+        else:
+            matched.extend(entry["segments"][bisect.bisect_right(entry["breakpoints"], score)])
+        if limit and limit > 0 and len(matched) >= limit:
+            break
+    if limit and limit > 0:
+        matched = matched[:limit]
+    out = []
+    for i in matched:
+        row = dict(zip(columns, doc["rows"][i]))
+        row["module"] = doc["module"]
+        row["active"] = True
+        out.append(row)
+    return out
+
+
+def _query_module_rows(admin, module: str, page_size: int = 1000) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    while True:
+        q = (
+            admin.table("pdf_assets")
+            # `*` rather than DOC_COLUMNS: schemas without the dedup or ingest columns pack them as null.
+            .select("*")
+            .eq("module", module)
+            .eq("active", True)
+            .order("lesson", desc=False)
+            .order("path", desc=False)
+            .order("id", desc=False)
+            .range(len(rows), len(rows) + page_size - 1)
+        )
+        page = getattr(rest_circuit.call(call_with_retry, q.execute), "data", None) or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+
+def rebuild_module_document(module: str) -> Dict[str, Any]:
+    """Read the module's active rows and publish its document to storage.
+
+    The version is read before the rows, so a write that lands in between
+    leaves the document stamped older than it is and readers skip it.
+    """
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key:
+        raise RuntimeError("Supabase service role key required to publish manifest documents")
+    version = read_manifest_version()
+    if version is None:
+        raise RuntimeError("manifest_versions has no pdf_assets row")
+    admin = create_service_client(supabase_url, service_key)
+    doc = build_document(module, _query_module_rows(admin, module), version)
+    body = json.dumps(doc, separators=(",", ":")).encode("utf-8")
+    storage_circuit.call(
+        admin.storage.from_(MANIFEST_DOC_BUCKET).upload,
+        document_path(module),
+        body,
+        {"content-type": "application/json", "upsert": "true", "cache-control": "60"},
+    )
+    manifest_doc_cache.set((version, module), doc)
+    logger.info("Published manifest document for %s at version %s (%s rows, %s bytes)", module, version, len(doc["rows"]), len(body))
+    return doc
+
+
+def _download_document(module: str) -> Optional[Dict[str, Any]]:
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key:
+        return None
+    admin = create_service_client(supabase_url, service_key)
+    try:
+        data = storage_circuit.call(admin.storage.from_(MANIFEST_DOC_BUCKET).download, document_path(module))
+        doc = json.loads(data)
+    except Exception as e:
+        logger.info("Manifest document for %s unavailable: %s", module, e)
+        return None
+    if not isinstance(doc, dict) or doc.get("format") != DOC_FORMAT or doc.get("module") != module:
+        return None
+    return doc
+
+
+def document_rows(
+    version: Optional[int], module: str, lesson: Optional[str], score: Optional[int], limit: int
+) -> Optional[List[Dict[str, Any]]]:
+    """Rows from the module's published document, or None when there is no current one.
+
+    A document is fetched with one storage GET and kept for the manifest
+    version it was read at. A missing or outdated document is remembered for
+    MANIFEST_DOC_RETRY_SECONDS and queues a rebuild, so modules never
+    written since deploy still get published.
+    """
+    if version is None:
+        return None
+    key = (version, module)
+    doc = manifest_doc_cache.get(key)
+    if doc is None:
+        doc = _download_document(module)
+        if doc is None or int(doc.get("version") or 0) < version:
+            manifest_doc_cache.set(key, _MISSING_DOC, ttl_seconds=MANIFEST_DOC_RETRY_SECONDS)
+            manifest_publisher.schedule(module)
+            return None
+        manifest_doc_cache.set(key, doc)
+    if doc.get("missing"):
+        return None
+    return match_document(doc, lesson or None, score, limit)
+
+
+class DocumentPublisher:
+    """Debounced, coalescing rebuilds of per-module manifest documents.
+
+    `schedule(module)` (re)arms a per-module timer: the rebuild runs
+    MANIFEST_DOC_DEBOUNCE_SECONDS after the last write, but no later than
+    MANIFEST_DOC_MAX_DELAY_SECONDS after the first, so a bulk edit session
+    publishes each module once. One thread runs the rebuilds in turn, so a
+    module is never rebuilt twice at the same time. Failed rebuilds are
+    retried up to MANIFEST_DOC_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, debounce: float = MANIFEST_DOC_DEBOUNCE_SECONDS, max_delay: float = MANIFEST_DOC_MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        # module -> [due, first_requested, attempts]
+        self._pending: Dict[str, List[float]] = {}
+        self._running: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {"scheduled": 0, "coalesced": 0, "published": 0, "failed": 0}
+        self.last_error: Optional[str] = None
+
+    def schedule(self, module: str, delay: Optional[float] = None, attempts: int = 0) -> None:
+        module = (module or "").strip()
+        if not module:
+            return
+        with self._cond:
+            now = time.monotonic()
+            entry = self._pending.get(module)
+            if entry is None:
+                due = now + (self.debounce if delay is None else delay)
+                self._pending[module] = [due, now, attempts]
+                self._counters["scheduled"] += 1
+            else:
+                entry[0] = min(now + self.debounce, entry[1] + self.max_delay)
+                self._counters["coalesced"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="manifest-publisher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _next_due(self) -> Tuple[str, int]:
+        with self._cond:
+            while True:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                module, entry = min(self._pending.items(), key=lambda item: item[1][0])
+                wait = entry[0] - time.monotonic()
+                if wait <= 0:
+                    del self._pending[module]
+                    self._running = module
+                    return module, int(entry[2])
+                self._cond.wait(wait)
+
+    def _loop(self) -> None:
+        while True:
+            module, attempts = self._next_due()
+            try:
+                rebuild_module_document(module)
+                self._counters["published"] += 1
+            except Exception as e:
+                self.last_error = f"{module}: {e}"
+                if attempts + 1 >= MANIFEST_DOC_MAX_ATTEMPTS:
+                    self._counters["failed"] += 1
+                    logger.info("Manifest document rebuild for %s failed: %s", module, e)
+                else:
+                    self.schedule(module, delay=self.max_delay, attempts=attempts + 1)
+            finally:
+                with self._cond:
+                    self._running = None
+                    self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Run pending rebuilds now and wait up to `timeout` seconds for them."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            for entry in self._pending.values():
+                entry[0] = 0.0
+            self._cond.notify_all()
+            while self._pending or self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    break
+                self._cond.wait(remaining)
+            return not self._pending and not self._running
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            data: Dict[str, Any] = dict(self._counters)
+            data["pending"] = sorted(self._pending)
+            data["running"] = self._running
+        data["last_error"] = self.last_error
+        return data
+
+
+manifest_publisher = DocumentPublisher()
+atexit.register(manifest_publisher.flush)
@@ -0,0 +1,145 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("api3.manifest_snapshot")
+
+# Written at build time by scripts/build_manifest_snapshot.py and bundled via
+# vercel.json `includeFiles`. Set MANIFEST_SNAPSHOT_PATH to "" to disable.
+MANIFEST_SNAPSHOT_PATH = os.getenv(
+    "MANIFEST_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "manifest_snapshot.sqlite3"),
+)
+
+# Columns added by later migrations; snapshots built before them read as null.
+OPTIONAL_COLUMNS = ("storage_bucket", "storage_path", "page_count", "byte_size", "title", "thumbnail_path")
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"loaded": False, "snapshot": None, "hits": 0, "stale": 0}
+
+
+class ManifestSnapshot:
+    """Active `pdf_assets` rows grouped by module, in `lesson, path` order."""
+
+    def __init__(self, version: int, built_at: str, rows: List[Dict[str, Any]]):
+        self.version = version
+        self.built_at = built_at
+        self.row_count = len(rows)
+        self.by_module: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            self.by_module.setdefault(row["module"], []).append(row)
+            self.by_id[row["id"]] = row
+
+    def match(self, module: str, lesson: Optional[str], score: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        """Same filter as the `match_pdf_assets` RPC."""
+        out: List[Dict[str, Any]] = []
+        for row in self.by_module.get(module, ()):
+            if lesson and row["lesson"] != lesson:
+                continue
+            if score is None:
+                if not row["is_default"]:
+                    continue
+            elif (row["score_min"] is not None and row["score_min"] > score) or (
+                row["score_max"] is not None and row["score_max"] < score
+            ):
+                continue
+            out.append(dict(row))
+            if limit and limit > 0 and len(out) >= limit:
+                break
+        return out
+
+
+def _load(path: str) -> Optional[ManifestSnapshot]:
+    if not path or not os.path.exists(path):
+        return None
+    # immutable=1: the bundle is read-only, so skip locking and -wal/-shm files.
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        version = meta.get("manifest_version")
+        if not version:
+            return None
+        rows = []
+        for r in conn.execute("SELECT * FROM pdf_assets ORDER BY ord"):
+            keys = r.keys()
+            row = {
+                "id": r["id"],
+                "module": r["module"],
+                "lesson": r["lesson"],
+                "path": r["path"],
+                "is_default": bool(r["is_default"]),
+                "score_min": r["score_min"],
+                "score_max": r["score_max"],
+                "active": True,
+                "updated_at": r["updated_at"],
+            }
+            row.update({c: r[c] if c in keys else None for c in OPTIONAL_COLUMNS})
+            rows.append(row)
+    finally:
+        conn.close()
+    return ManifestSnapshot(int(version), meta.get("built_at") or "", rows)
+
+
+def get_snapshot() -> Optional[ManifestSnapshot]:
+    """The bundled snapshot, read once per process; None if absent or unreadable."""
+    if _state["loaded"]:
+        return _state["snapshot"]
+    with _lock:
+        if not _state["loaded"]:
+            try:
+                _state["snapshot"] = _load(MANIFEST_SNAPSHOT_PATH)
+            except Exception as e:
+                logger.info("Manifest snapshot unreadable at %s: %s", MANIFEST_SNAPSHOT_PATH, e)
+            _state["loaded"] = True
+    return _state["snapshot"]
+
+
+def snapshot_rows(
+    version: Optional[int], module: str, lesson: Optional[str], score: Optional[int], limit: int
+) -> Optional[List[Dict[str, Any]]]:
+    """Rows from the snapshot if it is at least as new as `version`, else None.
+
+    An unknown version (counter table missing or never polled) counts as
+    stale, because the snapshot could then be arbitrarily old.
+    """
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    if version is None or snapshot.version < version:
+        _state["stale"] += 1
+        return None
+    _state["hits"] += 1
+    return snapshot.match(module, lesson, score, limit)
+
+
+def snapshot_rows_by_id(version: Optional[int], ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Active rows among `ids` from a current snapshot, or None when it is stale.
+
+    The snapshot holds every active row, so an id it lacks is unknown or inactive.
+    """
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    if version is None or snapshot.version < version:
+        _state["stale"] += 1
+        return None
+    _state["hits"] += 1
+    return {i: dict(snapshot.by_id[i]) for i in ids if i in snapshot.by_id}
+
+
+def snapshot_stats() -> Dict[str, Any]:
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return {"loaded": False, "path": MANIFEST_SNAPSHOT_PATH or None}
+    return {
+        "loaded": True,
+        "version": snapshot.version,
+        "built_at": snapshot.built_at,
+        "rows": snapshot.row_count,
+        "hits": _state["hits"],
+        "stale": _state["stale"],
+    }
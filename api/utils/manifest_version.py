@@ -0,0 +1,86 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from .cache import TTLCache
+from .core_supabase import build_supabase_public, create_service_client
+from .circuit import rest_circuit
+from .deadline import call_with_retry
+
+logger = logging.getLogger("api3.manifest_version")
+
+MANIFEST_VERSION_NAME = "pdf_assets"
+MANIFEST_VERSION_POLL_SECONDS = float(os.getenv("MANIFEST_VERSION_POLL_SECONDS") or 15)
+
+# Caches whose contents derive from `pdf_assets`; cleared whenever the
+# shared version counter moves (see scripts/sql/manifest_version.sql).
+manifest_rows_cache = TTLCache("manifest_rows", ttl_seconds=300, max_entries=512)
+signed_url_cache = TTLCache("signed_urls", ttl_seconds=450, max_entries=4096)
+# Single rows for /pdfs/{id}/download, keyed by (version, id).
+manifest_row_cache = TTLCache("manifest_row_ids", ttl_seconds=300, max_entries=4096)
+
+_lock = threading.Lock()
+_state = {"version": None, "checked_at": 0.0}
+
+
+def invalidate_manifest_caches() -> None:
+    manifest_rows_cache.clear()
+    signed_url_cache.clear()
+    manifest_row_cache.clear()
+
+
+def read_manifest_version() -> Optional[int]:
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key:
+        return None
+    admin = create_service_client(supabase_url, service_key)
+    q = (
+        admin.table("manifest_versions")
+        .select("version")
+        .eq("name", MANIFEST_VERSION_NAME)
+        .limit(1)
+    )
+    res = rest_circuit.call(call_with_retry, q.execute, attempts=2)
+    data = getattr(res, "data", None) or []
+    if data and data[0].get("version") is not None:
+        return int(data[0]["version"])
+    return None
+
+
+def get_manifest_version() -> Optional[int]:
+    """Return the shared `pdf_assets` version, polling at most once per interval.
+
+    When the polled value differs from the last one seen, every in-process
+    manifest-derived cache is dropped so this instance converges with the
+    others. Returns None if the counter table is unavailable; callers then
+    fall back to TTL-only caching.
+    """
+    now = time.monotonic()
+    if now - _state["checked_at"] < MANIFEST_VERSION_POLL_SECONDS:
+        return _state["version"]
+    if not _lock.acquire(blocking=False):
+        # Another request is already polling; serve the last known version.
+        return _state["version"]
+    try:
+        try:
+            version = read_manifest_version()
+        except Exception as e:
+            logger.info("Manifest version poll failed: %s", e)
+            version = _state["version"]
+        previous = _state["version"]
+        if version is not None and previous is not None and version != previous:
+            logger.info("Manifest version %s -> %s; invalidating caches", previous, version)
+            invalidate_manifest_caches()
+        _state["version"] = version
+        _state["checked_at"] = time.monotonic()
+        return version
+    finally:
+        _lock.release()
+
+
+def mark_manifest_changed() -> None:
+    """Drop local caches after a write from this instance and force a re-poll."""
+    invalidate_manifest_caches()
+    _state["checked_at"] = 0.0
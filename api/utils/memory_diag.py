@@ -0,0 +1,225 @@
+import linecache
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .cache import all_caches
+from .email_index import email_index
+from .login_limiter import login_limiter
+
+logger = logging.getLogger("api3.memory")
+
+RSS_WATERMARK_MB = float(os.getenv("RSS_WATERMARK_MB") or 0)
+RSS_CHECK_SECONDS = float(os.getenv("RSS_CHECK_SECONDS") or 30)
+MEMORY_SNAPSHOT_LIMIT = int(os.getenv("MEMORY_SNAPSHOT_LIMIT") or 3)
+TRACEMALLOC_GROUP_BY = ("lineno", "filename", "traceback")
+
+# tracemalloc's own bookkeeping and import machinery only add noise to the top sites.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+_snapshots: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_snapshot_lock = threading.Lock()
+_rss_lock = threading.Lock()
+_rss_state = {"checked_at": 0.0, "high_bytes": 0, "above": False, "crossings": 0}
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, from /proc on Linux; None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def check_rss_watermark() -> None:
+    """Log once each time RSS rises above RSS_WATERMARK_MB, checking at most every RSS_CHECK_SECONDS.
+
+    Called after every request, so it is a no-op unless the watermark is
+    set and the check interval has passed. The alarm re-arms when RSS
+    drops back below 90% of the threshold.
+    """
+    if RSS_WATERMARK_MB <= 0:
+        return
+    now = time.monotonic()
+    if now - _rss_state["checked_at"] < RSS_CHECK_SECONDS or not _rss_lock.acquire(blocking=False):
+        return
+    try:
+        _rss_state["checked_at"] = now
+        rss = rss_bytes()
+        if rss is None:
+            return
+        _rss_state["high_bytes"] = max(_rss_state["high_bytes"], rss)
+        threshold = RSS_WATERMARK_MB * 1024 * 1024
+        if rss >= threshold and not _rss_state["above"]:
+            _rss_state["above"] = True
+            _rss_state["crossings"] += 1
+            logger.warning(
+                "RSS %.1f MB crossed watermark %.1f MB",
+                rss / 1048576, RSS_WATERMARK_MB,
+                extra={"rss_bytes": rss, "watermark_bytes": int(threshold)},
+            )
+        elif rss < threshold * 0.9:
+            _rss_state["above"] = False
+    finally:
+        _rss_lock.release()
+
+
+def rss_stats() -> Dict[str, Any]:
+    rss = rss_bytes()
+    if rss is not None:
+        _rss_state["high_bytes"] = max(_rss_state["high_bytes"], rss)
+    return {
+        "rss_bytes": rss,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "observed_high_bytes": _rss_state["high_bytes"] or None,
+        "watermark_mb": RSS_WATERMARK_MB or None,
+        "above_watermark": _rss_state["above"],
+        "watermark_crossings": _rss_state["crossings"],
+    }
+
+
+def _approx_size(obj: Any, depth: int = 3) -> int:
+    """Shallow-plus-children size estimate; shared objects are counted each time they appear."""
+    size = sys.getsizeof(obj)
+    if depth <= 0:
+        return size
+    if isinstance(obj, dict):
+        size += sum(_approx_size(k, depth - 1) + _approx_size(v, depth - 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_approx_size(v, depth - 1) for v in obj)
+    return size
+
+
+def cache_sizes() -> Dict[str, Any]:
+    """Entries and approximate bytes held by every in-process cache in api/utils."""
+    caches: Dict[str, Any] = {}
+    for name, cache in all_caches().items():
+        if cache.backend == "memory":
+            approx = sum(_approx_size(k) + _approx_size(v) for k, v in cache.items())
+        else:
+            approx = cache.stored_bytes()
+        caches[name] = {**cache.stats(), "approx_bytes": approx}
+    index = email_index.stats()
+    caches["email_index"] = {"entries": index.get("entries"), "approx_bytes": index.get("bytes")}
+    failures = login_limiter.items()
+    caches["login_limiter"] = {
+        "entries": len(failures),
+        "max_entries": login_limiter.max_keys,
+        "approx_bytes": sum(_approx_size(k) + _approx_size(v) for k, v in failures),
+    }
+    return caches
+
+
+def tracing_stats() -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "snapshots": list(_snapshots)}
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        "snapshots": list(_snapshots),
+    }
+
+
+def set_tracing(enabled: bool, frames: int = 1) -> Dict[str, Any]:
+    """Start or stop tracemalloc. Stopping also drops stored snapshots."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, min(int(frames), 50)))
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        with _snapshot_lock:
+            _snapshots.clear()
+    return tracing_stats()
+
+
+def _require_tracing() -> None:
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    _require_tracing()
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _format_stat(stat, group_by: str) -> Dict[str, Any]:
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    entry: Dict[str, Any] = {
+        "site": frames[0] if frames else "?",
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+    if group_by == "traceback":
+        entry["traceback"] = frames
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_bytes"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+def store_snapshot(label: Optional[str] = None) -> Dict[str, Any]:
+    """Keep a labelled snapshot for later diffs; only the newest MEMORY_SNAPSHOT_LIMIT are kept."""
+    snapshot = _snapshot()
+    label = (label or "").strip()[:64] or time.strftime("%Y%m%dT%H%M%S")
+    info = {
+        "label": label,
+        "taken_at": time.time(),
+        "traced_bytes": sum(stat.size for stat in snapshot.statistics("filename")),
+        "rss_bytes": rss_bytes(),
+    }
+    with _snapshot_lock:
+        _snapshots.pop(label, None)
+        _snapshots[label] = {**info, "snapshot": snapshot}
+        while len(_snapshots) > MEMORY_SNAPSHOT_LIMIT:
+            _snapshots.popitem(last=False)
+    return info
+
+
+def top_sites(limit: int = 20, group_by: str = "lineno") -> List[Dict[str, Any]]:
+    group_by = group_by if group_by in TRACEMALLOC_GROUP_BY else "lineno"
+    stats = _snapshot().statistics(group_by)
+    return [_format_stat(stat, group_by) for stat in stats[: max(1, limit)]]
+
+
+def diff_snapshots(base: str, against: Optional[str] = None, limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+    """Largest allocation changes from snapshot `base` to `against`, or to now if not given.
+
+    Raises KeyError for an unknown label.
+    """
+    group_by = group_by if group_by in TRACEMALLOC_GROUP_BY else "lineno"
+    with _snapshot_lock:
+        old = _snapshots[base]
+        new = _snapshots[against] if against else None
+    new_snapshot = new["snapshot"] if new else _snapshot()
+    stats = new_snapshot.compare_to(old["snapshot"], group_by)
+    return {
+        "base": base,
+        "against": against or "now",
+        "size_diff_bytes": sum(stat.size_diff for stat in stats),
+        "sites": [_format_stat(stat, group_by) for stat in stats[: max(1, limit)]],
+    }
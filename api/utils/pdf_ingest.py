@@ -0,0 +1,249 @@
+import atexit
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import pymupdf as _fitz  # PyMuPDF: page count, title and thumbnails
+except Exception:
+    try:
+        import fitz as _fitz  # PyMuPDF before 1.24
+    except Exception:
+        _fitz = None
+
+try:
+    import pypdf as _pypdf  # page count and title only
+except Exception:
+    _pypdf = None
+
+from .background import BackgroundQueue
+from .circuit import rest_circuit, storage_circuit
+from .content_store import object_location
+from .core_supabase import build_supabase_public, create_service_client
+from .deadline import call_with_retry
+from .manifest_documents import manifest_publisher
+from .manifest_version import mark_manifest_changed
+from .pdf_proxy import PDF_PROXY_CHUNK_BYTES, ObjectNotFound, open_object_stream
+
+logger = logging.getLogger("api3.pdf_ingest")
+
+PDF_INGEST_WORKERS = int(os.getenv("PDF_INGEST_WORKERS") or 2)
+PDF_INGEST_QUEUE_MAX = int(os.getenv("PDF_INGEST_QUEUE_MAX") or 256)
+# Larger objects only get their byte size recorded.
+PDF_INGEST_MAX_MB = float(os.getenv("PDF_INGEST_MAX_MB") or 100)
+PDF_THUMBNAIL_BUCKET = os.getenv("PDF_THUMBNAIL_BUCKET") or "thumbnails"
+PDF_THUMBNAIL_WIDTH = int(os.getenv("PDF_THUMBNAIL_WIDTH") or 200)
+# Taller first pages (scrolls, slivers) are cropped to their top region.
+PDF_THUMBNAIL_MAX_HEIGHT = int(os.getenv("PDF_THUMBNAIL_MAX_HEIGHT") or 2 * PDF_THUMBNAIL_WIDTH)
+TITLE_MAX_CHARS = 300
+METADATA_FIELDS = ("page_count", "byte_size", "title", "thumbnail_path")
+
+ingest_queue = BackgroundQueue("pdf-ingest", maxsize=PDF_INGEST_QUEUE_MAX, workers=PDF_INGEST_WORKERS)
+atexit.register(ingest_queue.drain)
+
+
+def _service_client():
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key:
+        raise RuntimeError("Supabase service role key required for PDF ingest")
+    return create_service_client(supabase_url, service_key)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def thumbnail_path_for(bucket: str, path: str) -> str:
+    """Thumbnail key for a stored object; rows sharing an object share its thumbnail."""
+    return f"{bucket}/{path}.png"
+
+
+def _clean_title(value: Any) -> Optional[str]:
+    title = " ".join(str(value or "").split())
+    return title[:TITLE_MAX_CHARS] or None
+
+
+def extract_pdf_metadata(file_path: str) -> Dict[str, Any]:
+    """Page count, title and a first-page PNG (`thumbnail`) from a local PDF.
+
+    PyMuPDF provides all three; pypdf only the first two. With neither
+    installed the result is empty.
+    """
+    if _fitz is not None:
+        doc = _fitz.open(file_path)
+        try:
+            meta: Dict[str, Any] = {"page_count": doc.page_count, "title": _clean_title((doc.metadata or {}).get("title"))}
+            if doc.page_count and not doc.needs_pass:
+                page = doc.load_page(0)
+                rect = page.rect
+                zoom = PDF_THUMBNAIL_WIDTH / max(rect.width, 1)
+                clip = _fitz.Rect(rect.x0, rect.y0, rect.x1, min(rect.y1, rect.y0 + PDF_THUMBNAIL_MAX_HEIGHT / zoom))
+                pix = page.get_pixmap(matrix=_fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+                meta["thumbnail"] = pix.tobytes("png")
+            return meta
+        finally:
+            doc.close()
+    if _pypdf is not None:
+        reader = _pypdf.PdfReader(file_path)
+        info = reader.metadata
+        return {"page_count": len(reader.pages), "title": _clean_title(info.title if info else None)}
+    return {}
+
+
+def _download(bucket: str, path: str, out_path: str, max_bytes: int) -> Tuple[int, bool]:
+    """Stream an object to `out_path`; returns `(size, complete)`, skipping the body when over `max_bytes`."""
+    client, resp = open_object_stream(bucket, path)
+    try:
+        length = resp.headers.get("content-length")
+        if length is not None and int(length) > max_bytes:
+            return int(length), False
+        size = 0
+        with open(out_path, "wb") as out:
+            for chunk in resp.iter_bytes(PDF_PROXY_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    return size, False
+                out.write(chunk)
+        return size, True
+    finally:
+        resp.close()
+        client.close()
+
+
+def _shared_metadata(admin, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Metadata of an already ingested row with the same content, so shared bytes are read once."""
+    digest = row.get("content_sha256")
+    if not digest:
+        return None
+    res = rest_circuit.call(
+        call_with_retry,
+        admin.table("pdf_assets")
+        .select(",".join(METADATA_FIELDS))
+        .eq("content_sha256", digest)
+        .neq("id", row["id"])
+        .not_.is_("ingested_at", "null")
+        .is_("ingest_error", "null")
+        .limit(1)
+        .execute,
+    )
+    rows = getattr(res, "data", None) or []
+    if not rows:
+        return None
+    return {**{f: rows[0].get(f) for f in METADATA_FIELDS}, "ingest_error": None}
+
+
+def _extract(admin, row: Dict[str, Any]) -> Dict[str, Any]:
+    bucket, path = object_location(row)
+    result: Dict[str, Any] = {f: None for f in METADATA_FIELDS}
+    fd, tmp = tempfile.mkstemp(prefix="api3-ingest-", suffix=".pdf")
+    os.close(fd)
+    try:
+        try:
+            size, complete = _download(bucket, path, tmp, int(PDF_INGEST_MAX_MB * 1024 * 1024))
+        except ObjectNotFound:
+            return {**result, "ingest_error": "object not found"}
+        result["byte_size"] = size
+        if not complete:
+            return {**result, "ingest_error": f"larger than {PDF_INGEST_MAX_MB:g} MB, not parsed"}
+        if _fitz is None and _pypdf is None:
+            return {**result, "ingest_error": "no PDF parser installed (pymupdf or pypdf)"}
+        try:
+            meta = extract_pdf_metadata(tmp)
+        except Exception as e:
+            # The parser's message names the temporary file; the type is enough.
+            return {**result, "ingest_error": f"unreadable PDF ({e.__class__.__name__})"}
+    finally:
+        _remove_file(tmp)
+    result["page_count"] = meta.get("page_count")
+    result["title"] = meta.get("title")
+    if meta.get("thumbnail"):
+        key = thumbnail_path_for(bucket, path)
+        storage_circuit.call(
+            admin.storage.from_(PDF_THUMBNAIL_BUCKET).upload,
+            key,
+            meta["thumbnail"],
+            {"content-type": "image/png", "upsert": "true", "cache-control": "86400"},
+        )
+        result["thumbnail_path"] = key
+    result["ingest_error"] = None
+    return result
+
+
+def ingest_row(row_id: str, force: bool = False) -> Optional[Dict[str, Any]]:
+    """Store page count, byte size, title and thumbnail on one `pdf_assets` row.
+
+    The object is streamed once to a temporary file; rows whose content was
+    already ingested under the same `content_sha256` copy that result
+    instead. A PDF that cannot be parsed is recorded in `ingest_error` and
+    not retried; storage and REST failures raise so the queue retries.
+    Returns the written fields, or None when there was nothing to do.
+    """
+    admin = _service_client()
+    res = rest_circuit.call(call_with_retry, admin.table("pdf_assets").select("*").eq("id", row_id).limit(1).execute)
+    rows = getattr(res, "data", None) or []
+    if not rows:
+        return None
+    row = rows[0]
+    if "ingested_at" not in row:
+        logger.info("pdf_assets has no ingest columns; run scripts/sql/pdf_metadata.sql")
+        return None
+    if row.get("ingested_at") and not force:
+        return None
+    update = (None if force else _shared_metadata(admin, row)) or _extract(admin, row)
+    update["ingested_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    rest_circuit.call(call_with_retry, admin.table("pdf_assets").update(update).eq("id", row_id).execute)
+    mark_manifest_changed()
+    manifest_publisher.schedule(row.get("module"))
+    if update.get("ingest_error"):
+        logger.info("Ingest of %s: %s", row_id, update["ingest_error"])
+    return update
+
+
+def schedule_ingest(row_ids: List[str], force: bool = False) -> int:
+    """Queue rows for ingest on the bounded worker pool; returns how many were accepted.
+
+    Rows dropped because the queue is full stay un-ingested and are picked
+    up by `scripts/ingest_pdfs.py`.
+    """
+    accepted = 0
+    for row_id in row_ids:
+        if row_id and ingest_queue.submit(ingest_row, row_id, force):
+            accepted += 1
+    return accepted
+
+
+def pending_row_ids(admin, limit: int = 1000) -> List[str]:
+    res = rest_circuit.call(
+        call_with_retry,
+        admin.table("pdf_assets").select("id").is_("ingested_at", "null").order("id", desc=False).limit(limit).execute,
+    )
+    return [r["id"] for r in getattr(res, "data", None) or []]
+
+
+def ingest_pending(*, row_ids: Optional[List[str]] = None, force: bool = False, max_workers: int = PDF_INGEST_WORKERS, limit: int = 1000) -> Dict[str, Any]:
+    """Ingest the given rows (default: rows never ingested) with `max_workers` at a time."""
+    ids = row_ids if row_ids is not None else pending_row_ids(_service_client(), limit)
+    done, skipped, failed = 0, 0, []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [(row_id, pool.submit(ingest_row, row_id, force)) for row_id in ids]
+        for row_id, fut in futures:
+            try:
+                if fut.result() is None:
+                    skipped += 1
+                else:
+                    done += 1
+            except Exception as e:
+                failed.append({"id": row_id, "error": str(e) or e.__class__.__name__})
+    return {"rows": len(ids), "ingested": done, "skipped": skipped, "failed": failed}
+
+
+def pdf_ingest_stats() -> Dict[str, Any]:
+    data = ingest_queue.stats()
+    data["parser"] = "pymupdf" if _fitz is not None else "pypdf" if _pypdf is not None else None
+    return data
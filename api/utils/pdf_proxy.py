@@ -0,0 +1,370 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+try:
+    import httpx as _httpx
+except Exception:
+    _httpx = None
+
+from fastapi.responses import FileResponse
+
+from .cache import TTLCache
+from .circuit import storage_circuit
+from .core_supabase import build_supabase_public
+from .deadline import UPSTREAM_TIMEOUT_SECONDS, call_with_retry, upstream_timeout
+from .manifest_version import get_manifest_version
+
+logger = logging.getLogger("api3.pdf_proxy")
+
+PDF_PROXY_CACHE_DIR = os.getenv("PDF_PROXY_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "api3-pdf-cache")
+PDF_PROXY_CACHE_MAX_MB = float(os.getenv("PDF_PROXY_CACHE_MAX_MB") or 512)
+PDF_PROXY_CHUNK_BYTES = int(os.getenv("PDF_PROXY_CHUNK_BYTES") or 256 * 1024)
+# How long a known storage ETag is trusted before a HEAD re-checks it.
+PDF_PROXY_REVALIDATE_SECONDS = float(os.getenv("PDF_PROXY_REVALIDATE_SECONDS") or 300)
+# Leftover partial downloads from crashed workers are removed after this long.
+PARTIAL_MAX_AGE_SECONDS = 3600
+PARTIAL_PREFIX = ".part-"
+
+# Storage ETags keyed by (manifest version, bucket, path).
+object_etag_cache = TTLCache("storage_etags", ttl_seconds=PDF_PROXY_REVALIDATE_SECONDS, max_entries=4096)
+# (bucket, path, etag) of objects that cannot be cached (too large), so Range
+# requests for them skip straight to a ranged storage GET.
+uncacheable_objects = TTLCache("pdf_uncacheable", ttl_seconds=PDF_PROXY_REVALIDATE_SECONDS, max_entries=1024, backend="memory")
+
+
+class ObjectNotFound(Exception):
+    """The storage object behind a manifest row does not exist."""
+
+
+class PdfFileResponse(FileResponse):
+    """FileResponse reading cached PDFs in PDF_PROXY_CHUNK_BYTES blocks.
+
+    Starlette answers Range and If-Range from the file and hands the path
+    to the server via `http.response.pathsend` where supported (zero-copy);
+    otherwise the larger blocks keep thread hops per response low.
+    """
+
+    chunk_size = PDF_PROXY_CHUNK_BYTES
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class DiskLRU:
+    """Size-bounded LRU of whole storage objects in a local directory.
+
+    Files are named by a digest of `(bucket, path, etag)`, so an overwritten
+    object gets a new file and the old one ages out. Recency is the file
+    mtime, touched on every hit, so workers sharing the directory agree on
+    eviction order; the directory is rescanned before evicting. Objects
+    larger than a quarter of the budget are never stored.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_object_bytes = self.max_bytes // 4
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._scanned = False
+        self._counters = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "errors": 0}
+
+    @staticmethod
+    def file_name(key: Tuple[str, str, str]) -> str:
+        return hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()[:40] + ".pdf"
+
+    def _ensure_dir(self) -> None:
+        if not self._scanned:
+            os.makedirs(self.directory, exist_ok=True)
+            self._scan()
+
+    def _scan(self) -> None:
+        """Rebuild the index from the directory, oldest first; must hold the lock or be single-threaded."""
+        found = []
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        for name in names:
+            full = os.path.join(self.directory, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            if name.startswith(PARTIAL_PREFIX):
+                if now - st.st_mtime > PARTIAL_MAX_AGE_SECONDS:
+                    _remove_file(full)
+                continue
+            found.append((st.st_mtime, name, st.st_size))
+        found.sort()
+        self._entries = OrderedDict((name, size) for _mtime, name, size in found)
+        self._scanned = True
+
+    def lookup(self, key: Tuple[str, str, str]) -> Optional[str]:
+        """Path of the cached object, or None. A hit becomes most recently used."""
+        if not self.max_bytes:
+            return None
+        name = self.file_name(key)
+        full = os.path.join(self.directory, name)
+        with self._lock:
+            try:
+                os.utime(full, None)
+                size = os.path.getsize(full)
+            except OSError:
+                self._entries.pop(name, None)
+                self._counters["misses"] += 1
+                return None
+            self._entries[name] = size
+            self._entries.move_to_end(name)
+            self._counters["hits"] += 1
+        return full
+
+    def partial_path(self) -> Optional[str]:
+        """A fresh temporary file in the cache directory, or None when caching is off or failing."""
+        if not self.max_bytes:
+            return None
+        try:
+            with self._lock:
+                self._ensure_dir()
+            fd, path = tempfile.mkstemp(prefix=PARTIAL_PREFIX, dir=self.directory)
+            os.close(fd)
+            return path
+        except OSError as e:
+            self._counters["errors"] += 1
+            logger.info("PDF cache directory %s unusable: %s", self.directory, e)
+            return None
+
+    def commit(self, partial: str, key: Tuple[str, str, str]) -> Optional[str]:
+        """Move a completed download into place and evict down to the budget."""
+        name = self.file_name(key)
+        full = os.path.join(self.directory, name)
+        try:
+            size = os.path.getsize(partial)
+            if size > self.max_object_bytes:
+                _remove_file(partial)
+                return None
+            os.replace(partial, full)
+        except OSError as e:
+            self._counters["errors"] += 1
+            logger.info("PDF cache commit failed for %s: %s", name, e)
+            _remove_file(partial)
+            return None
+        with self._lock:
+            self._entries[name] = size
+            self._entries.move_to_end(name)
+            self._counters["stored"] += 1
+            self._evict(keep=name)
+        return full
+
+    def _evict(self, keep: str) -> None:
+        if sum(self._entries.values()) <= self.max_bytes:
+            return
+        # Other workers may have added files since our last look.
+        self._scan()
+        total = sum(self._entries.values())
+        for name in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self._entries.pop(name)
+            # An open file stays readable on POSIX, so an in-flight response is unaffected.
+            _remove_file(os.path.join(self.directory, name))
+            self._counters["evicted"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ensure_dir()
+            for name in list(self._entries):
+                _remove_file(os.path.join(self.directory, name))
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self._counters)
+            data.update({
+                "directory": self.directory,
+                "entries": len(self._entries),
+                "bytes": sum(self._entries.values()),
+                "max_bytes": self.max_bytes,
+            })
+        return data
+
+
+pdf_disk_cache = DiskLRU(PDF_PROXY_CACHE_DIR, int(PDF_PROXY_CACHE_MAX_MB * 1024 * 1024))
+
+
+def _object_request(bucket: str, path: str) -> Tuple[str, Dict[str, str]]:
+    if _httpx is None:
+        raise RuntimeError("httpx is required to proxy PDFs")
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key or not supabase_url:
+        raise RuntimeError("Supabase service role key required to proxy PDFs")
+    url = f"{supabase_url.rstrip('/')}/storage/v1/object/authenticated/{quote(bucket, safe='')}/{quote(path)}"
+    return url, {"apikey": service_key, "Authorization": f"Bearer {service_key}"}
+
+
+def _check_status(resp, bucket: str, path: str) -> None:
+    # Storage reports a missing object as 400 with a not_found body on some versions.
+    if resp.status_code in (400, 404):
+        raise ObjectNotFound(f"{bucket}/{path}")
+    resp.raise_for_status()
+
+
+def head_object(bucket: str, path: str):
+    """Response headers of a storage HEAD on the object; raises ObjectNotFound when it is missing."""
+    url, headers = _object_request(bucket, path)
+
+    def _head():
+        resp = _httpx.head(url, headers=headers, timeout=upstream_timeout())
+        _check_status(resp, bucket, path)
+        return resp.headers
+
+    return storage_circuit.call(call_with_retry, _head)
+
+
+def object_etag(bucket: str, path: str) -> str:
+    """Storage ETag of an object, re-checked with a HEAD at most every PDF_PROXY_REVALIDATE_SECONDS.
+
+    Keyed by manifest version as well, so an admin write that re-points or
+    replaces a file is seen at the next version poll.
+    """
+    key = (get_manifest_version(), bucket, path)
+    etag = object_etag_cache.get(key)
+    if etag is None:
+        etag = head_object(bucket, path).get("etag") or ""
+        object_etag_cache.set(key, etag)
+    return etag
+
+
+def open_object_stream(bucket: str, path: str, byte_range: Optional[str] = None):
+    """Start a streamed GET of a storage object; returns `(client, response)`, both to be closed."""
+    url, headers = _object_request(bucket, path)
+    if byte_range:
+        headers["Range"] = byte_range
+
+    def _open():
+        # Connecting honours the request deadline; each body read may take up
+        # to the per-call cap, since large PDFs outlive the request budget.
+        client = _httpx.Client(timeout=_httpx.Timeout(UPSTREAM_TIMEOUT_SECONDS, connect=upstream_timeout()))
+        try:
+            resp = client.send(client.build_request("GET", url, headers=headers), stream=True)
+            try:
+                _check_status(resp, bucket, path)
+            except Exception:
+                resp.close()
+                raise
+        except Exception:
+            client.close()
+            raise
+        return client, resp
+
+    return storage_circuit.call(call_with_retry, _open)
+
+
+def stream_and_cache(bucket: str, path: str, client, resp) -> Iterator[bytes]:
+    """Relay an open storage response in chunks while writing it to the disk cache.
+
+    The copy is committed only once the whole body has arrived (and matches
+    Content-Length when storage sends one); an aborted transfer leaves no file.
+    """
+    etag = resp.headers.get("etag") or ""
+    expected = resp.headers.get("content-length")
+    partial = pdf_disk_cache.partial_path() if etag else None
+    if partial and expected and int(expected) > pdf_disk_cache.max_object_bytes:
+        _remove_file(partial)
+        partial = None
+    out = open(partial, "wb") if partial else None
+    received = 0
+    complete = False
+    try:
+        for chunk in resp.iter_bytes(PDF_PROXY_CHUNK_BYTES):
+            received += len(chunk)
+            if out is not None:
+                out.write(chunk)
+            yield chunk
+        complete = not expected or int(expected) == received
+    finally:
+        resp.close()
+        client.close()
+        if out is not None:
+            out.close()
+            if complete:
+                pdf_disk_cache.commit(partial, (bucket, path, etag))
+                object_etag_cache.set((get_manifest_version(), bucket, path), etag)
+            else:
+                _remove_file(partial)
+
+
+def cached_object(bucket: str, path: str) -> Tuple[Optional[str], str]:
+    """`(local file, etag)` for an object already on disk at its current ETag, else `(None, etag)`."""
+    etag = object_etag(bucket, path)
+    if not etag:
+        return None, etag
+    return pdf_disk_cache.lookup((bucket, path, etag)), etag
+
+
+_fills_lock = threading.Lock()
+_fills_running: set = set()
+_fill_counters = {"fills": 0, "fills_coalesced": 0, "fills_uncacheable": 0}
+
+
+def _count_fill(name: str) -> None:
+    with _fills_lock:
+        _fill_counters[name] += 1
+
+
+def fill_cache(bucket: str, path: str, etag: str) -> Tuple[Optional[str], str]:
+    """Download an object into the disk cache; `(None, etag)` when it cannot be cached now.
+
+    `etag` is the object's current storage ETag (see `cached_object`). Only
+    one fill per object runs at a time; concurrent callers get `(None, etag)`
+    at once and fetch their range from storage instead of waiting. Size and
+    ETag are checked from the response headers before any body is read, so
+    an object too large to cache is never downloaded whole.
+    """
+    if not etag or not pdf_disk_cache.max_bytes or uncacheable_objects.get((bucket, path, etag)):
+        return None, etag
+    with _fills_lock:
+        if (bucket, path) in _fills_running:
+            _fill_counters["fills_coalesced"] += 1
+            return None, etag
+        _fills_running.add((bucket, path))
+    try:
+        client, resp = open_object_stream(bucket, path)
+        etag = resp.headers.get("etag") or ""
+        length = resp.headers.get("content-length")
+        if not etag or length is None or int(length) > pdf_disk_cache.max_object_bytes:
+            resp.close()
+            client.close()
+            if etag:
+                uncacheable_objects.set((bucket, path, etag), True)
+            _count_fill("fills_uncacheable")
+            return None, etag
+        for _chunk in stream_and_cache(bucket, path, client, resp):
+            pass
+        _count_fill("fills")
+        return pdf_disk_cache.lookup((bucket, path, etag)), etag
+    finally:
+        with _fills_lock:
+            _fills_running.discard((bucket, path))
+
+
+def pdf_proxy_stats() -> Dict[str, Any]:
+    data = pdf_disk_cache.stats()
+    with _fills_lock:
+        data.update(_fill_counters)
+        data["fills_running"] = len(_fills_running)
+    return data
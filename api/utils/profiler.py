@@ -0,0 +1,146 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import secrets
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from .admin_checks import admin_for_profile_token
+from .crypto_utils import mask_email_for_log
+
+logger = logging.getLogger("api3.profiler")
+
+PROFILE_HEADER = "x-profile-token"
+PROFILE_QUERY_PARAM = "profile_token"
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "api3-profiles")
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE") or 20)
+PSTATS_SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls", "time")
+
+_PROFILE_ID_RE = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+# cProfile hooks the whole thread, so only one request is profiled at a time.
+_profile_lock = threading.Lock()
+_ring_lock = threading.Lock()
+
+
+def requested_profile_token(request: Request) -> Optional[str]:
+    """The profiling token on a request, if any. This is the only per-request cost when profiling is off."""
+    return request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_QUERY_PARAM)
+
+
+def _profile_path(profile_id: str, ext: str) -> Optional[str]:
+    if not _PROFILE_ID_RE.match(profile_id or ""):
+        return None
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+
+
+def _store_profile(profile_id: str, profiler: cProfile.Profile, meta: Dict[str, Any]) -> None:
+    """Write the pstats dump and its metadata, then trim the ring to PROFILE_RING_SIZE."""
+    with _ring_lock:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(_profile_path(profile_id, "prof"))
+        with open(_profile_path(profile_id, "json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        ids = sorted(_stored_ids(), key=lambda i: int(i.split("-", 1)[0]))
+        for stale in ids[: max(0, len(ids) - PROFILE_RING_SIZE)]:
+            for ext in ("prof", "json"):
+                try:
+                    os.remove(_profile_path(stale, ext))
+                except OSError:
+                    pass
+
+
+def _stored_ids() -> List[str]:
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except OSError:
+        return []
+    return [n[:-5] for n in names if n.endswith(".json") and _PROFILE_ID_RE.match(n[:-5])]
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Metadata of the stored profiles, newest first."""
+    items = []
+    for profile_id in _stored_ids():
+        try:
+            with open(_profile_path(profile_id, "json"), encoding="utf-8") as f:
+                items.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    items.sort(key=lambda m: m.get("created_at") or 0, reverse=True)
+    return items
+
+
+def read_profile_dump(profile_id: str) -> Optional[bytes]:
+    path = _profile_path(profile_id, "prof")
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def render_profile(profile_id: str, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+    """Text report of a stored profile, as printed by pstats."""
+    path = _profile_path(profile_id, "prof")
+    if not path or not os.path.exists(path):
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort if sort in PSTATS_SORT_KEYS else "cumulative").print_stats(max(1, limit))
+    return out.getvalue()
+
+
+async def run_profiled(request: Request, call_next, token: str):
+    """Run the rest of the request under cProfile and keep the result in the ring.
+
+    Only work on the event loop thread is captured. Blocking calls the
+    handler pushes to the threadpool show up as time spent awaiting them.
+    Other requests interleaved on the loop while this one is profiled also
+    show up.
+    """
+    email = await run_in_threadpool(admin_for_profile_token, token)
+    if not email:
+        return JSONResponse(status_code=403, content={"detail": "Invalid profile token"})
+    if not _profile_lock.acquire(blocking=False):
+        response = await call_next(request)
+        response.headers["X-Profile-Status"] = "busy"
+        return response
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+    duration_ms = round((time.perf_counter() - started) * 1000.0, 2)
+    profile_id = f"{time.time_ns()}-{secrets.token_hex(4)}"
+    meta = {
+        "id": profile_id,
+        "created_at": time.time(),
+        "method": request.method,
+        "path": request.url.path,
+        "query_path": request.query_params.get("path") or "",
+        "status": response.status_code,
+        "duration_ms": duration_ms,
+        "admin": mask_email_for_log(email),
+    }
+    try:
+        await run_in_threadpool(_store_profile, profile_id, profiler, meta)
+        response.headers["X-Profile-Id"] = profile_id
+    except OSError as e:
+        logger.info("Failed to store profile %s: %s", profile_id, e)
+        response.headers["X-Profile-Status"] = "store-failed"
+    logger.info("Profiled %s %s in %sms as %s", request.method, request.url.path, duration_ms, profile_id)
+    return response
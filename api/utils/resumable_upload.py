@@ -0,0 +1,197 @@
+import base64
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urljoin
+
+try:
+    import httpx as _httpx
+except Exception:
+    _httpx = None
+
+from .admin_auth import create_upload_token, verify_upload_token
+from .background import background_queue
+from .circuit import rest_circuit, storage_circuit
+from .content_store import register_content
+from .core_supabase import build_supabase_public, create_service_client, create_signed_upload_url
+from .deadline import call_with_retry, upstream_timeout
+from .manifest_documents import manifest_publisher
+from .manifest_version import mark_manifest_changed
+from .pdf_ingest import schedule_ingest
+from .pdf_proxy import ObjectNotFound, head_object
+
+logger = logging.getLogger("api3.resumable_upload")
+
+TUS_VERSION = "1.0.0"
+# Storage's resumable endpoint takes exactly 6 MiB per PATCH, except the last.
+RESUMABLE_CHUNK_BYTES = 6 * 1024 * 1024
+RESUMABLE_MAX_BYTES = int(float(os.getenv("RESUMABLE_UPLOAD_MAX_MB") or 1024) * 1024 * 1024)
+# Signed upload tokens are valid for two hours; the session cannot outlive them.
+UPLOAD_SESSION_TTL_SECONDS = 2 * 3600
+ROW_FIELDS = ("is_default", "score_min", "score_max", "active")
+
+
+class UploadSessionError(Exception):
+    """Invalid, expired or incomplete resumable upload session."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _tus_headers(signature: str) -> Dict[str, str]:
+    return {"Tus-Resumable": TUS_VERSION, "x-signature": signature}
+
+
+def _encode_metadata(values: Dict[str, str]) -> str:
+    return ",".join(f"{key} {base64.b64encode(value.encode('utf-8')).decode('ascii')}" for key, value in values.items())
+
+
+def _create_tus_upload(supabase_url: str, bucket: str, path: str, size: int, signature: str, content_type: str) -> str:
+    """Register the upload with Storage and return its absolute TUS URL."""
+    endpoint = f"{supabase_url.rstrip('/')}/storage/v1/upload/resumable/sign"
+    headers = _tus_headers(signature)
+    headers.update({
+        "Upload-Length": str(size),
+        "Upload-Metadata": _encode_metadata({
+            "bucketName": bucket,
+            "objectName": path,
+            "contentType": content_type,
+            "cacheControl": "3600",
+        }),
+    })
+
+    def _post():
+        resp = _httpx.post(endpoint, headers=headers, timeout=upstream_timeout())
+        resp.raise_for_status()
+        location = resp.headers.get("location")
+        if not location:
+            raise RuntimeError("Storage did not return an upload location")
+        return urljoin(endpoint, location)
+
+    # Not retried: a retry after a lost response would only register a second upload.
+    return storage_circuit.call(_post)
+
+
+def create_upload_session(
+    email: str,
+    module: str,
+    lesson: Optional[str],
+    path: str,
+    size: Optional[int],
+    sha256: Optional[str] = None,
+    content_type: str = "application/pdf",
+) -> Dict[str, Any]:
+    """Start a resumable upload and return what the browser needs to send the chunks.
+
+    The session is a signed token holding the bucket, path, size and TUS URL,
+    so any instance can report progress or finalize it without shared state.
+    Storage tracks the offset; the client PATCHes RESUMABLE_CHUNK_BYTES at a
+    time and, after a dropped connection, resumes from `GET /admin/uploads/{id}`.
+    """
+    if _httpx is None:
+        raise RuntimeError("httpx is required for resumable uploads")
+    module = (module or "").strip()
+    if not module or not path:
+        raise UploadSessionError(400, "module and filename are required")
+    if not size or size <= 0:
+        raise UploadSessionError(400, "size is required for resumable uploads")
+    if size > RESUMABLE_MAX_BYTES:
+        raise UploadSessionError(413, f"File exceeds {RESUMABLE_MAX_BYTES // (1024 * 1024)} MB")
+    _public, service_key, supabase_url = build_supabase_public()
+    info = create_signed_upload_url(supabase_url, service_key, module, path)
+    if not info:
+        raise RuntimeError("Failed to create signed upload token")
+    upload_url = _create_tus_upload(supabase_url, module, path, size, info["token"], content_type)
+    session = {
+        "module": module,
+        "lesson": (lesson or "").strip() or None,
+        "path": path,
+        "size": int(size),
+        "upload_url": upload_url,
+        "signature": info["token"],
+        "sha256": sha256,
+    }
+    return {
+        "upload_id": create_upload_token(email, session, UPLOAD_SESSION_TTL_SECONDS),
+        "module": module,
+        "path": path,
+        "size": int(size),
+        "upload_url": upload_url,
+        "headers": _tus_headers(info["token"]),
+        "chunk_size": RESUMABLE_CHUNK_BYTES,
+        "expires_at": int(time.time()) + UPLOAD_SESSION_TTL_SECONDS,
+    }
+
+
+def load_upload_session(upload_id: str) -> Dict[str, Any]:
+    session = verify_upload_token(upload_id or "")
+    if not session or not session.get("upload_url"):
+        raise UploadSessionError(404, "Upload session not found or expired")
+    return session
+
+
+def upload_progress(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Offset Storage has received so far; `complete` once the object exists at full size."""
+    headers = {"Tus-Resumable": TUS_VERSION, "x-signature": session["signature"]}
+
+    def _head():
+        resp = _httpx.head(session["upload_url"], headers=headers, timeout=upstream_timeout())
+        if resp.status_code in (404, 410):
+            return None
+        resp.raise_for_status()
+        return resp
+
+    resp = storage_circuit.call(call_with_retry, _head)
+    size = int(session["size"])
+    if resp is None:
+        # Storage may forget an upload once it completes; the object tells.
+        complete = _stored_size(session) == size
+        return {"offset": size if complete else 0, "size": size, "complete": complete}
+    offset = int(resp.headers.get("upload-offset") or 0)
+    return {"offset": offset, "size": size, "complete": offset >= size}
+
+
+def _stored_size(session: Dict[str, Any]) -> Optional[int]:
+    try:
+        headers = head_object(session["module"], session["path"])
+    except ObjectNotFound:
+        return None
+    length = headers.get("content-length")
+    return int(length) if length is not None else None
+
+
+def finalize_upload(session: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Create the `pdf_assets` row once the whole object is in storage.
+
+    Safe to repeat: when a row for the same module and path already exists
+    (an earlier finalize whose response was lost), that row is returned.
+    """
+    size = int(session["size"])
+    stored = _stored_size(session)
+    if stored != size:
+        raise UploadSessionError(409, f"Upload incomplete: {stored or 0} of {size} bytes stored")
+    _public, service_key, supabase_url = build_supabase_public()
+    admin = create_service_client(supabase_url, service_key)
+    module, path = session["module"], session["path"]
+    existing = rest_circuit.call(
+        call_with_retry,
+        admin.table("pdf_assets").select("*").eq("module", module).eq("path", path).limit(1).execute,
+    )
+    rows = getattr(existing, "data", None) or []
+    if rows:
+        return {"item": rows[0], "created": False}
+    payload = {"module": module, "lesson": session.get("lesson"), "path": path, "is_default": False, "active": True}
+    payload.update({k: v for k, v in fields.items() if k in ROW_FIELDS and v is not None})
+    res = rest_circuit.call(admin.table("pdf_assets").insert(payload).execute)
+    mark_manifest_changed()
+    manifest_publisher.schedule(module)
+    data = getattr(res, "data", None) or []
+    if session.get("sha256"):
+        # The claimed digest is recorded on the row only once the stored bytes are hashed.
+        background_queue.submit(register_content, session["sha256"], module, path, [r.get("id") for r in data])
+    schedule_ingest([r.get("id") for r in data])
+    logger.info("Finalized resumable upload %s/%s (%s bytes)", module, path, size)
+    return {"item": data[0] if data else None, "created": True}
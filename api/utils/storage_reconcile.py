@@ -0,0 +1,192 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .core_supabase import build_supabase_public, create_service_client, list_storage_objects
+from .circuit import CircuitOpen, rest_circuit
+from .content_store import object_location
+from .deadline import call_with_retry, propagate_deadline
+from .manifest_documents import manifest_publisher
+from .manifest_version import mark_manifest_changed
+
+logger = logging.getLogger("api3.storage_reconcile")
+
+MANIFEST_PAGE_SIZE = 1000
+DEACTIVATE_CHUNK_SIZE = 100
+
+
+def _fetch_rows(admin, column: Optional[str], values: List[str], page_size: int) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        # `*` picks up storage_bucket/storage_path where the dedup columns exist.
+        q = admin.table("pdf_assets").select("*").order("id", desc=False)
+        if column:
+            q = q.in_(column, values)
+        res = rest_circuit.call(call_with_retry, q.range(offset, offset + page_size - 1).execute)
+        page = getattr(res, "data", None) or []
+        rows.extend(page)
+        if len(page) < page_size:
+            break
+        offset += page_size
+    return rows
+
+
+def fetch_manifest_rows(admin, modules: Optional[Iterable[str]] = None, page_size: int = MANIFEST_PAGE_SIZE) -> List[Dict[str, Any]]:
+    """Read every `pdf_assets` row (optionally limited to some modules), page by page.
+
+    With modules, rows of other modules whose deduplicated object lives in
+    one of those buckets are included too, so shared objects are not orphans.
+    """
+    module_list = sorted({(m or "").strip() for m in (modules or []) if (m or "").strip()})
+    if not module_list:
+        return _fetch_rows(admin, None, [], page_size)
+    rows = _fetch_rows(admin, "module", module_list, page_size)
+    try:
+        sharing = _fetch_rows(admin, "storage_bucket", module_list, page_size)
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        # Schema without the content-dedup columns: nothing can share objects.
+        logger.info("storage_bucket lookup skipped: %s", e)
+        sharing = []
+    seen = {r.get("id") for r in rows}
+    rows.extend(r for r in sharing if r.get("id") not in seen)
+    return rows
+
+
+def list_buckets_concurrently(
+    supabase_url: str,
+    service_key: str,
+    buckets: Iterable[str],
+    *,
+    max_workers: int = 8,
+    page_size: int = 1000,
+    admin_client=None,
+) -> Tuple[Dict[str, Set[str]], Dict[str, str]]:
+    """Walk every bucket's folder tree with a bounded pool of listing calls.
+
+    Each folder listing is its own task, so wide buckets and deep lesson trees
+    are listed in parallel. Returns ({bucket: object_paths}, {bucket: error}).
+    A bucket with an error is left out of the first mapping entirely.
+    """
+    objects: Dict[str, Set[str]] = {}
+    errors: Dict[str, str] = {}
+    list_folder = propagate_deadline(list_storage_objects)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        pending = {}
+        for bucket in buckets:
+            objects[bucket] = set()
+            fut = pool.submit(list_folder, supabase_url, service_key, bucket, "", page_size, admin_client)
+            pending[fut] = (bucket, "")
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                bucket, prefix = pending.pop(fut)
+                if bucket in errors:
+                    continue
+                try:
+                    found, folders = fut.result()
+                except Exception as e:
+                    logger.info("Storage listing failed for %s/%s: %s", bucket, prefix, e)
+                    errors[bucket] = str(e) or e.__class__.__name__
+                    continue
+                objects[bucket].update(found)
+                for folder in folders:
+                    child = pool.submit(list_folder, supabase_url, service_key, bucket, folder, page_size, admin_client)
+                    pending[child] = (bucket, folder)
+    for bucket in errors:
+        objects.pop(bucket, None)
+    return objects, errors
+
+
+def deactivate_rows(admin, row_ids: List[str], chunk_size: int = DEACTIVATE_CHUNK_SIZE) -> int:
+    """Flip `active` off for the given manifest rows; returns how many were updated."""
+    updated = 0
+    for start in range(0, len(row_ids), chunk_size):
+        chunk = row_ids[start:start + chunk_size]
+        res = rest_circuit.call(admin.table("pdf_assets").update({"active": False}).in_("id", chunk).execute)
+        data = getattr(res, "data", None)
+        updated += len(data) if isinstance(data, list) else len(chunk)
+    return updated
+
+
+def reconcile_storage_manifest(
+    *,
+    modules: Optional[Iterable[str]] = None,
+    deactivate: bool = False,
+    max_workers: int = 8,
+    page_size: int = 1000,
+) -> Dict[str, Any]:
+    """Diff `pdf_assets` against the storage buckets holding each row's object.
+
+    A row's object is `path` in its module's bucket, or the shared object
+    named by `storage_bucket`/`storage_path` for deduplicated uploads.
+
+    - dangling: active rows whose object is missing from its bucket
+    - orphans: objects in a scanned bucket that no manifest row points at
+
+    Buckets that fail to list are reported under `errors` and excluded from
+    both lists, so an outage never marks healthy rows as dangling. When
+    `deactivate` is set, dangling rows are switched to `active = false` so
+    `/pdfs` stops spending a signing call on them.
+    """
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key:
+        raise RuntimeError("Supabase service role key required for reconciliation")
+    admin = create_service_client(supabase_url, service_key)
+
+    rows = fetch_manifest_rows(admin, modules)
+    buckets = {(m or "").strip() for m in (modules or []) if (m or "").strip()}
+    if not buckets:
+        buckets = {(object_location(r)[0] or "").strip() for r in rows} - {""}
+
+    listed, errors = list_buckets_concurrently(
+        supabase_url,
+        service_key,
+        sorted(buckets),
+        max_workers=max_workers,
+        page_size=page_size,
+        admin_client=admin,
+    )
+
+    referenced: Dict[str, Set[str]] = {b: set() for b in buckets}
+    dangling: List[Dict[str, Any]] = []
+    for row in rows:
+        bucket, path = object_location(row)
+        bucket = (bucket or "").strip()
+        path = (path or "").strip().lstrip("/")
+        referenced.setdefault(bucket, set()).add(path)
+        if bucket not in listed or row.get("active") is False:
+            continue
+        if path not in listed[bucket]:
+            item = {
+                "id": row.get("id"),
+                "module": row.get("module"),
+                "lesson": row.get("lesson"),
+                "path": row.get("path"),
+            }
+            if row.get("storage_bucket"):
+                item.update({"storage_bucket": bucket, "storage_path": path})
+            dangling.append(item)
+
+    orphans: List[Dict[str, str]] = []
+    for bucket, paths in sorted(listed.items()):
+        for path in sorted(paths - referenced.get(bucket, set())):
+            orphans.append({"module": bucket, "path": path})
+
+    deactivated = 0
+    if deactivate and dangling:
+        deactivated = deactivate_rows(admin, [d["id"] for d in dangling if d.get("id")])
+        mark_manifest_changed()
+        for module in sorted({d["module"] for d in dangling}):
+            manifest_publisher.schedule(module)
+
+    return {
+        "rows_checked": len(rows),
+        "buckets": {b: len(listed[b]) for b in sorted(listed)},
+        "errors": errors,
+        "dangling": dangling,
+        "orphans": orphans,
+        "deactivated": deactivated,
+    }
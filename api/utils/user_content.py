@@ -1,76 +1,369 @@
 import logging
+import os
+import time
+import uuid
 from typing import Optional, Dict, List
 
-from .core_supabase import build_supabase_public, create_signed_storage_url
+from .cache import TTLCache
+from .circuit import CircuitOpen, rest_circuit
+from .content_store import object_location
+from .core_supabase import build_supabase_public, create_service_client, create_signed_storage_url
+from .deadline import call_with_retry, is_transient_error
+from .http_cache import compute_etag
+from .manifest_documents import document_rows
+from .manifest_snapshot import snapshot_rows, snapshot_rows_by_id
+from .manifest_version import get_manifest_version, manifest_row_cache, manifest_rows_cache, signed_url_cache
 
 logger = logging.getLogger("api3.user_content")
 
+SIGNED_URL_TTL_SECONDS = 1800
+# Shared caches may keep a /pdfs response for s-maxage and serve it stale for
+# stale-while-revalidate more; both together stay well under the signed-URL
+# lifetime so an edge hit never hands out an expired link.
+PDFS_CACHE_CONTROL = (
+    f"public, max-age=60, s-maxage={SIGNED_URL_TTL_SECONDS // 6}, "
+    f"stale-while-revalidate={SIGNED_URL_TTL_SECONDS // 3}"
+)
 
-def fetch_pdfs_from_manifest(
+# A /pdfs/{id}/download redirect may be reused for s-maxage; the URL it points
+# at was minted at most SIGNED_URL_TTL_SECONDS // 4 earlier, so it still has
+# well over half its lifetime left when the edge copy expires.
+PDF_DOWNLOAD_CACHE_CONTROL = f"public, max-age=60, s-maxage={SIGNED_URL_TTL_SECONDS // 6}"
+PDF_DOWNLOAD_BATCH_LIMIT = 100
+# Routes are served without the `/api` that clients call them under (vercel.json
+# rewrites `/api/:path*` to the function), so links handed to clients carry it.
+API_PUBLIC_PREFIX = "/" + os.getenv("API_PUBLIC_PREFIX", "/api").strip("/")
+PDFS_PUBLIC_BASE = f"{API_PUBLIC_PREFIX.rstrip('/')}/pdfs"
+# "redirect" (default) sends /pdfs/{id}/download to a signed URL; "proxy"
+# serves the bytes through /pdfs/{id}/content for clients that cannot
+# reach storage directly.
+PDF_DOWNLOAD_MODE = (os.getenv("PDF_DOWNLOAD_MODE") or "redirect").strip().lower()
+# Unknown ids are remembered briefly, so a row created meanwhile shows up soon
+# even where the manifest version is unavailable.
+MISSING_ROW_SECONDS = 30
+_MISSING_ROW = {"missing": True}
+
+# Indexed score lookup from scripts/sql/pdf_assets_score_range.sql
+MATCH_PDF_ASSETS_RPC = "match_pdf_assets"
+MATCH_RPC_RETRY_SECONDS = 300
+_match_rpc_state = {"retry_at": 0.0}
+
+# Last successful answers, kept past normal expiry and across manifest
+# version changes. Served only while PostgREST or Storage is failing.
+MANIFEST_LAST_GOOD_SECONDS = 6 * 3600
+SIGNED_URL_SAFETY_SECONDS = 120
+# Pinned to process memory: they must still answer when a shared cache
+# backend is as unreachable as the database.
+manifest_rows_last_good = TTLCache(
+    "manifest_rows_last_good", ttl_seconds=MANIFEST_LAST_GOOD_SECONDS, max_entries=512, backend="memory"
+)
+signed_url_last_good = TTLCache(
+    "signed_urls_last_good", ttl_seconds=SIGNED_URL_TTL_SECONDS, max_entries=4096, backend="memory"
+)
+
+
+def query_manifest_rows(
     *,
     module: str,
     lesson: Optional[str] = None,
     score: Optional[int] = None,
     limit: int = 10,
-    expires_in: int = 1800,
 ) -> List[Dict]:
-    """Query `pdf_assets` manifest by module (and optional lesson/score), return signed URLs."""
-    from supabase import create_client as _create_client
+    """Query active `pdf_assets` rows by module (and optional lesson/score).
 
+    Raises on upstream failure so callers never cache an empty result by mistake.
+    Served from the deploy-time snapshot while it is at least as new as the
+    shared manifest version. Otherwise rows come from the module's published
+    manifest document, or from PostgREST when there is no current one, and
+    are cached (in the configured cache backend) until the version moves.
+    While PostgREST is down (open circuit or transient error) the last good
+    result for the same query is served instead, if there is one.
+    """
     module = (module or "").strip()
-    lesson = (lesson or "").strip() if lesson is not None else None
     if not module:
         return []
+    version = get_manifest_version()
+    cache_key = (module, (lesson or "").strip(), score, limit)
+    rows = snapshot_rows(version, *cache_key)
+    if rows is not None:
+        return rows
+    # The version is part of the shared key, so a worker that has not yet
+    # seen a bump cannot repopulate a shared cache with pre-bump rows.
+    cached = manifest_rows_cache.get((version,) + cache_key)
+    if cached is not None:
+        return cached
     try:
-        _public, service_key, supabase_url = build_supabase_public()
-        if not service_key:
-            return []
-        admin = _create_client(supabase_url, service_key)
-
-        q = (
-            admin
-            .table("pdf_assets")
-            .select("id,module,lesson,path,is_default,score_min,score_max,active")
-            .eq("module", module)
-            .eq("active", True)
-            .order("lesson", desc=False)
-            .order("path", desc=False)
+        rows = document_rows(version, *cache_key)
+        if rows is None:
+            rows = _fetch_manifest_rows(module, lesson, score, limit)
+    except Exception as e:
+        if not isinstance(e, CircuitOpen) and not is_transient_error(e):
+            raise
+        stale = manifest_rows_last_good.get(cache_key)
+        if stale is None:
+            raise
+        logger.info("Serving last good manifest for %s: %s", cache_key, e)
+        return stale
+    manifest_rows_cache.set((version,) + cache_key, rows)
+    manifest_rows_last_good.set(cache_key, rows)
+    return rows
+
+
+def _fetch_manifest_rows(module: str, lesson: Optional[str], score: Optional[int], limit: int) -> List[Dict]:
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key:
+        return []
+    admin = create_service_client(supabase_url, service_key)
+    lesson_filter = (lesson or "").strip() or None
+
+    rows = None
+    if time.monotonic() >= _match_rpc_state["retry_at"]:
+        try:
+            res = rest_circuit.call(call_with_retry, admin.rpc(MATCH_PDF_ASSETS_RPC, {
+                "p_module": module,
+                "p_lesson": lesson_filter,
+                "p_score": score,
+                "p_limit": limit if limit and limit > 0 else None,
+            }).execute)
+            rows = getattr(res, "data", None) or []
+        except Exception as e:
+            if isinstance(e, CircuitOpen) or is_transient_error(e):
+                # Upstream is slow or down, not missing the function.
+                raise
+            # Function not deployed yet (or failing): use the table query for a while.
+            logger.info("%s RPC unavailable, using table query: %s", MATCH_PDF_ASSETS_RPC, e)
+            _match_rpc_state["retry_at"] = time.monotonic() + MATCH_RPC_RETRY_SECONDS
+    if rows is None:
+        rows = _query_manifest_table(admin, module, lesson_filter, score, limit)
+    return rows
+
+
+def _query_manifest_table(admin, module: str, lesson: Optional[str], score: Optional[int], limit: int) -> List[Dict]:
+    """PostgREST table query equivalent to `match_pdf_assets`, for older schemas.
+
+    Selects `*` like the RPC, so rows carry `storage_bucket`/`storage_path`
+    where the content-dedup columns exist and still load where they do not.
+    """
+    q = (
+        admin
+        .table("pdf_assets")
+        .select("*")
+        .eq("module", module)
+        .eq("active", True)
+        .order("lesson", desc=False)
+        .order("path", desc=False)
+    )
+    if lesson:
+        q = q.eq("lesson", lesson)
+    if score is None:
+        q = q.eq("is_default", True)
+    else:
+        # One `or` param holding both bound checks; two separate `or_` calls
+        # emit duplicate `or=` params, which PostgREST does not reliably AND.
+        q = q.or_(
+            f"and(or(score_min.is.null,score_min.lte.{int(score)}),"
+            f"or(score_max.is.null,score_max.gte.{int(score)}))"
         )
+    if limit and limit > 0:
+        q = q.limit(limit)
+    res = rest_circuit.call(call_with_retry, q.execute)
+    return getattr(res, "data", None) or []
 
-        lesson_filter = (lesson or "").strip()
-        if lesson_filter:
-            q = q.eq("lesson", lesson_filter)
-
-        if score is None:
-            q = q.eq("is_default", True)
-        else:
-            q = q.or_(f"score_min.is.null,score_min.lte.{score}")
-            q = q.or_(f"score_max.is.null,score_max.gte.{score}")
-
-        if limit and limit > 0:
-            q = q.limit(limit)
-
-        res = q.execute()
-        items = getattr(res, "data", None) or []
-        out: List[Dict] = []
-        for it in items:
-            mod = it.get("module") or module
-            p = it.get("path")
-            url = create_signed_storage_url(supabase_url, service_key, mod, p, expires_in)
-            if not url:
+
+def _valid_id(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def manifest_rows_by_id(ids: List[str]) -> Dict[str, Dict]:
+    """Active `pdf_assets` rows for `ids`, keyed by id; unknown and inactive ids are left out.
+
+    Answered from the snapshot while it is current, else from the per-id row
+    cache, with one PostgREST `in` query for the ids it does not hold.
+    Malformed ids are dropped before the query, since PostgREST rejects
+    the whole filter for one bad uuid.
+    """
+    wanted = [i for i in dict.fromkeys((i or "").strip() for i in ids) if _valid_id(i)]
+    if not wanted:
+        return {}
+    version = get_manifest_version()
+    rows = snapshot_rows_by_id(version, wanted)
+    if rows is not None:
+        return rows
+    found: Dict[str, Dict] = {}
+    missing: List[str] = []
+    for item_id in wanted:
+        row = manifest_row_cache.get((version, item_id))
+        if row is None:
+            missing.append(item_id)
+        elif not row.get("missing"):
+            found[item_id] = row
+    if missing:
+        by_id = {str(r.get("id")): r for r in _query_rows_by_id(missing)}
+        for item_id in missing:
+            row = by_id.get(item_id)
+            if row is None:
+                manifest_row_cache.set((version, item_id), _MISSING_ROW, ttl_seconds=MISSING_ROW_SECONDS)
                 continue
-            out.append({
-                "id": it.get("id"),
-                "module": mod,
-                "lesson": it.get("lesson"),
-                "path": p,
-                "signed_url": url,
-                "is_default": bool(it.get("is_default")),
-                "score_min": it.get("score_min"),
-                "score_max": it.get("score_max"),
-            })
-        return out
-    except Exception as e:
-        logger.info(f"fetch_pdfs_from_manifest failed: {e}")
+            manifest_row_cache.set((version, item_id), row)
+            found[item_id] = row
+    return found
+
+
+def _query_rows_by_id(ids: List[str]) -> List[Dict]:
+    _public, service_key, supabase_url = build_supabase_public()
+    if not service_key:
         return []
+    admin = create_service_client(supabase_url, service_key)
+    q = (
+        admin.table("pdf_assets")
+        .select("*")
+        .in_("id", ids)
+        .eq("active", True)
+    )
+    res = rest_circuit.call(call_with_retry, q.execute)
+    return getattr(res, "data", None) or []
+
+
+def signed_url_for(bucket: str, path: str, expires_in: int = SIGNED_URL_TTL_SECONDS) -> Optional[str]:
+    """Signed URL for one object, reused while at least 3/4 of its lifetime remains.
+
+    While the storage circuit is open, a previously minted URL that is still
+    valid is returned; without one, CircuitOpen propagates.
+    """
+    key = (bucket, path, expires_in)
+    url = signed_url_cache.get(key)
+    if url:
+        return url
+    _public, service_key, supabase_url = build_supabase_public()
+    try:
+        url = create_signed_storage_url(supabase_url, service_key, bucket, path, expires_in)
+    except CircuitOpen:
+        url = signed_url_last_good.get(key)
+        if url is None:
+            raise
+        return url
+    if url:
+        signed_url_cache.set(key, url, ttl_seconds=expires_in // 4)
+        signed_url_last_good.set(key, url, ttl_seconds=expires_in - SIGNED_URL_SAFETY_SECONDS)
+    return url
+
+
+def _preview_fields(it: Dict, base: str) -> Dict:
+    """Ingest metadata of a listing item; `thumbnail_url` points at `{base}/{id}/thumbnail`."""
+    thumbnail = f"{base.rstrip('/')}/{it.get('id')}/thumbnail" if it.get("thumbnail_path") else None
+    return {
+        "page_count": it.get("page_count"),
+        "byte_size": it.get("byte_size"),
+        "title": it.get("title"),
+        "thumbnail_url": thumbnail,
+    }
 
+
+def sign_manifest_rows(
+    rows: List[Dict], *, module: str, expires_in: int = SIGNED_URL_TTL_SECONDS, thumbnail_base: str = PDFS_PUBLIC_BASE
+) -> List[Dict]:
+    """Attach a signed URL to each manifest row, dropping rows that fail to sign."""
+    out: List[Dict] = []
+    for it in rows:
+        mod = it.get("module") or module
+        p = it.get("path")
+        # Deduplicated rows share one object (and so one signed URL).
+        bucket, key = object_location({**it, "module": mod})
+        url = signed_url_for(bucket, key, expires_in)
+        if not url:
+            continue
+        out.append({
+            "id": it.get("id"),
+            "module": mod,
+            "lesson": it.get("lesson"),
+            "path": p,
+            "signed_url": url,
+            "is_default": bool(it.get("is_default")),
+            "score_min": it.get("score_min"),
+            "score_max": it.get("score_max"),
+            **_preview_fields(it, thumbnail_base),
+        })
+    return out
+
+
+def signed_urls_by_id(ids: List[str], expires_in: int = SIGNED_URL_TTL_SECONDS) -> List[Dict]:
+    """Signed URLs for a batch of ids, in request order; failures are reported per id."""
+    rows = manifest_rows_by_id(ids)
+    out: List[Dict] = []
+    for item_id in dict.fromkeys(i for i in ((i or "").strip() for i in ids) if i):
+        row = rows.get(item_id)
+        if row is None:
+            out.append({"id": item_id, "error": "Not found"})
+            continue
+        url = signed_url_for(*object_location(row), expires_in)
+        if not url:
+            out.append({"id": item_id, "error": "Failed to sign URL"})
+            continue
+        out.append({
+            "id": item_id,
+            "module": row.get("module"),
+            "lesson": row.get("lesson"),
+            "path": row.get("path"),
+            "signed_url": url,
+        })
+    return out
+
+
+def unsigned_manifest_rows(rows: List[Dict], *, module: str, download_base: str = PDFS_PUBLIC_BASE) -> List[Dict]:
+    """Listing items without signed URLs; each points at its `{download_base}/{id}/download` redirect."""
+    base = download_base.rstrip("/")
+    return [
+        {
+            "id": it.get("id"),
+            "module": it.get("module") or module,
+            "lesson": it.get("lesson"),
+            "path": it.get("path"),
+            "download_url": f"{base}/{it.get('id')}/download",
+            "is_default": bool(it.get("is_default")),
+            "score_min": it.get("score_min"),
+            "score_max": it.get("score_max"),
+            **_preview_fields(it, base),
+        }
+        for it in rows
+    ]
+
+
+def signing_epoch() -> int:
+    """Index of the current half signed-URL lifetime.
+
+    Part of a signed listing's ETag, so a body whose URLs may be close to
+    expiry never revalidates with a 304.
+    """
+    return int(time.time()) // (SIGNED_URL_TTL_SECONDS // 2)
+
+
+def manifest_etag(rows: List[Dict], **query) -> str:
+    """Strong validator for a listing: manifest version, query, row ids and newest `updated_at`."""
+    latest = max((str(r.get("updated_at") or "") for r in rows), default="")
+    ids = [r.get("id") for r in rows]
+    return compute_etag(get_manifest_version(), query, latest, ids)
+
+
+def fetch_pdfs_from_manifest(
+    *,
+    module: str,
+    lesson: Optional[str] = None,
+    score: Optional[int] = None,
+    limit: int = 10,
+    expires_in: int = SIGNED_URL_TTL_SECONDS,
+) -> List[Dict]:
+    """Query `pdf_assets` manifest by module (and optional lesson/score), return signed URLs."""
+    module = (module or "").strip()
+    lesson = (lesson or "").strip() if lesson is not None else None
+    if not module:
+        return []
+    try:
+        rows = query_manifest_rows(module=module, lesson=lesson, score=score, limit=limit)
+        return sign_manifest_rows(rows, module=module, expires_in=expires_in)
+    except Exception as e:
+        logger.info("fetch_pdfs_from_manifest failed: %s", e)
+        return []
@@ -1,6 +1,8 @@
 
 import React, { useEffect, useMemo, useState } from "react";
 import { useNavigate } from "react-router-dom";
+import { sha256Hex } from "../utils/contentHash";
+import { RESUMABLE_THRESHOLD, finalizeUpload, uploadResumable } from "../utils/resumableUpload";
 
 function Field({ label, children }) {
   return (
@@ -43,6 +45,7 @@ export default function AdminPdfs() {
   const [editingId, setEditingId] = useState(null);
   const [editItem, setEditItem] = useState(null);
   const [uploading, setUploading] = useState(false);
+  const [uploadProgress, setUploadProgress] = useState(null);
   const createEmptyUpload = (moduleVal = "", lessonVal = "") => ({ module: moduleVal, lesson: lessonVal, is_default: false, score_min: "", score_max: "", active: true, file: null });
   const [upload, setUpload] = useState(createEmptyUpload());
   const [adminEmail, setAdminEmail] = useState("");
@@ -259,6 +262,13 @@ export default function AdminPdfs() {
                 prep.append('module', moduleValue);
                 prep.append('lesson', (upload.lesson || lessonFilter || '').trim());
                 prep.append('filename', upload.file.name);
+                const digest = await sha256Hex(upload.file);
+                if (digest) prep.append('sha256', digest);
+                const resumable = upload.file.size > RESUMABLE_THRESHOLD;
+                if (resumable) {
+                  prep.append('resumable', 'true');
+                  prep.append('size', String(upload.file.size));
+                }
                 const up = await fetch('/api/admin/upload-url', { method: 'POST', body: prep, credentials: 'same-origin' });
                 if (up.status === 401 || up.status === 403) {
                   navigate('/admin/login', { replace: true });
@@ -267,19 +277,36 @@ export default function AdminPdfs() {
                 if (!up.ok) throw new Error(await up.text());
                 const upData = await up.json();
 
-                const uploadUrl = upData.signed_url;
-                const uploadToken = upData.token;
-                if (!uploadUrl || !uploadToken) {
-                  throw new Error('Signed upload URL missing token');
+                if (resumable && !upData.deduplicated) {
+                  // Large scans: chunked and resumable; finalize creates the manifest row.
+                  await uploadResumable(upData, upload.file, (sent, total) => setUploadProgress(Math.floor((sent * 100) / total)));
+                  await finalizeUpload(upData, {
+                    is_default: !!upload.is_default,
+                    score_min: upload.score_min === '' ? null : Number(upload.score_min),
+                    score_max: upload.score_max === '' ? null : Number(upload.score_max),
+                    active: upload.active !== false,
+                  });
+                  await load();
+                  alert('Uploaded successfully');
+                  resetUpload();
+                  return;
+                }
+
+                if (!upData.deduplicated) {
+                  const uploadUrl = upData.signed_url;
+                  const uploadToken = upData.token;
+                  if (!uploadUrl || !uploadToken) {
+                    throw new Error('Signed upload URL missing token');
+                  }
+                  const form = new FormData();
+                  form.append('token', uploadToken);
+                  form.append('file', upload.file, upload.file.name);
+                  const putRes = await fetch(uploadUrl, {
+                    method: 'POST',
+                    body: form,
+                  });
+                  if (!putRes.ok) throw new Error(`Upload to storage failed: ${putRes.status}`);
                 }
-                const form = new FormData();
-                form.append('token', uploadToken);
-                form.append('file', upload.file, upload.file.name);
-                const putRes = await fetch(uploadUrl, {
-                  method: 'POST',
-                  body: form,
-                });
-                if (!putRes.ok) throw new Error(`Upload to storage failed: ${putRes.status}`);
 
                 const manifest = {
                   module: upData.module || moduleValue,
@@ -289,6 +316,10 @@ export default function AdminPdfs() {
                   score_min: upload.score_min === '' ? null : Number(upload.score_min),
                   score_max: upload.score_max === '' ? null : Number(upload.score_max),
                   active: upload.active !== false,
+                  // Same bytes already stored: the row points at the shared object.
+                  content_sha256: upData.sha256 || null,
+                  storage_bucket: upData.storage_bucket || null,
+                  storage_path: upData.storage_path || null,
                 };
                 const manRes = await fetch('/api/admin/pdfs', {
                   method: 'POST',
@@ -303,14 +334,15 @@ export default function AdminPdfs() {
                 if (!manRes.ok) throw new Error(await manRes.text());
 
                 await load();
-                alert('Uploaded successfully');
+                alert(upData.deduplicated ? 'Already stored; linked the existing file' : 'Uploaded successfully');
                 resetUpload();
               } catch (e) {
                 alert(`Upload failed: ${e.message || e}`);
               } finally {
                 setUploading(false);
+                setUploadProgress(null);
               }
-            }}>Upload</button>
+            }}>{uploadProgress === null ? 'Upload' : `Uploading ${uploadProgress}%`}</button>
           </div>
         </div>
       </div>
@@ -2,6 +2,9 @@ import React, { useEffect, useState } from "react";
 import { useLocation } from "react-router-dom";
 import { aesGcmDecryptJson, b64ToBytes } from "../utils/crypto";
 
+// Listings come back unsigned; each item's download_url signs only the PDF that is shown.
+const downloadUrl = (item) => item?.download_url || "";
+
 function Profile() {
   const [displayName, setDisplayName] = useState("");
   const [defaultPdfUrl, setDefaultPdfUrl] = useState("");
@@ -14,11 +17,11 @@ function Profile() {
     // Load default manifest PDFs for 'profile' module (first item used)
     (async () => {
       try {
-        const res = await fetch(`/api/pdfs?module=profile`, { credentials: "same-origin" });
+        const res = await fetch(`/api/pdfs?module=profile&sign=false`, { credentials: "same-origin" });
         if (!res.ok) return;
         const data = await res.json();
         const first = (data.items || [])[0];
-        setDefaultPdfUrl(first?.signed_url || "");
+        setDefaultPdfUrl(downloadUrl(first));
       } catch (e) {
         console.warn("Failed to load default PDFs", e);
       }
@@ -27,13 +30,13 @@ function Profile() {
 
   const loadScorePdf = async (score, setter) => {
     try {
-      const res = await fetch(`/api/pdfs?module=profile&score=${encodeURIComponent(score)}&limit=1`, {
+      const res = await fetch(`/api/pdfs?module=profile&score=${encodeURIComponent(score)}&limit=1&sign=false`, {
         credentials: "same-origin",
       });
       if (!res.ok) return;
       const data = await res.json();
       const first = (data.items || [])[0];
-      setter(first?.signed_url || "");
+      setter(downloadUrl(first));
     } catch (e) {
       console.warn("Failed to load score PDFs", e);
     }
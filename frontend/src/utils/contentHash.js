@@ -0,0 +1,10 @@
+// Files up to this size are hashed before upload so the API can skip bytes it
+// already stores. WebCrypto has no streaming digest, so the file is read whole.
+export const HASH_MAX_BYTES = 256 * 1024 * 1024;
+
+// Hex SHA-256 of a File, or null when it is too large or WebCrypto is unavailable.
+export async function sha256Hex(file) {
+  if (!file || file.size > HASH_MAX_BYTES || !window.crypto?.subtle) return null;
+  const digest = await window.crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+}
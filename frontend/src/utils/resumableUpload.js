@@ -0,0 +1,61 @@
+// Files above this size go through the resumable (TUS) flow instead of one PUT.
+export const RESUMABLE_THRESHOLD = 6 * 1024 * 1024;
+
+const MAX_RETRIES = 5;
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+async function serverOffset(session) {
+  const res = await fetch(`/api/admin/uploads/${session.upload_id}`, { credentials: "same-origin" });
+  if (!res.ok) throw new Error(await res.text());
+  return (await res.json()).offset;
+}
+
+// Sends `file` in `session.chunk_size` pieces to the session's TUS URL. After a
+// failed chunk or an offset conflict (409) it asks the API how much storage
+// already has and resumes there. Conflicts and failed offset lookups count
+// against MAX_RETRIES like any other failure.
+export async function uploadResumable(session, file, onProgress) {
+  let offset = 0;
+  let failures = 0;
+  let resync = false;
+  while (offset < file.size) {
+    try {
+      if (resync) {
+        offset = await serverOffset(session);
+        resync = false;
+        if (offset >= file.size) break;
+      }
+      const chunk = file.slice(offset, offset + session.chunk_size);
+      const res = await fetch(session.upload_url, {
+        method: "PATCH",
+        headers: {
+          ...session.headers,
+          "Upload-Offset": String(offset),
+          "Content-Type": "application/offset+octet-stream",
+        },
+        body: chunk,
+      });
+      if (res.status === 409) throw new Error("Chunk upload failed: offset conflict");
+      if (!res.ok) throw new Error(`Chunk upload failed: ${res.status}`);
+      offset = Number(res.headers.get("Upload-Offset")) || offset + chunk.size;
+      failures = 0;
+      if (onProgress) onProgress(offset, file.size);
+    } catch (e) {
+      failures += 1;
+      if (failures > MAX_RETRIES) throw e;
+      await sleep(Math.min(8000, 500 * 2 ** failures));
+      resync = true;
+    }
+  }
+}
+
+export async function finalizeUpload(session, fields) {
+  const res = await fetch(`/api/admin/uploads/${session.upload_id}/finalize`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    credentials: "same-origin",
+    body: JSON.stringify(fields),
+  });
+  if (!res.ok) throw new Error(await res.text());
+  return res.json();
+}
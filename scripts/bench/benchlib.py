@@ -0,0 +1,120 @@
+"""Shared helpers for the scripts in scripts/bench: percentiles, run metadata, result diffs."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def percentile(ordered: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def summarize(samples: Iterable[float], digits: int = 4) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"n": 0}
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), digits),
+        "p50_ms": round(percentile(ordered, 50), digits),
+        "p95_ms": round(percentile(ordered, 95), digits),
+        "p99_ms": round(percentile(ordered, 99), digits),
+        "max_ms": round(ordered[-1], digits),
+    }
+
+
+def run_metadata(args: Any = None) -> Dict[str, Any]:
+    """Enough context to tell whether two result files are comparable."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items()} if args is not None else {},
+    }
+
+
+def write_json(path: str, data: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def load_json(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(
+    baseline: List[Dict[str, Any]],
+    current: List[Dict[str, Any]],
+    key: Tuple[str, ...],
+    metrics: Dict[str, str],
+    threshold: float,
+) -> List[Dict[str, Any]]:
+    """Diff two result lists matched on `key` fields.
+
+    `metrics` maps a metric name to "lower" or "higher" (which direction is
+    better). Returns one entry per metric that moved the wrong way by more
+    than `threshold` (a fraction, e.g. 0.1 for 10%).
+    """
+    index = {tuple(row.get(k) for k in key): row for row in baseline}
+    regressions = []
+    for row in current:
+        ident = tuple(row.get(k) for k in key)
+        base = index.get(ident)
+        if base is None:
+            continue
+        for metric, better in metrics.items():
+            old, new = base.get(metric), row.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old <= 0:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if better == "lower" else -change > threshold
+            if worse:
+                regressions.append({
+                    **dict(zip(key, ident)),
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change_pct": round(change * 100, 1),
+                })
+    return regressions
+
+
+def print_regressions(regressions: List[Dict[str, Any]], threshold: float, out=None) -> None:
+    out = out or sys.stdout
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%}.", file=out)
+        return
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}:", file=out)
+    for r in regressions:
+        ident = ", ".join(f"{k}={v}" for k, v in r.items() if k not in ("metric", "baseline", "current", "change_pct"))
+        print(f"  {ident}: {r['metric']} {r['baseline']} -> {r['current']} ({r['change_pct']:+}%)", file=out)
+
+
+def format_table(rows: List[Dict[str, Any]], columns: List[str]) -> str:
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) if rows else len(c) for c in columns}
+    lines = ["  ".join(c.ljust(widths[c]) for c in columns)]
+    for r in rows:
+        lines.append("  ".join(str(r.get(c, "")).ljust(widths[c]) for c in columns))
+    return "\n".join(lines)
+
+
+def parse_int_list(value: Optional[str]) -> List[int]:
+    return [int(v) for v in (value or "").split(",") if v.strip()]
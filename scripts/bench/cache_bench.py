@@ -0,0 +1,170 @@
+"""Compare cache backends: get/set latency and stored size for typical payloads.
+
+Usage:
+    python scripts/bench/cache_bench.py [--ops 2000] [--backends memory,sqlite,redis]
+        [--redis-url redis://127.0.0.1:6379/0] [--redis-latency-ms 0]
+        [--out results.json] [--compare baseline.json --threshold 0.2]
+
+Without --redis-url, the redis backend runs against scripts/redis_standin.py
+on a free port, so its numbers show client and protocol cost plus loopback
+round trips, not a real server. The sqlite backend uses a temporary file.
+
+Payloads mirror what the API caches:
+- `signed_url`: one signed storage URL string.
+- `profile`: a `profiles` row as returned by `fetch_profile_admin_sdk`.
+- `manifest_rows_10` / `manifest_rows_100`: pdf_assets rows for one lesson
+  and for a whole module.
+
+`get_hit` reads keys written in the `set` pass. `encoded_bytes` is the JSON
+size stored by the shared backends; the memory backend keeps the object.
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchlib import compare_results, format_table, load_json, print_regressions, run_metadata, summarize, write_json
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+REDIS_STANDIN = os.path.join(REPO_ROOT, "scripts", "redis_standin.py")
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from api.utils import cache_backends  # noqa: E402
+
+
+def _row(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"7f1c1a4e-0000-4000-8000-{i:012d}",
+        "title": f"Lesson {i // 10 + 1} worksheet {i % 10 + 1}",
+        "description": "Practice problems with worked solutions for the lesson.",
+        "module": "module1",
+        "lesson": f"lesson{i // 10 + 1}",
+        "storage_path": f"module1/lesson{i // 10 + 1}/worksheet-{i % 10 + 1}.pdf",
+        "created_at": "2024-05-01T10:00:00+00:00",
+    }
+
+
+PAYLOADS: Dict[str, Any] = {
+    "signed_url": "https://project.supabase.co/storage/v1/object/sign/pdfs/module1/lesson1/worksheet-1.pdf?token="
+    + "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "a" * 180,
+    "profile": {"id": "7f1c1a4e-0000-4000-8000-000000000001", "first_name": "Ada", "last_name": "Lovelace", "full_name": "Ada Lovelace"},
+    "manifest_rows_10": [_row(i) for i in range(10)],
+    "manifest_rows_100": [_row(i) for i in range(100)],
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_tcp(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"Timed out waiting for the Redis stand-in on port {port}")
+
+
+def _make(kind: str, namespace: str, ops: int, sqlite_path: str, redis_url: str):
+    if kind == "sqlite":
+        return cache_backends.SQLiteBackend(namespace, ops, path=sqlite_path)
+    if kind == "redis":
+        return cache_backends.RedisBackend(namespace, ops, client=cache_backends.RespClient(redis_url, timeout=5.0))
+    return cache_backends.MemoryBackend(namespace, ops)
+
+
+def bench_backend(kind: str, payload_name: str, ops: int, sqlite_path: str, redis_url: str) -> List[Dict[str, Any]]:
+    backend = _make(kind, f"bench_{payload_name}", ops, sqlite_path, redis_url)
+    backend.clear()
+    value = PAYLOADS[payload_name]
+    timings: Dict[str, List[float]] = {"set": [], "get_hit": [], "get_miss": []}
+    for i in range(ops):
+        start = time.perf_counter()
+        backend.set(("bench", i), value, 300)
+        timings["set"].append((time.perf_counter() - start) * 1000.0)
+    for i in range(ops):
+        start = time.perf_counter()
+        backend.get(("bench", i))
+        timings["get_hit"].append((time.perf_counter() - start) * 1000.0)
+    for i in range(ops):
+        start = time.perf_counter()
+        backend.get(("missing", i))
+        timings["get_miss"].append((time.perf_counter() - start) * 1000.0)
+    backend.clear()
+    encoded = len(cache_backends.encode_value(value))
+    rows = []
+    for op, samples in timings.items():
+        row = {"backend": kind, "payload": payload_name, "op": op, "encoded_bytes": encoded}
+        row.update(summarize(samples, digits=4))
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=2000, help="Operations per backend, payload and op")
+    parser.add_argument("--backends", default="memory,sqlite,redis")
+    parser.add_argument("--payloads", default=",".join(PAYLOADS))
+    parser.add_argument("--redis-url", help="Use this server instead of starting the stand-in")
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0, help="Stand-in delay per reply")
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --out")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    payloads = [p.strip() for p in args.payloads.split(",") if p.strip()]
+    unknown = [b for b in backends if b not in cache_backends.BACKENDS] + [p for p in payloads if p not in PAYLOADS]
+    if unknown:
+        raise SystemExit(f"Unknown backend or payload: {', '.join(unknown)}")
+
+    procs: List[subprocess.Popen] = []
+    redis_url = args.redis_url
+    tmpdir = tempfile.mkdtemp(prefix="cache-bench-")
+    try:
+        if "redis" in backends and not redis_url:
+            port = _free_port()
+            procs.append(subprocess.Popen(
+                [sys.executable, REDIS_STANDIN, "--port", str(port), "--latency-ms", str(args.redis_latency_ms)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+            _wait_tcp(port)
+            redis_url = f"redis://127.0.0.1:{port}/0"
+        results = []
+        for kind in backends:
+            for payload_name in payloads:
+                results.extend(bench_backend(kind, payload_name, args.ops, os.path.join(tmpdir, "cache.sqlite3"), redis_url or ""))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=5)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(format_table(results, ["backend", "payload", "op", "encoded_bytes", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms"]))
+    report = {"meta": run_metadata(args), "results": results}
+    if args.out:
+        write_json(args.out, report)
+    if args.compare:
+        baseline = load_json(args.compare).get("results", [])
+        regressions = compare_results(
+            baseline, results, key=("backend", "payload", "op"), metrics={"p50_ms": "lower", "p95_ms": "lower"}, threshold=args.threshold
+        )
+        print_regressions(regressions, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
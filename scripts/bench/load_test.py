@@ -0,0 +1,426 @@
+"""End-to-end load test of the API against the local Supabase stand-in.
+
+Usage:
+    python scripts/bench/load_test.py [--concurrency 1,8,32] [--requests 200]
+        [--backend-latency-ms 15] [--only pdfs_limit10,auth_login]
+        [--out results.json] [--compare baseline.json --threshold 0.2]
+
+Starts scripts/supabase_standin.py and `uvicorn api.index:app` as
+subprocesses on free ports (or uses `--target` for an app that is already
+running against a seeded stand-in). Then it drives each scenario at every
+concurrency level and reports throughput and p50/p95/p99 latency. `/auth`
+traffic uses real RSA-OAEP `enc` payloads, encrypted with a throwaway key
+pair handed to the app via AUTH_PRIVATE_KEY_PEM.
+
+Before the scenarios it follows the `download_url` and `thumbnail_url`
+links of a `sign=false` listing with `--api-prefix` stripped, as the
+Vercel rewrite does, and exits 1 if any of them does not resolve.
+
+`--compare` matches scenarios by (scenario, concurrency). It exits 1 if
+p95/p99 latency rose, or throughput fell, by more than `--threshold`.
+Requires httpx, uvicorn and cryptography.
+"""
+import argparse
+import base64
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from benchlib import (
+    compare_results,
+    format_table,
+    load_json,
+    parse_int_list,
+    print_regressions,
+    run_metadata,
+    summarize,
+    write_json,
+)
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+STANDIN = os.path.join(REPO_ROOT, "scripts", "supabase_standin.py")
+USER_PASSWORD = "password123"
+ADMIN_EMAIL = "admin@example.test"
+ADMIN_PASSWORD = "admin-password"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_http(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0, trust_env=False).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+
+class Context:
+    """State shared by scenarios: keys, cookies, ids created during the run."""
+
+    def __init__(self, base_url: str, users: int, modules: int, lessons: int):
+        self.base_url = base_url
+        self.users = users
+        self.modules = modules
+        self.lessons = lessons
+        self.run_id = str(int(time.time()))
+        self.rtk = base64.b64encode(os.urandom(32)).decode()
+        self.public_key = None
+        self.admin_cookie = ""
+        self.user_cookie = ""
+        self.created_ids: List[str] = []
+        self._ids_lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def next(self) -> int:
+        return next(self._counter)
+
+    def enc(self, payload: Dict[str, Any]) -> str:
+        ciphertext = self.public_key.encrypt(
+            json.dumps(payload).encode("utf-8"),
+            padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None),
+        )
+        return base64.b64encode(ciphertext).decode()
+
+    def remember_id(self, response: httpx.Response) -> None:
+        try:
+            item = response.json().get("item") or {}
+        except ValueError:
+            return
+        if item.get("id"):
+            with self._ids_lock:
+                self.created_ids.append(item["id"])
+
+    def take_id(self, pop: bool) -> Optional[str]:
+        with self._ids_lock:
+            if not self.created_ids:
+                return None
+            if pop:
+                return self.created_ids.pop()
+            return self.created_ids[self.next() % len(self.created_ids)]
+
+
+# A scenario returns (method, path, httpx kwargs, optional response hook).
+Request = Tuple[str, str, Dict[str, Any], Optional[Callable[[httpx.Response], None]]]
+
+
+def _auth_login(ctx: Context, i: int) -> Request:
+    email = f"user{i % ctx.users}@example.test"
+    body = {"mode": "login", "enc": ctx.enc({"email": email, "password": USER_PASSWORD, "rtk": ctx.rtk})}
+    return "POST", "/auth", {"json": body}, None
+
+
+def _auth_signup(ctx: Context, i: int) -> Request:
+    email = f"load-{ctx.run_id}-{ctx.next()}@example.test"
+    payload = {"email": email, "password": USER_PASSWORD, "first_name": "Load", "last_name": str(i)}
+    return "POST", "/auth", {"json": {"mode": "signup", "enc": ctx.enc(payload)}}, None
+
+
+def _rewrite_auth_login(ctx: Context, i: int) -> Request:
+    method, _path, kwargs, hook = _auth_login(ctx, i)
+    return method, "/api", {**kwargs, "params": {"path": "auth"}}, hook
+
+
+def _profile(ctx: Context, i: int) -> Request:
+    return "POST", "/profile", {"json": {"rtk": ctx.rtk}, "headers": {"Cookie": ctx.user_cookie}}, None
+
+
+def _pdfs(limit: int, with_score: bool):
+    def build(ctx: Context, i: int) -> Request:
+        params: Dict[str, Any] = {"module": f"module{1 + i % ctx.modules}", "limit": limit}
+        if with_score:
+            params["lesson"] = f"lesson{1 + i % ctx.lessons}"
+            params["score"] = (i * 7) % 100
+        return "GET", "/pdfs", {"params": params}, None
+    return build
+
+
+def _admin_headers(ctx: Context) -> Dict[str, str]:
+    return {"Cookie": ctx.admin_cookie}
+
+
+def _admin_list(ctx: Context, i: int) -> Request:
+    params = {"module": f"module{1 + i % ctx.modules}", "limit": 50}
+    return "GET", "/admin/pdfs", {"params": params, "headers": _admin_headers(ctx)}, None
+
+
+def _admin_create(ctx: Context, i: int) -> Request:
+    body = {"module": "loadtest", "lesson": "bench", "path": f"bench/{ctx.run_id}-{ctx.next()}.pdf"}
+    return "POST", "/admin/pdfs", {"json": body, "headers": _admin_headers(ctx)}, ctx.remember_id
+
+
+def _admin_update(ctx: Context, i: int) -> Request:
+    item_id = ctx.take_id(pop=False) or "missing"
+    body = {"score_min": i % 50, "score_max": 50 + i % 50}
+    return "PUT", f"/admin/pdfs/{item_id}", {"json": body, "headers": _admin_headers(ctx)}, None
+
+
+def _admin_delete(ctx: Context, i: int) -> Request:
+    item_id = ctx.take_id(pop=True) or "missing"
+    return "DELETE", f"/admin/pdfs/{item_id}", {"headers": _admin_headers(ctx)}, None
+
+
+def _rewrite_admin_list(ctx: Context, i: int) -> Request:
+    params = {"path": "admin/pdfs", "module": f"module{1 + i % ctx.modules}", "limit": 20}
+    return "GET", "/api", {"params": params, "headers": _admin_headers(ctx)}, None
+
+
+# Order matters: create fills the ids that update and delete consume.
+SCENARIOS: List[Tuple[str, Callable[[Context, int], Request]]] = [
+    ("pdfs_limit10", _pdfs(10, False)),
+    ("pdfs_limit50", _pdfs(50, False)),
+    ("pdfs_limit100", _pdfs(100, False)),
+    ("pdfs_score", _pdfs(10, True)),
+    ("auth_login", _auth_login),
+    ("auth_signup", _auth_signup),
+    ("rewrite_auth_login", _rewrite_auth_login),
+    ("profile", _profile),
+    ("admin_pdfs_list", _admin_list),
+    ("rewrite_admin_pdfs", _rewrite_admin_list),
+    ("admin_pdfs_create", _admin_create),
+    ("admin_pdfs_update", _admin_update),
+    ("admin_pdfs_delete", _admin_delete),
+]
+NO_WARMUP = {"admin_pdfs_delete"}
+
+
+def run_scenario(ctx: Context, name: str, build, concurrency: int, requests: int, warmup: int) -> Dict[str, Any]:
+    local = threading.local()
+
+    def client() -> httpx.Client:
+        if not hasattr(local, "client"):
+            local.client = httpx.Client(base_url=ctx.base_url, timeout=30.0, trust_env=False)
+        return local.client
+
+    def one(i: int) -> Tuple[float, str]:
+        method, path, kwargs, hook = build(ctx, i)
+        start = time.perf_counter()
+        try:
+            response = client().request(method, path, **kwargs)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            return (time.perf_counter() - start) * 1000.0, e.__class__.__name__
+        elapsed = (time.perf_counter() - start) * 1000.0
+        if hook is not None and response.status_code < 400:
+            hook(response)
+        return elapsed, status
+
+    if name not in NO_WARMUP:
+        for i in range(warmup):
+            one(i)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        outcomes = list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - started
+    statuses: Dict[str, int] = {}
+    for _ms, status in outcomes:
+        statuses[status] = statuses.get(status, 0) + 1
+    errors = sum(n for s, n in statuses.items() if not s.isdigit() or int(s) >= 400)
+    row = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": round(requests / wall, 1) if wall > 0 else 0.0,
+    }
+    row.update(summarize([ms for ms, _status in outcomes], digits=2))
+    return row
+
+
+def _login_cookies(ctx: Context) -> None:
+    with httpx.Client(base_url=ctx.base_url, timeout=30.0, trust_env=False) as c:
+        r = c.post("/admin/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        if r.status_code == 200 and r.cookies.get("admin_session"):
+            ctx.admin_cookie = f"admin_session={r.cookies['admin_session']}"
+        else:
+            print(f"WARNING: admin login failed ({r.status_code}); admin scenarios will error", file=sys.stderr)
+        r = c.post("/auth", json={"mode": "login", "email": "user0@example.test", "password": USER_PASSWORD})
+        if r.status_code == 200 and r.cookies.get("sb_access_token"):
+            ctx.user_cookie = f"sb_access_token={r.cookies['sb_access_token']}"
+        else:
+            print(f"WARNING: user login failed ({r.status_code}); /profile will error", file=sys.stderr)
+
+
+def _check_listing_links(ctx: Context, api_prefix: str) -> List[str]:
+    """Follow the links a `sign=false` listing hands out, as a client behind the rewrite would.
+
+    Each `download_url` / `thumbnail_url` must start with `api_prefix`; the
+    prefix is stripped, as vercel.json's rewrite does, and the route must
+    answer 302 (or 404 for a thumbnail). Returns the problems found.
+    """
+    prefix = "/" + api_prefix.strip("/")
+    problems: List[str] = []
+    with httpx.Client(base_url=ctx.base_url, timeout=30.0, trust_env=False) as c:
+        r = c.get("/pdfs", params={"module": "module1", "limit": 5, "sign": "false"})
+        items = r.json().get("items", []) if r.status_code == 200 else []
+        if not items:
+            return [f"/pdfs?sign=false returned {r.status_code} with no items"]
+        for item in items:
+            # A thumbnail is null until ingest has run, and 404 if ingest found none.
+            for field, allowed in (("download_url", {302}), ("thumbnail_url", {302, 404})):
+                url = item.get(field)
+                if url is None and field == "thumbnail_url":
+                    continue
+                if not url or not url.startswith(prefix + "/"):
+                    problems.append(f"{field} {url!r} does not start with {prefix}/")
+                    continue
+                status = c.get(url[len(prefix):]).status_code
+                if status not in allowed:
+                    problems.append(f"{field} {url} answered {status}")
+    return problems
+
+
+def _start_stack(args, private_pem: str) -> Tuple[str, List[subprocess.Popen]]:
+    backend_port, app_port = _free_port(), _free_port()
+    log = open(args.log, "ab") if args.log else subprocess.DEVNULL
+    standin = subprocess.Popen(
+        [
+            sys.executable, STANDIN, "--port", str(backend_port),
+            "--latency-ms", str(args.backend_latency_ms), "--jitter-ms", str(args.backend_jitter_ms),
+            "--error-rate", str(args.backend_error_rate), "--users", str(args.users),
+            "--modules", str(args.modules), "--lessons", str(args.lessons),
+        ],
+        stdout=log, stderr=log,
+    )
+    env = dict(os.environ)
+    env.update({
+        "SUPABASE_URL": f"http://127.0.0.1:{backend_port}",
+        "SUPABASE_ANON_KEY": "anon",
+        "SUPABASE_SERVICE_ROLE_KEY": "service",
+        "AUTH_PRIVATE_KEY_PEM": private_pem,
+    })
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.index:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=log, stderr=log,
+    )
+    procs = [standin, app]
+    try:
+        _wait_http(f"http://127.0.0.1:{backend_port}/__standin/stats")
+        _wait_http(f"http://127.0.0.1:{app_port}/")
+    except SystemExit:
+        for p in procs:
+            p.terminate()
+        raise
+    return f"http://127.0.0.1:{app_port}", procs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", help="Base URL of an already running app (skips starting the stack)")
+    parser.add_argument("--public-key", help="PEM public key matching the target's AUTH_PRIVATE_KEY_PEM (with --target)")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests before each run")
+    parser.add_argument("--only", help="Comma-separated scenario names")
+    parser.add_argument("--backend-latency-ms", type=float, default=15.0)
+    parser.add_argument("--backend-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--backend-error-rate", type=float, default=0.0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--modules", type=int, default=4)
+    parser.add_argument("--lessons", type=int, default=10)
+    parser.add_argument("--api-prefix", default="/api", help="API_PUBLIC_PREFIX the app builds links with")
+    parser.add_argument("--log", help="Append stand-in and app output to this file")
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --out")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+
+    names = [n for n, _ in SCENARIOS]
+    selected = [n.strip() for n in (args.only or "").split(",") if n.strip()] or names
+    unknown = sorted(set(selected) - set(names))
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}; choose from {', '.join(names)}")
+
+    procs: List[subprocess.Popen] = []
+    if args.target:
+        if not args.public_key:
+            parser.error("--public-key is required with --target")
+        with open(args.public_key, "rb") as f:
+            public_key = serialization.load_pem_public_key(f.read())
+        base_url = args.target.rstrip("/")
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public_key = private_key.public_key()
+        base_url, procs = _start_stack(args, private_pem)
+
+    results: List[Dict[str, Any]] = []
+    app_metrics: Dict[str, Any] = {}
+    link_problems: List[str] = []
+    try:
+        ctx = Context(base_url, args.users, args.modules, args.lessons)
+        ctx.public_key = public_key
+        _login_cookies(ctx)
+        link_problems = _check_listing_links(ctx, args.api_prefix)
+        for problem in link_problems:
+            print(f"WARNING: listing link check: {problem}", file=sys.stderr)
+        for name, build in SCENARIOS:
+            if name not in selected:
+                continue
+            for concurrency in parse_int_list(args.concurrency):
+                row = run_scenario(ctx, name, build, concurrency, args.requests, args.warmup)
+                results.append(row)
+                print(
+                    f"{name:<20} c={concurrency:<3} {row['throughput_rps']:>8} rps  "
+                    f"p50={row.get('p50_ms')}ms p95={row.get('p95_ms')}ms p99={row.get('p99_ms')}ms  "
+                    f"errors={row['errors']}",
+                    file=sys.stderr,
+                )
+        if ctx.admin_cookie:
+            try:
+                app_metrics = httpx.get(
+                    f"{base_url}/admin/metrics", headers={"Cookie": ctx.admin_cookie}, timeout=10.0, trust_env=False
+                ).json()
+            except (httpx.HTTPError, ValueError):
+                app_metrics = {}
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    print(format_table(results, ["scenario", "concurrency", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors"]))
+    report = {"meta": run_metadata(args), "results": results, "app_metrics": app_metrics, "link_problems": link_problems}
+    if args.out:
+        write_json(args.out, report)
+
+    if args.compare:
+        baseline = load_json(args.compare).get("results", [])
+        regressions = compare_results(
+            baseline,
+            results,
+            key=("scenario", "concurrency"),
+            metrics={"p95_ms": "lower", "p99_ms": "lower", "throughput_rps": "higher"},
+            threshold=args.threshold,
+        )
+        print_regressions(regressions, args.threshold)
+        return 1 if regressions or link_problems else 0
+    return 1 if link_problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Measure per-request logging overhead: no logging vs a synchronous handler vs the queue pipeline.
+
+Usage:
+    python scripts/bench/logging_bench.py [--requests 2000] [--sink-delay-ms 0.2]
+        [--out results.json] [--compare baseline.json --threshold 0.2]
+
+Sends GET `/` through the real app (request logging, admission control
+and catch-all routing all included) with Starlette's TestClient, in
+three modes:
+- `off`: no handlers, and records below WARNING are skipped.
+- `sync`: a StreamHandler with the JSON formatter, writing on the request
+  path. This is what `logging.basicConfig` did.
+- `queue`: `configure_logging()`, where the request thread only enqueues.
+
+The sink is a null stream that sleeps `--sink-delay-ms` per write, standing
+in for a slow or backpressured stdout. A per-call microbenchmark of
+`logger.info("%s %s", ...)` on the caller thread is reported alongside.
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchlib import compare_results, format_table, load_json, print_regressions, run_metadata, summarize, write_json  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api.index import app  # noqa: E402
+from api.utils import logging_setup  # noqa: E402
+
+MODES = ("off", "sync", "queue")
+
+
+class SlowSink(io.TextIOBase):
+    """Write-only stream that discards data after sleeping, like a slow pipe."""
+
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+        self.writes = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        return len(s)
+
+
+def _set_mode(mode: str, sink: SlowSink) -> None:
+    root = logging.getLogger()
+    logging_setup.shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if mode == "off":
+        root.setLevel(logging.WARNING)
+    elif mode == "sync":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging_setup.JsonFormatter())
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        logging_setup.configure_logging(stream=sink, force=True)
+        root.setLevel(logging.INFO)
+
+
+def bench_requests(client: TestClient, requests: int, warmup: int):
+    for _ in range(warmup):
+        client.get("/")
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get("/")
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def bench_log_calls(calls: int):
+    log = logging.getLogger("api3.bench")
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        log.info("%s %s", "GET", "/pdfs", extra={"status": 200, "duration_ms": 1.5})
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--log-calls", type=int, default=20000, help="Calls for the per-call microbenchmark")
+    parser.add_argument("--sink-delay-ms", type=float, default=0.2, help="Sleep per write in the sink")
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --out")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+
+    results = []
+    with TestClient(app) as client:
+        for mode in MODES:
+            for bench in ("request", "log_call"):
+                sink = SlowSink(args.sink_delay_ms / 1000.0)
+                _set_mode(mode, sink)
+                if bench == "request":
+                    samples = bench_requests(client, args.requests, args.warmup)
+                else:
+                    samples = bench_log_calls(args.log_calls)
+                logging_setup.shutdown_logging()  # flush the queue before counting writes
+                row = {"bench": bench, "mode": mode, "sink_writes": sink.writes}
+                row.update(summarize(samples, digits=4))
+                results.append(row)
+        _set_mode("off", SlowSink(0))
+
+    print(format_table(results, ["bench", "mode", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]))
+    report = {"meta": run_metadata(args), "results": results}
+    if args.out:
+        write_json(args.out, report)
+    if args.compare:
+        baseline = load_json(args.compare).get("results", [])
+        regressions = compare_results(
+            baseline, results, key=("bench", "mode"), metrics={"p50_ms": "lower", "p95_ms": "lower"}, threshold=args.threshold
+        )
+        print_regressions(regressions, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Microbenchmarks for the pure-Python helpers that run on every request.
+
+Usage:
+    python scripts/bench/micro_bench.py [--repeat 30] [--only mask_email_for_log]
+        [--out results.json] [--update-baseline]
+        [--compare [scripts/bench/baselines/micro_bench.json] --threshold 0.25]
+
+Each case is warmed up first. The number of calls per sample is then
+calibrated so that one sample takes at least `--min-sample-ms`. Timings
+are taken with the garbage collector disabled, like timeit, and
+summarized as median/mean/stdev/min/p95 nanoseconds per call.
+
+Memory is measured separately under tracemalloc:
+- `alloc_peak_bytes`: the peak traced memory during a single call.
+- `retained_bytes`: memory still held per call after `--alloc-calls`
+  calls, which should be ~0 unless something leaks or caches.
+
+Warmup and the retained-memory loop stop after about a second, so slow
+cases such as RSA decryption stay bounded.
+
+The baseline depends on the machine. Regenerate it with --update-baseline
+on the machine you compare on. `--compare` exits 1 when median_ns or
+alloc_peak_bytes grows by more than `--threshold`. Needs cryptography for
+the AES/RSA cases, which are skipped without it.
+"""
+import argparse
+import base64
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchlib import compare_results, format_table, load_json, percentile, print_regressions, run_metadata, write_json
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "micro_bench.json")
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("ADMIN_SESSION_SECRET", "micro-bench-secret")
+
+try:
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding, rsa
+except Exception:  # pragma: no cover - optional dependency guard
+    rsa = None  # type: ignore
+
+Case = Tuple[str, Callable[[], Any]]
+
+PASSWORD_HASH = "$2b$12$" + "a" * 53
+ADMIN_ROW = {
+    "email": "admin@example.test",
+    "password_hash": PASSWORD_HASH,
+    "force_password_change": False,
+    "must_reset_password": None,
+    "password_updated_at": "2024-05-01T10:00:00+00:00",
+}
+PROFILE = {
+    "id": "0b6f3d4e-1f0a-4c8e-9a57-3f1c2d9e8b71",
+    "email": "ada.lovelace@example.test",
+    "first_name": "Ada",
+    "last_name": "Lovelace",
+    "full_name": "Ada Lovelace",
+}
+
+
+def _install_rsa_key():
+    """Generate a throwaway key for decrypt_auth_payload; returns its public half."""
+    if rsa is None:
+        return None
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    os.environ["AUTH_PRIVATE_KEY_PEM"] = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    return key.public_key()
+
+
+def build_cases() -> List[Case]:
+    public_key = _install_rsa_key()
+
+    from api.utils.admin_auth import _decode_payload, _sign, _verify_token, create_session_token, requires_password_change
+    from api.utils.admin_checks import derive_upload_path, normalize_admin_path
+    from api.utils.crypto_utils import AESGCM, aesgcm_encrypt_profile, decrypt_auth_payload, mask_email_for_log
+
+    token = create_session_token("admin@example.test", PASSWORD_HASH)
+    body = token.split(".", 1)[0]
+    cases: List[Case] = [
+        ("normalize_admin_path", lambda: normalize_admin_path("/api/index/Admin/PDFs/1234?limit=50")),
+        ("derive_upload_path_folder", lambda: derive_upload_path("module1/lesson3", "notes.pdf")),
+        ("derive_upload_path_file", lambda: derive_upload_path("/module1/lesson3/notes.pdf/ ", "ignored.pdf")),
+        ("mask_email_for_log", lambda: mask_email_for_log("ada.lovelace@example.test")),
+        ("requires_password_change", lambda: requires_password_change(ADMIN_ROW, True)),
+        ("admin_sign", lambda: _sign(body, PASSWORD_HASH, "session")),
+        ("admin_verify_token", lambda: _verify_token(token, PASSWORD_HASH, "session")),
+        ("admin_decode_payload", lambda: _decode_payload(token)),
+    ]
+    if AESGCM is not None:
+        rtk = base64.b64encode(os.urandom(32)).decode()
+        cases.append(("aesgcm_encrypt_profile", lambda: aesgcm_encrypt_profile(rtk, PROFILE)))
+    if public_key is not None:
+        plaintext = json.dumps({"email": "ada.lovelace@example.test", "password": "password123"}).encode()
+        enc = base64.b64encode(public_key.encrypt(
+            plaintext,
+            padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None),
+        )).decode()
+        cases.append(("decrypt_auth_payload", lambda: decrypt_auth_payload(enc)))
+    return cases
+
+
+def _time_loops(fn: Callable[[], Any], loops: int) -> int:
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter_ns() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _run_for(fn: Callable[[], Any], calls: int, budget_s: float = 1.0) -> int:
+    """Call fn up to `calls` times, stopping early once `budget_s` has elapsed."""
+    stop = time.perf_counter() + budget_s
+    for done in range(1, calls + 1):
+        fn()
+        if time.perf_counter() >= stop:
+            return done
+    return calls
+
+
+def _calibrate(fn: Callable[[], Any], min_sample_ns: int) -> int:
+    loops = 1
+    while True:
+        if _time_loops(fn, loops) >= min_sample_ns or loops >= 1 << 22:
+            return loops
+        loops *= 2
+
+
+def _measure_memory(fn: Callable[[], Any], calls: int) -> Dict[str, int]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()  # first traced call pays one-off lazy imports and caches
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        before, _ = tracemalloc.get_traced_memory()
+        calls = _run_for(fn, calls)
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_bytes": max(0, peak - base), "retained_bytes": max(0, after - before) // max(1, calls)}
+
+
+def run_case(name: str, fn: Callable[[], Any], args) -> Dict[str, Any]:
+    _run_for(fn, args.warmup)
+    loops = _calibrate(fn, int(args.min_sample_ms * 1e6))
+    per_call = sorted(_time_loops(fn, loops) / loops for _ in range(args.repeat))
+    row: Dict[str, Any] = {
+        "case": name,
+        "loops": loops,
+        "samples": len(per_call),
+        "median_ns": round(statistics.median(per_call), 1),
+        "mean_ns": round(statistics.fmean(per_call), 1),
+        "stdev_ns": round(statistics.stdev(per_call), 1) if len(per_call) > 1 else 0.0,
+        "min_ns": round(per_call[0], 1),
+        "p95_ns": round(percentile(per_call, 95), 1),
+    }
+    row.update(_measure_memory(fn, args.alloc_calls))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=30, help="Timed samples per case")
+    parser.add_argument("--warmup", type=int, default=200, help="Untimed calls before calibrating")
+    parser.add_argument("--min-sample-ms", type=float, default=20.0, help="Minimum duration of one sample")
+    parser.add_argument("--alloc-calls", type=int, default=200, help="Calls used to measure retained memory")
+    parser.add_argument("--only", help="Comma-separated case names")
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--update-baseline", action="store_true", help=f"Write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="Baseline JSON (default: the checked-in one)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+
+    cases = build_cases()
+    names = [n for n, _ in cases]
+    selected = [n.strip() for n in (args.only or "").split(",") if n.strip()] or names
+    unknown = sorted(set(selected) - set(names))
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}; choose from {', '.join(names)}")
+
+    results = []
+    for name, fn in cases:
+        if name in selected:
+            results.append(run_case(name, fn, args))
+            print(f"{name:<26} {results[-1]['median_ns']:>12} ns/call", file=sys.stderr)
+
+    print(format_table(results, ["case", "median_ns", "p95_ns", "stdev_ns", "min_ns", "alloc_peak_bytes", "retained_bytes"]))
+    report = {"meta": run_metadata(args), "results": results}
+    if args.out:
+        write_json(args.out, report)
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(DEFAULT_BASELINE), exist_ok=True)
+        write_json(DEFAULT_BASELINE, report)
+
+    if args.compare:
+        baseline = load_json(args.compare).get("results", [])
+        regressions = compare_results(
+            baseline,
+            results,
+            key=("case",),
+            metrics={"median_ns": "lower", "alloc_peak_bytes": "lower"},
+            threshold=args.threshold,
+        )
+        print_regressions(regressions, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
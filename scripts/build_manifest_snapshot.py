@@ -0,0 +1,143 @@
+"""Export active `pdf_assets` rows to a SQLite snapshot bundled with the API function.
+
+Usage:
+    python scripts/build_manifest_snapshot.py [--out api/data/manifest_snapshot.sqlite3]
+        [--page-size 1000] [--optional]
+
+Reads SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY from the environment and
+talks to PostgREST with the standard library only, so it runs in the
+frontend build image before `npm run build`. `--optional` turns missing
+credentials or an unreachable project into a warning and exit 0: the API
+then queries PostgREST as before.
+
+The manifest version is read before the rows. If an admin write lands
+during the export, the snapshot is stamped with the older version and
+`/pdfs` falls back to live queries, never to rows that may be missing
+the write. Rows are stored in PostgREST's `lesson, path` order so
+the snapshot sorts exactly like `match_pdf_assets`.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from urllib import parse as _urlparse
+from urllib import request as _urlreq
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_OUT = os.path.join(REPO_ROOT, "api", "data", "manifest_snapshot.sqlite3")
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE pdf_assets (
+    ord INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    module TEXT NOT NULL,
+    lesson TEXT,
+    path TEXT NOT NULL,
+    is_default INTEGER NOT NULL,
+    score_min INTEGER,
+    score_max INTEGER,
+    updated_at TEXT,
+    storage_bucket TEXT,
+    storage_path TEXT,
+    page_count INTEGER,
+    byte_size INTEGER,
+    title TEXT,
+    thumbnail_path TEXT
+);
+CREATE INDEX pdf_assets_lookup ON pdf_assets (module, lesson, ord);
+"""
+
+
+def _get_json(supabase_url: str, service_key: str, table: str, params: Dict[str, Any]) -> Any:
+    url = f"{supabase_url.rstrip('/')}/rest/v1/{table}?{_urlparse.urlencode(params)}"
+    headers = {"apikey": service_key, "Authorization": f"Bearer {service_key}", "Accept": "application/json"}
+    with _urlreq.urlopen(_urlreq.Request(url, headers=headers), timeout=30) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def read_manifest_version(supabase_url: str, service_key: str) -> Optional[int]:
+    data = _get_json(supabase_url, service_key, "manifest_versions", {"select": "version", "name": "eq.pdf_assets", "limit": 1})
+    if data and data[0].get("version") is not None:
+        return int(data[0]["version"])
+    return None
+
+
+def fetch_active_rows(supabase_url: str, service_key: str, page_size: int) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    while True:
+        page = _get_json(supabase_url, service_key, "pdf_assets", {
+            # `*` so projects without the content-dedup or ingest columns still export.
+            "select": "*",
+            "active": "is.true",
+            # id breaks ties so offset paging never skips or repeats a row.
+            "order": "module.asc,lesson.asc,path.asc,id.asc",
+            "limit": page_size,
+            "offset": len(rows),
+        })
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+
+def write_snapshot(out: str, rows: List[Dict[str, Any]], version: Optional[int]) -> None:
+    """Write to a temporary file and rename, so a reader never sees a partial file."""
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    tmp = f"{out}.tmp-{os.getpid()}"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO pdf_assets (ord, id, module, lesson, path, is_default, score_min, score_max, updated_at,"
+            " storage_bucket, storage_path, page_count, byte_size, title, thumbnail_path)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (i, r.get("id"), r.get("module"), r.get("lesson"), r.get("path"), 1 if r.get("is_default") else 0,
+                 r.get("score_min"), r.get("score_max"), r.get("updated_at"), r.get("storage_bucket"), r.get("storage_path"),
+                 r.get("page_count"), r.get("byte_size"), r.get("title"), r.get("thumbnail_path"))
+                for i, r in enumerate(rows)
+            ],
+        )
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ("manifest_version", "" if version is None else str(version)),
+            ("built_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())),
+            ("row_count", str(len(rows))),
+        ])
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--optional", action="store_true", help="Warn and exit 0 instead of failing")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv("SUPABASE_URL")
+    service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    try:
+        if not supabase_url or not service_key:
+            raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY are required")
+        version = read_manifest_version(supabase_url, service_key)
+        if version is None:
+            # Without the counter the API could never tell the snapshot is stale.
+            raise RuntimeError("manifest_versions has no pdf_assets row; run scripts/sql/manifest_version.sql")
+        rows = fetch_active_rows(supabase_url, service_key, args.page_size)
+        write_snapshot(args.out, rows, version)
+    except Exception as e:
+        print(f"Manifest snapshot not built: {e}", file=sys.stderr)
+        return 0 if args.optional else 1
+    print(f"Wrote {len(rows)} rows at manifest version {version} to {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Extract metadata and first-page thumbnails for `pdf_assets` rows.
+
+Usage:
+    python scripts/ingest_pdfs.py [--id <uuid> ...] [--force] [--workers 2] [--limit 1000]
+
+Reads SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY from the environment.
+Without `--id`, processes rows never ingested: rows written before
+scripts/sql/pdf_metadata.sql ran, or dropped because the API's ingest
+queue was full. `--force` re-processes rows that already have metadata
+(e.g. after installing pymupdf). Prints a JSON summary.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.utils.pdf_ingest import PDF_INGEST_WORKERS, ingest_pending  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--id", action="append", dest="ids", help="Row id to process (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Re-process rows that were already ingested")
+    parser.add_argument("--workers", type=int, default=PDF_INGEST_WORKERS, help="Rows processed at a time")
+    parser.add_argument("--limit", type=int, default=1000, help="Most pending rows to pick up")
+    args = parser.parse_args()
+
+    report = ingest_pending(row_ids=args.ids, force=args.force, max_workers=args.workers, limit=args.limit)
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
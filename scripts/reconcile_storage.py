@@ -0,0 +1,38 @@
+"""Reconcile `pdf_assets` manifest rows against Supabase Storage buckets.
+
+Usage:
+    python scripts/reconcile_storage.py [--module profile] [--deactivate] [--workers 8]
+
+Reads SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY from the environment and
+prints a JSON report of dangling rows (no object) and orphan objects (no row).
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.utils.storage_reconcile import reconcile_storage_manifest  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", action="append", help="Limit to a module/bucket (repeatable)")
+    parser.add_argument("--deactivate", action="store_true", help="Set active=false on dangling rows")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent listing calls")
+    parser.add_argument("--page-size", type=int, default=1000, help="Objects per listing page")
+    args = parser.parse_args()
+
+    report = reconcile_storage_manifest(
+        modules=args.module,
+        deactivate=args.deactivate,
+        max_workers=args.workers,
+        page_size=args.page_size,
+    )
+    print(json.dumps(report, indent=2))
+    return 1 if report.get("errors") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Local Redis-protocol stand-in for the cache backend, for offline perf work.
+
+Usage:
+    python scripts/redis_standin.py [--port 6390] [--latency-ms 0] [--password secret]
+
+Then point the API at it:
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6390/0 uvicorn api.index:app
+
+Implements only what `api/utils/cache_backends.py` sends, over RESP2:
+PING, GET, SET (EX/PX/NX/XX), DEL, UNLINK, EXISTS, SCAN (MATCH/COUNT),
+FLUSHDB, DBSIZE, AUTH and SELECT. Keys expire lazily on access and in
+SCAN. Each connection gets a thread; there is no persistence.
+"""
+import argparse
+import fnmatch
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class Store:
+    def __init__(self):
+        self.dbs: Dict[int, Dict[bytes, Tuple[bytes, Optional[float]]]] = {}
+        self.lock = threading.Lock()
+
+    def db(self, index: int) -> Dict[bytes, Tuple[bytes, Optional[float]]]:
+        return self.dbs.setdefault(index, {})
+
+    @staticmethod
+    def live(data, key: bytes) -> Optional[bytes]:
+        entry = data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del data[key]
+            return None
+        return entry[0]
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return b"-%s\r\n" % str(value).encode("utf-8")
+    if isinstance(value, bool):
+        return b"+OK\r\n" if value else b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode("utf-8")
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(v) for v in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class CommandError(Exception):
+    pass
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    store: Store
+    password: Optional[str]
+    latency_s: float
+
+    def setup(self):
+        super().setup()
+        self.db_index = 0
+        self.authed = not self.password
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.strip().split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            if not args:
+                continue
+            if self.latency_s:
+                time.sleep(self.latency_s)
+            try:
+                reply = self.dispatch(args[0].decode("utf-8", "replace").upper(), args[1:])
+            except CommandError as e:
+                reply = e
+            try:
+                self.wfile.write(_encode(reply))
+                self.wfile.flush()
+            except OSError:
+                return
+
+    def dispatch(self, cmd: str, args: List[bytes]):
+        if cmd == "AUTH":
+            if not self.password:
+                raise CommandError("ERR AUTH <password> called without any password configured")
+            if args and args[-1].decode("utf-8") == self.password:
+                self.authed = True
+                return "OK"
+            raise CommandError("WRONGPASS invalid username-password pair")
+        if not self.authed:
+            raise CommandError("NOAUTH Authentication required.")
+        if cmd == "PING":
+            return args[0] if args else "PONG"
+        if cmd == "SELECT":
+            self.db_index = int(args[0])
+            return "OK"
+        with self.store.lock:
+            data = self.store.db(self.db_index)
+            if cmd == "GET":
+                return self.store.live(data, args[0])
+            if cmd == "SET":
+                return self._set(data, args)
+            if cmd in ("DEL", "UNLINK"):
+                return sum(1 for key in args if self.store.live(data, key) is not None and data.pop(key, None))
+            if cmd == "EXISTS":
+                return sum(1 for key in args if self.store.live(data, key) is not None)
+            if cmd == "DBSIZE":
+                return sum(1 for key in list(data) if self.store.live(data, key) is not None)
+            if cmd == "FLUSHDB":
+                data.clear()
+                return "OK"
+            if cmd == "SCAN":
+                return self._scan(data, args)
+        raise CommandError(f"ERR unknown command '{cmd}'")
+
+    def _set(self, data, args: List[bytes]):
+        key, value, options = args[0], args[1], [a.decode("utf-8").upper() for a in args[2:]]
+        expires_at = None
+        i = 0
+        while i < len(options):
+            if options[i] in ("EX", "PX"):
+                amount = float(options[i + 1])
+                expires_at = time.monotonic() + (amount if options[i] == "EX" else amount / 1000.0)
+                i += 2
+                continue
+            if options[i] == "NX" and self.store.live(data, key) is not None:
+                return None
+            if options[i] == "XX" and self.store.live(data, key) is None:
+                return None
+            i += 1
+        data[key] = (value, expires_at)
+        return "OK"
+
+    def _scan(self, data, args: List[bytes]):
+        cursor = int(args[0])
+        pattern, count = "*", 10
+        options = args[1:]
+        for i in range(0, len(options) - 1, 2):
+            name = options[i].decode("utf-8").upper()
+            if name == "MATCH":
+                pattern = options[i + 1].decode("utf-8")
+            elif name == "COUNT":
+                count = int(options[i + 1])
+        # Cursor is an offset into the sorted key list: good enough for a stand-in.
+        keys = sorted(data)
+        page = keys[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(keys) else 0
+        matched = [
+            key for key in page
+            if self.store.live(data, key) is not None and fnmatch.fnmatchcase(key.decode("utf-8", "replace"), pattern)
+        ]
+        return [str(next_cursor).encode(), matched]
+
+
+class Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--password", help="Require AUTH with this password")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before every reply")
+    args = parser.parse_args()
+
+    handler = type(
+        "Handler",
+        (RespHandler,),
+        {"store": Store(), "password": args.password, "latency_s": args.latency_ms / 1000.0},
+    )
+    server = Server((args.host, args.port), handler)
+    print(f"Redis stand-in on redis://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
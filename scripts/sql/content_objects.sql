@@ -0,0 +1,48 @@
+-- Content-addressed index of stored PDFs, for upload deduplication
+--
+-- `content_objects` maps a SHA-256 of the file bytes to the storage object
+-- holding them. `/admin/upload-url` looks a client-computed hash up here and,
+-- on a hit, skips the upload: the new `pdf_assets` row points at the shared
+-- object through `storage_bucket` / `storage_path` instead of `module` / `path`.
+--
+-- Rows without `storage_bucket` keep the old meaning (bucket = module,
+-- object = path). `scripts/verify_content_hashes.py` re-hashes indexed
+-- objects and stamps `verified_at`.
+--
+-- Safe to run multiple times.
+
+create table if not exists public.content_objects (
+  sha256 text primary key check (sha256 ~ '^[0-9a-f]{64}$'),
+  bucket text not null,
+  path text not null,
+  size bigint,
+  verified_at timestamptz,
+  created_at timestamptz not null default now()
+);
+
+alter table public.pdf_assets
+  add column if not exists content_sha256 text,
+  add column if not exists storage_bucket text,
+  add column if not exists storage_path text;
+
+create index if not exists idx_pdf_assets_content_sha256
+  on public.pdf_assets (content_sha256)
+  where content_sha256 is not null;
+
+-- Reconciliation looks up rows whose object lives in another module's bucket.
+create index if not exists idx_pdf_assets_storage_bucket
+  on public.pdf_assets (storage_bucket)
+  where storage_bucket is not null;
+
+alter table public.content_objects enable row level security;
+
+do $$ begin
+  if not exists (
+    select 1 from pg_policies where policyname = 'service_role_all_content_objects'
+  ) then
+    create policy service_role_all_content_objects on public.content_objects
+      for all to service_role
+      using (true)
+      with check (true);
+  end if;
+end $$;
@@ -0,0 +1,12 @@
+-- Private bucket for the per-module manifest documents published by the API
+--
+-- After admin writes to pdf_assets, the API rebuilds `<module>.json` in this
+-- bucket (debounced, see MANIFEST_DOC_DEBOUNCE_SECONDS). /pdfs reads it with
+-- one GET instead of querying pdf_assets. Only the service role touches it.
+--
+-- Set MANIFEST_DOC_BUCKET if you use a different name.
+-- Safe to run multiple times.
+
+insert into storage.buckets (id, name, public)
+values ('manifests', 'manifests', false)
+on conflict (id) do nothing;
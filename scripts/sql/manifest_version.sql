@@ -0,0 +1,54 @@
+-- Shared manifest version counter for cross-instance cache invalidation
+--
+-- Every write to public.pdf_assets bumps a single row in public.manifest_versions.
+-- API instances poll that row (one primary-key read per interval, see
+-- MANIFEST_VERSION_POLL_SECONDS) and drop their in-process manifest and
+-- signed-URL caches when the number moves.
+--
+-- Safe to run multiple times.
+
+create table if not exists public.manifest_versions (
+  name text primary key,
+  version bigint not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+insert into public.manifest_versions (name, version)
+values ('pdf_assets', 0)
+on conflict (name) do nothing;
+
+-- Statement-level so a bulk update bumps the version once, not once per row.
+create or replace function public.bump_manifest_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  insert into public.manifest_versions (name, version, updated_at)
+  values (tg_table_name, 1, now())
+  on conflict (name) do update
+    set version = public.manifest_versions.version + 1,
+        updated_at = now();
+  return null;
+end; $$;
+
+drop trigger if exists bump_pdf_assets_manifest_version on public.pdf_assets;
+create trigger bump_pdf_assets_manifest_version
+after insert or update or delete on public.pdf_assets
+for each statement execute function public.bump_manifest_version();
+
+drop trigger if exists bump_pdf_assets_manifest_version_truncate on public.pdf_assets;
+create trigger bump_pdf_assets_manifest_version_truncate
+after truncate on public.pdf_assets
+for each statement execute function public.bump_manifest_version();
+
+alter table public.manifest_versions enable row level security;
+
+-- Recreated rather than skipped when present: earlier versions of this script
+-- created the policy without `to service_role`, which applied it to every role.
+drop policy if exists service_role_all_manifest_versions on public.manifest_versions;
+create policy service_role_all_manifest_versions on public.manifest_versions
+  for all to service_role
+  using (true)
+  with check (true);
@@ -0,0 +1,59 @@
+-- Score-matched PDF lookup served by one GiST index
+--
+-- Adds a generated int4range over (score_min, score_max) and a GiST index on
+-- (module, lesson, score_range) for active rows, plus an RPC the API calls
+-- instead of the two PostgREST `or` filters on nullable score bounds.
+--
+-- NULL bounds become unbounded range ends, matching the old
+-- "score_min is null or score_min <= score" semantics. Rows with
+-- score_min > score_max never matched before and map to 'empty' here.
+--
+-- Safe to run multiple times.
+
+create extension if not exists btree_gist;
+
+alter table public.pdf_assets
+  add column if not exists score_range int4range
+  generated always as (
+    case
+      when score_min is not null and score_max is not null and score_min > score_max
+        then 'empty'::int4range
+      else int4range(score_min, score_max, '[]')
+    end
+  ) stored;
+
+create index if not exists idx_pdf_assets_score_lookup
+  on public.pdf_assets using gist (module, lesson, score_range)
+  where active;
+
+-- Default-PDF lookups (no score) keep using a plain btree.
+create index if not exists idx_pdf_assets_module_lesson_default
+  on public.pdf_assets (module, lesson, path)
+  where active and is_default;
+
+-- Plain SQL, STABLE and not SECURITY DEFINER so the planner can inline it and
+-- see the bound parameters as constants (needed for the GiST index to apply).
+create or replace function public.match_pdf_assets(
+  p_module text,
+  p_lesson text default null,
+  p_score integer default null,
+  p_limit integer default 10
+)
+returns setof public.pdf_assets
+language sql
+stable
+as $$
+  select a.*
+  from public.pdf_assets a
+  where a.module = p_module
+    and a.active
+    and (p_lesson is null or a.lesson = p_lesson)
+    and (
+      (p_score is null and a.is_default)
+      or (p_score is not null and a.score_range @> p_score)
+    )
+  order by a.lesson, a.path
+  limit nullif(greatest(coalesce(p_limit, 0), 0), 0);
+$$;
+
+grant execute on function public.match_pdf_assets(text, text, integer, integer) to service_role;
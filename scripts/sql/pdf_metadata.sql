@@ -0,0 +1,29 @@
+-- PDF metadata and first-page thumbnails, filled in after upload
+--
+-- After a `pdf_assets` row is created, the API streams its object once and
+-- stores page count, byte size, title and the storage key of a small PNG of
+-- the first page (`api/utils/pdf_ingest.py`). `/pdfs` returns them with each
+-- item, plus a `thumbnail_url`, so clients can preview without the PDF.
+--
+-- `ingested_at` is null until a row has been processed; `ingest_error` says
+-- why a processed row has no page count or thumbnail.
+--
+-- Set PDF_THUMBNAIL_BUCKET if you use a different bucket name.
+-- Safe to run multiple times.
+
+alter table public.pdf_assets
+  add column if not exists page_count integer,
+  add column if not exists byte_size bigint,
+  add column if not exists title text,
+  add column if not exists thumbnail_path text,
+  add column if not exists ingested_at timestamptz,
+  add column if not exists ingest_error text;
+
+-- Backfill (`scripts/ingest_pdfs.py`) looks for rows never processed.
+create index if not exists idx_pdf_assets_pending_ingest
+  on public.pdf_assets (id)
+  where ingested_at is null;
+
+insert into storage.buckets (id, name, public)
+values ('thumbnails', 'thumbnails', false)
+on conflict (id) do nothing;
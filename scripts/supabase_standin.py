@@ -0,0 +1,948 @@
+"""Local stand-in for the Supabase APIs this backend uses, for offline perf work.
+
+Usage:
+    python scripts/supabase_standin.py [--port 54321] [--latency-ms 15] [--jitter-ms 5]
+        [--error-rate 0.0] [--fault storage:latency_ms=80,error_rate=0.05]
+        [--modules 4] [--lessons 10] [--rows-per-lesson 5] [--users 1000] [--seed 1]
+
+Then point the API at it:
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_ANON_KEY=anon \\
+    SUPABASE_SERVICE_ROLE_KEY=service uvicorn api.index:app
+
+Implements only what `api/` calls:
+  - GoTrue (/auth/v1): password sign-in, sign-up, get_user, admin user listing.
+  - PostgREST (/rest/v1): select/insert/upsert/update/delete on pdf_assets,
+    profiles, admin_users and manifest_versions, with eq/neq/gt/gte/lt/lte/
+    like/ilike/is/in, nested or()/and(), order, limit/offset and the
+    match_pdf_assets RPC.
+  - Storage (/storage/v1): signed URLs, signed upload URLs, list, plain
+    upload/download, signed download with Range, and TUS resumable uploads
+    (creation, HEAD offset, PATCH append) at /upload/resumable[/sign].
+
+Each service (auth, rest, storage) has its own injected latency, jitter and
+error rate. Set them with flags, or at runtime with
+`POST /__standin/config {"storage": {"error_rate": 0.5}}`.
+`GET /__standin/stats` returns per-service call and error counts.
+`POST /__standin/reset` re-seeds the data. Randomness is seeded (`--seed`),
+so generated data and fault draws repeat run to run.
+
+Seeded logins: user{N}@example.test / password123 and admin@example.test /
+admin-password (the admin needs bcrypt installed to be usable).
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email import policy as email_policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+try:
+    import bcrypt  # type: ignore
+except Exception:  # pragma: no cover - optional dependency guard
+    bcrypt = None  # type: ignore
+
+SERVICES = ("auth", "rest", "storage")
+JWT_SECRET = b"supabase-standin"
+USER_PASSWORD = "password123"
+ADMIN_EMAIL = "admin@example.test"
+ADMIN_PASSWORD = "admin-password"
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 2048 + b"\n%%EOF\n"
+
+# Known columns per table; selecting anything else fails like PostgREST (42703),
+# which `fetch_profile_admin_sdk` relies on to pick a selector.
+TABLE_COLUMNS = {
+    "pdf_assets": [
+        "id", "module", "lesson", "path", "is_default", "score_min", "score_max",
+        "active", "created_at", "updated_at", "content_sha256", "storage_bucket", "storage_path",
+        "page_count", "byte_size", "title", "thumbnail_path", "ingested_at", "ingest_error",
+    ],
+    "content_objects": ["sha256", "bucket", "path", "size", "verified_at", "created_at"],
+    "profiles": ["id", "first_name", "last_name", "full_name", "email", "created_at", "updated_at"],
+    "admin_users": [
+        "id", "email", "role", "active", "password_hash", "password", "password_temp",
+        "force_password_change", "must_reset_password", "password_reset_required",
+        "needs_password_reset", "requires_password_update", "password_updated_at",
+        "password_last_updated", "created_at", "updated_at",
+    ],
+    "manifest_versions": ["name", "version", "updated_at"],
+}
+GENERATED_COLUMNS = {"profiles": {"full_name"}}
+TABLE_DEFAULTS = {
+    "pdf_assets": {"is_default": False, "active": True},
+    "profiles": {"first_name": "", "last_name": ""},
+    "admin_users": {
+        "role": "admin", "active": True, "force_password_change": True, "must_reset_password": False,
+        "password_reset_required": False, "needs_password_reset": False, "requires_password_update": False,
+    },
+}
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _make_jwt(user: Dict[str, Any], ttl: int = 3600) -> str:
+    header = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    now = int(time.time())
+    payload = _b64url(json.dumps({
+        "sub": user["id"], "email": user["email"], "role": "authenticated",
+        "aud": "authenticated", "iat": now, "exp": now + ttl,
+    }).encode())
+    sig = _b64url(hmac.new(JWT_SECRET, f"{header}.{payload}".encode(), hashlib.sha256).digest())
+    return f"{header}.{payload}.{sig}"
+
+
+def _hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, body: Dict[str, Any]):
+        super().__init__(body)
+        self.status = status
+        self.body = body
+
+
+def rest_error(status: int, code: str, message: str) -> ApiError:
+    return ApiError(status, {"code": code, "message": message, "details": None, "hint": None})
+
+
+def auth_error(status: int, error_code: str, msg: str) -> ApiError:
+    return ApiError(status, {"code": status, "error_code": error_code, "msg": msg})
+
+
+def storage_error(status: int, error: str, message: str) -> ApiError:
+    return ApiError(400 if status == 404 else status, {"statusCode": str(status), "error": error, "message": message})
+
+
+INJECTED_ERRORS = {
+    "auth": lambda status: auth_error(status, "unexpected_failure", "injected fault"),
+    "rest": lambda status: rest_error(status, "PGRST000", "injected fault"),
+    "storage": lambda status: storage_error(status, "InternalError", "injected fault"),
+}
+
+
+# --------------------------------------------------------------------------- faults
+
+
+class Faults:
+    """Per-service latency/jitter/error-rate injection with a seeded RNG."""
+
+    def __init__(self, seed: int):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.config = {s: {"latency_ms": 0.0, "jitter_ms": 0.0, "error_rate": 0.0, "error_status": 503} for s in SERVICES}
+        self.stats = {s: {"calls": 0, "injected_errors": 0} for s in SERVICES}
+
+    def update(self, service: str, **values) -> None:
+        if service not in self.config:
+            raise ValueError(f"unknown service {service!r}")
+        for key, value in values.items():
+            if key not in self.config[service]:
+                raise ValueError(f"unknown fault setting {key!r}")
+            self.config[service][key] = type(self.config[service][key])(value)
+
+    def apply(self, service: str) -> Optional[int]:
+        """Sleep for the configured latency; return an HTTP status to fail with, or None."""
+        cfg = self.config[service]
+        with self._lock:
+            self.stats[service]["calls"] += 1
+            delay = cfg["latency_ms"] + self._rng.uniform(0, cfg["jitter_ms"])
+            fail = self._rng.random() < cfg["error_rate"]
+            if fail:
+                self.stats[service]["injected_errors"] += 1
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return int(cfg["error_status"]) if fail else None
+
+
+# --------------------------------------------------------------------------- data
+
+
+class Store:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TABLE_COLUMNS}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.users_by_email: Dict[str, str] = {}
+        self.passwords: Dict[str, str] = {}
+        self.objects: Dict[str, Dict[str, bytes]] = {}
+        self.tokens: Dict[str, str] = {}
+        # Resumable (TUS) uploads in progress: id -> bucket, path, length, data
+        self.tus_uploads: Dict[str, Dict[str, Any]] = {}
+
+    def seed(self, args) -> None:
+        rng = random.Random(args.seed)
+        base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        with self.lock:
+            self.__init__()
+            for i in range(args.users):
+                created = (base_time + timedelta(minutes=i)).isoformat()
+                self.create_user(f"user{i}@example.test", USER_PASSWORD, {"first_name": "User", "last_name": str(i)}, created)
+            for m in range(args.modules):
+                module = f"module{m + 1}"
+                bucket = self.objects.setdefault(module, {})
+                for lesson_no in range(args.lessons):
+                    lesson = f"lesson{lesson_no + 1}"
+                    for r in range(args.rows_per_lesson):
+                        path = f"{lesson}/doc{r + 1}.pdf"
+                        bucket[path] = PDF_BYTES
+                        lo = rng.choice([None, 0, 20, 40, 60])
+                        hi = None if lo is None else lo + rng.choice([19, 39])
+                        self.insert_row("pdf_assets", {
+                            "module": module,
+                            "lesson": lesson,
+                            "path": path,
+                            "is_default": r == 0,
+                            "score_min": lo,
+                            "score_max": hi,
+                        })
+            self.tables["manifest_versions"] = [{"name": "pdf_assets", "version": 1, "updated_at": _now_iso()}]
+            admin = {
+                "email": ADMIN_EMAIL,
+                "force_password_change": False,
+                "password_updated_at": _now_iso(),
+                "password_last_updated": _now_iso(),
+            }
+            if bcrypt is not None:
+                admin["password_hash"] = bcrypt.hashpw(ADMIN_PASSWORD.encode(), bcrypt.gensalt(rounds=10)).decode()
+            else:
+                admin["password"] = ADMIN_PASSWORD
+            self.insert_row("admin_users", admin)
+
+    # -- auth
+
+    def create_user(self, email: str, password: str, metadata: Dict[str, Any], created_at: Optional[str] = None) -> Dict[str, Any]:
+        uid = str(uuid.uuid4())
+        created = created_at or _now_iso()
+        user = {
+            "id": uid,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": email,
+            "email_confirmed_at": created,
+            "confirmed_at": created,
+            "created_at": created,
+            "updated_at": created,
+            "app_metadata": {"provider": "email", "providers": ["email"]},
+            "user_metadata": dict(metadata or {}),
+            "identities": [{
+                "id": uid,
+                "identity_id": str(uuid.uuid4()),
+                "user_id": uid,
+                "identity_data": {"email": email, "sub": uid},
+                "provider": "email",
+                "created_at": created,
+            }],
+            "is_anonymous": False,
+        }
+        self.users[uid] = user
+        self.users_by_email[email.lower()] = uid
+        self.passwords[uid] = _hash_password(password)
+        # Mirrors the on_auth_user_created trigger in setup_auth_profiles.sql.
+        self.insert_row("profiles", {
+            "id": uid,
+            "first_name": (metadata or {}).get("first_name") or "",
+            "last_name": (metadata or {}).get("last_name") or "",
+            "email": email,
+        })
+        return user
+
+    def session_for(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        token = _make_jwt(user)
+        self.tokens[token] = user["id"]
+        return {
+            "access_token": token,
+            "token_type": "bearer",
+            "expires_in": 3600,
+            "expires_at": int(time.time()) + 3600,
+            "refresh_token": uuid.uuid4().hex,
+            "user": user,
+        }
+
+    # -- tables
+
+    def insert_row(self, table: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        columns = TABLE_COLUMNS[table]
+        unknown = [k for k in values if k not in columns]
+        if unknown:
+            raise rest_error(400, "PGRST204", f"Could not find the '{unknown[0]}' column of '{table}' in the schema cache")
+        generated = GENERATED_COLUMNS.get(table, set()) & set(values)
+        if generated:
+            raise rest_error(400, "428C9", f"cannot insert a non-DEFAULT value into column \"{sorted(generated)[0]}\"")
+        row = {c: None for c in columns}
+        row.update(TABLE_DEFAULTS.get(table, {}))
+        if "id" in row:
+            row["id"] = str(uuid.uuid4())
+        now = _now_iso()
+        for stamp in ("created_at", "updated_at"):
+            if stamp in row:
+                row[stamp] = now
+        row.update(values)
+        self._compute(table, row)
+        self.tables[table].append(row)
+        return row
+
+    def _compute(self, table: str, row: Dict[str, Any]) -> None:
+        if table == "profiles":
+            row["full_name"] = f"{row.get('first_name') or ''} {row.get('last_name') or ''}".strip()
+
+    def bump_manifest_version(self) -> None:
+        # Mirrors the statement-level trigger in scripts/sql/manifest_version.sql.
+        for row in self.tables["manifest_versions"]:
+            if row["name"] == "pdf_assets":
+                row["version"] += 1
+                row["updated_at"] = _now_iso()
+
+
+# --------------------------------------------------------------------------- PostgREST filters
+
+
+def _split_top(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses or double quotes."""
+    parts, depth, quoted, buf = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append("".join(buf))
+            buf = []
+        else:
+            buf.append(ch)
+    if buf:
+        parts.append("".join(buf))
+    return parts
+
+
+def _coerce(sample: Any, raw: str) -> Any:
+    raw = raw.strip('"')
+    if isinstance(sample, bool):
+        return raw.lower() == "true"
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _like(pattern: str, value: Any, flags: int = 0) -> bool:
+    if value is None:
+        return False
+    regex = "^" + "".join(".*" if ch in "*%" else "." if ch == "_" else re.escape(ch) for ch in pattern) + "$"
+    return re.match(regex, str(value), flags | re.DOTALL) is not None
+
+
+def _compare(op: str, value: Any, operand: str) -> bool:
+    if op == "is":
+        lowered = operand.lower()
+        if lowered == "null":
+            return value is None
+        if lowered in ("true", "false"):
+            return value is (lowered == "true")
+        raise rest_error(400, "PGRST100", f"unexpected is value {operand!r}")
+    if op == "in":
+        items = [_coerce(value, v) for v in _split_top(operand.strip()[1:-1])] if operand.startswith("(") else []
+        return value in items
+    if op in ("like", "ilike"):
+        return _like(operand, value, re.IGNORECASE if op == "ilike" else 0)
+    if value is None:
+        return False
+    target = _coerce(value, operand)
+    try:
+        if op == "eq":
+            return value == target
+        if op == "neq":
+            return value != target
+        if op == "gt":
+            return value > target
+        if op == "gte":
+            return value >= target
+        if op == "lt":
+            return value < target
+        if op == "lte":
+            return value <= target
+    except TypeError:
+        return False
+    raise rest_error(400, "PGRST100", f"unsupported operator {op!r}")
+
+
+def _column_predicate(table: str, column: str, expr: str):
+    if column not in TABLE_COLUMNS[table]:
+        raise rest_error(400, "42703", f"column {table}.{column} does not exist")
+    negate = False
+    if expr.startswith("not."):
+        negate, expr = True, expr[4:]
+    op, _, operand = expr.partition(".")
+    operand = unquote(operand)
+    return lambda row: _compare(op, row.get(column), operand) != negate
+
+
+def _logic_predicate(table: str, op: str, body: str):
+    children = []
+    for part in _split_top(body):
+        part = part.strip()
+        m = re.match(r"^(not\.)?(and|or)\((.*)\)$", part, re.DOTALL)
+        if m:
+            inner = _logic_predicate(table, m.group(2), m.group(3))
+            children.append((lambda f: (lambda row: not f(row)))(inner) if m.group(1) else inner)
+            continue
+        column, _, expr = part.partition(".")
+        children.append(_column_predicate(table, column, expr))
+    combine = all if op == "and" else any
+    return lambda row: combine(child(row) for child in children)
+
+
+def build_filters(table: str, params: List[Tuple[str, str]]):
+    preds = []
+    for key, value in params:
+        if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            continue
+        if key in ("or", "and", "not.or", "not.and"):
+            negate = key.startswith("not.")
+            inner = _logic_predicate(table, key.split(".")[-1], value.strip()[1:-1])
+            preds.append((lambda f: (lambda row: not f(row)))(inner) if negate else inner)
+        else:
+            preds.append(_column_predicate(table, key, value))
+    return lambda row: all(p(row) for p in preds)
+
+
+def apply_order(table: str, rows: List[Dict[str, Any]], order: str) -> List[Dict[str, Any]]:
+    for term in reversed([t for t in order.split(",") if t]):
+        bits = term.split(".")
+        column = bits[0]
+        if column not in TABLE_COLUMNS[table]:
+            raise rest_error(400, "42703", f"column {table}.{column} does not exist")
+        desc = "desc" in bits[1:]
+        nulls_first = "nullsfirst" in bits[1:] or ("nullslast" not in bits[1:] and desc)
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: r[column], reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def project(table: str, rows: List[Dict[str, Any]], select: str) -> List[Dict[str, Any]]:
+    if not select or select.strip() == "*":
+        return [dict(r) for r in rows]
+    columns = [c.strip() for c in select.split(",") if c.strip()]
+    for column in columns:
+        if column != "*" and column not in TABLE_COLUMNS[table]:
+            raise rest_error(400, "42703", f"column {table}.{column} does not exist")
+    if "*" in columns:
+        return [dict(r) for r in rows]
+    return [{c: r.get(c) for c in columns} for r in rows]
+
+
+def match_pdf_assets(rows: List[Dict[str, Any]], args: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Python twin of `match_pdf_assets` in scripts/sql/pdf_assets_score_range.sql."""
+    module, lesson, score, limit = args.get("p_module"), args.get("p_lesson"), args.get("p_score"), args.get("p_limit")
+    out = []
+    for r in rows:
+        if r["module"] != module or not r["active"]:
+            continue
+        if lesson and r["lesson"] != lesson:
+            continue
+        if score is None:
+            if not r["is_default"]:
+                continue
+        else:
+            lo, hi = r["score_min"], r["score_max"]
+            if (lo is not None and lo > score) or (hi is not None and hi < score):
+                continue
+        out.append(r)
+    out = apply_order("pdf_assets", out, "lesson.asc,path.asc")
+    if limit and limit > 0:
+        out = out[:limit]
+    return [{k: r[k] for k in TABLE_COLUMNS["pdf_assets"]} for r in out]
+
+
+# --------------------------------------------------------------------------- HTTP
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "supabase-standin/1"
+
+    store: Store
+    faults: Faults
+    seed_args: Any
+
+    def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler signature
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    # -- plumbing
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json_body(self) -> Any:
+        raw = self._body()
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            raise rest_error(400, "PGRST102", "Empty or invalid json")
+
+    def _send(self, status: int, payload: Any = None, headers: Optional[Dict[str, str]] = None, raw: Optional[bytes] = None):
+        body = raw if raw is not None else (b"" if payload is None else json.dumps(payload).encode("utf-8"))
+        self.send_response(status)
+        content_type = "application/json" if raw is None else (headers or {}).pop("Content-Type", "application/octet-stream")
+        if body or raw is not None:
+            self.send_header("Content-Type", content_type)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _dispatch(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        try:
+            if path.startswith("/__standin/"):
+                return self._control(path[len("/__standin/"):])
+            for service, prefix in (("auth", "/auth/v1/"), ("rest", "/rest/v1/"), ("storage", "/storage/v1/")):
+                if path.startswith(prefix):
+                    status = self.faults.apply(service)
+                    if status:
+                        self._body()
+                        raise INJECTED_ERRORS[service](status)
+                    handler = getattr(self, f"_{service}")
+                    return handler(path[len(prefix):], params)
+            self._send(404, {"message": "not found"})
+        except ApiError as e:
+            self._send(e.status, e.body)
+        except Exception as e:  # pragma: no cover - surfaced to the caller for debugging
+            self._send(500, {"message": f"standin error: {e}"})
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _dispatch
+
+    # -- control
+
+    def _control(self, action: str):
+        if action == "stats":
+            return self._send(200, {"faults": self.faults.config, "stats": self.faults.stats})
+        if action == "config" and self.command == "GET":
+            return self._send(200, self.faults.config)
+        if action == "config":
+            body = self._json_body() or {}
+            try:
+                for service, values in body.items():
+                    self.faults.update(service, **values)
+            except (TypeError, ValueError) as e:
+                return self._send(400, {"message": str(e)})
+            return self._send(200, self.faults.config)
+        if action == "reset" and self.command == "POST":
+            self.store.seed(self.seed_args)
+            return self._send(200, {"ok": True})
+        return self._send(404, {"message": "unknown control action"})
+
+    # -- GoTrue
+
+    def _auth(self, route: str, params: List[Tuple[str, str]]):
+        store = self.store
+        query = dict(params)
+        if route == "token" and self.command == "POST":
+            body = self._json_body() or {}
+            if query.get("grant_type") != "password":
+                raise auth_error(400, "unsupported_grant_type", "Unsupported grant type")
+            with store.lock:
+                uid = store.users_by_email.get((body.get("email") or "").lower())
+                if not uid or store.passwords.get(uid) != _hash_password(body.get("password") or ""):
+                    raise auth_error(400, "invalid_credentials", "Invalid login credentials")
+                user = store.users[uid]
+                user["last_sign_in_at"] = _now_iso()
+                return self._send(200, store.session_for(user))
+        if route == "signup" and self.command == "POST":
+            body = self._json_body() or {}
+            email = (body.get("email") or "").strip()
+            if not email or not body.get("password"):
+                raise auth_error(422, "validation_failed", "Signup requires a valid password")
+            with store.lock:
+                if email.lower() in store.users_by_email:
+                    raise auth_error(422, "user_already_exists", "User already registered")
+                user = store.create_user(email, body["password"], body.get("data") or {})
+                return self._send(200, store.session_for(user))
+        if route == "user" and self.command == "GET":
+            token = (self.headers.get("Authorization") or "").replace("Bearer ", "", 1)
+            with store.lock:
+                uid = store.tokens.get(token)
+                if not uid:
+                    raise auth_error(401, "bad_jwt", "invalid JWT")
+                return self._send(200, store.users[uid])
+        if route == "logout":
+            return self._send(204)
+        if route == "admin/users" and self.command == "GET":
+            page = max(1, int(query.get("page") or 1))
+            per_page = max(1, min(int(query.get("per_page") or 50), 1000))
+            needle = (query.get("filter") or "").lower()
+            with store.lock:
+                users = sorted(store.users.values(), key=lambda u: u["created_at"], reverse=True)
+                if needle:
+                    users = [u for u in users if needle in (u["email"] or "").lower()]
+                total = len(users)
+                chunk = users[(page - 1) * per_page: page * per_page]
+            return self._send(200, {"users": chunk, "aud": "authenticated"}, {"X-Total-Count": str(total)})
+        raise auth_error(404, "not_found", f"unsupported auth route {route}")
+
+    # -- PostgREST
+
+    def _rest(self, route: str, params: List[Tuple[str, str]]):
+        store = self.store
+        query = dict(params)
+        prefer = self.headers.get("Prefer") or ""
+        single = "vnd.pgrst.object" in (self.headers.get("Accept") or "")
+        if route.startswith("rpc/"):
+            name = route[4:]
+            if name != "match_pdf_assets":
+                raise rest_error(404, "PGRST202", f"Could not find the function public.{name}")
+            args = self._json_body() or {}
+            with store.lock:
+                return self._send(200, match_pdf_assets(store.tables["pdf_assets"], args))
+        table = route.strip("/")
+        if table not in TABLE_COLUMNS:
+            raise rest_error(404, "42P01", f'relation "public.{table}" does not exist')
+        predicate = build_filters(table, params)
+        with store.lock:
+            rows = store.tables[table]
+            if self.command in ("GET", "HEAD"):
+                matched = [r for r in rows if predicate(r)]
+                matched = apply_order(table, matched, query.get("order", ""))
+                offset = int(query.get("offset") or 0)
+                limit = query.get("limit")
+                matched = matched[offset: offset + int(limit)] if limit else matched[offset:]
+                result = project(table, matched, query.get("select", "*"))
+                return self._send_rows(result, single, 200)
+            if self.command == "POST":
+                body = self._json_body()
+                items = body if isinstance(body, list) else [body or {}]
+                upsert = "merge-duplicates" in prefer or "ignore-duplicates" in prefer
+                conflict = [c for c in (query.get("on_conflict") or "id").split(",") if c]
+                written = []
+                for item in items:
+                    existing = None
+                    if upsert and all(item.get(c) is not None for c in conflict):
+                        existing = next((r for r in rows if all(r.get(c) == item.get(c) for c in conflict)), None)
+                    if existing is not None:
+                        if "ignore-duplicates" not in prefer:
+                            self._update_row(table, existing, item)
+                        written.append(existing)
+                    else:
+                        written.append(store.insert_row(table, item))
+                if table == "pdf_assets" and written:
+                    store.bump_manifest_version()
+                return self._send_written(table, written, prefer, single, query, 201)
+            if self.command == "PATCH":
+                body = self._json_body() or {}
+                written = [r for r in rows if predicate(r)]
+                for row in written:
+                    self._update_row(table, row, body)
+                if table == "pdf_assets":
+                    store.bump_manifest_version()
+                return self._send_written(table, written, prefer, single, query, 200)
+            if self.command == "DELETE":
+                written = [r for r in rows if predicate(r)]
+                store.tables[table] = [r for r in rows if not predicate(r)]
+                if table == "pdf_assets":
+                    store.bump_manifest_version()
+                return self._send_written(table, written, prefer, single, query, 200)
+        raise rest_error(405, "PGRST000", "method not allowed")
+
+    def _update_row(self, table: str, row: Dict[str, Any], values: Dict[str, Any]) -> None:
+        unknown = [k for k in values if k not in TABLE_COLUMNS[table]]
+        if unknown:
+            raise rest_error(400, "PGRST204", f"Could not find the '{unknown[0]}' column of '{table}' in the schema cache")
+        generated = GENERATED_COLUMNS.get(table, set()) & set(values)
+        if generated:
+            raise rest_error(400, "428C9", f"column \"{sorted(generated)[0]}\" can only be updated to DEFAULT")
+        row.update(values)
+        if "updated_at" in row and "updated_at" not in values:
+            row["updated_at"] = _now_iso()
+        self.store._compute(table, row)
+
+    def _send_rows(self, rows: List[Dict[str, Any]], single: bool, status: int):
+        if single:
+            if len(rows) != 1:
+                raise rest_error(406, "PGRST116", "JSON object requested, multiple (or no) rows returned")
+            return self._send(status, rows[0])
+        return self._send(status, rows)
+
+    def _send_written(self, table, rows, prefer, single, query, status):
+        if "return=representation" in prefer:
+            return self._send_rows(project(table, rows, query.get("select", "*")), single, status)
+        return self._send(204 if status == 200 else status)
+
+    # -- Storage
+
+    def _storage(self, route: str, params: List[Tuple[str, str]]):
+        store = self.store
+        query = dict(params)
+        segments = [unquote(s) for s in route.split("/") if s]
+        if segments[:2] == ["upload", "resumable"]:
+            return self._tus(segments[2:])
+        if len(segments) < 2 or segments[0] != "object":
+            raise storage_error(404, "not_found", f"unsupported storage route {route}")
+        rest = segments[1:]
+        if rest[0] == "list" and self.command == "POST":
+            body = self._json_body() or {}
+            return self._send(200, self._list(rest[1], body))
+        if rest[0] == "sign" and self.command == "POST":
+            bucket, path = rest[1], "/".join(rest[2:])
+            body = self._json_body() or {}
+            with store.lock:
+                if path not in store.objects.get(bucket, {}):
+                    raise storage_error(404, "not_found", "Object not found")
+            expires = int(body.get("expiresIn") or 60)
+            token = self._sign_token(bucket, path, expires)
+            return self._send(200, {"signedURL": f"/object/sign/{quote(bucket)}/{quote(path)}?token={token}"})
+        if rest[0] == "sign" and self.command in ("GET", "HEAD"):
+            bucket, path = rest[1], "/".join(rest[2:])
+            self._check_token(bucket, path, query.get("token") or "")
+            return self._serve_object(bucket, path)
+        if rest[:2] == ["upload", "sign"] and self.command == "POST":
+            bucket, path = rest[2], "/".join(rest[3:])
+            self._body()
+            token = self._sign_token(bucket, path, 7200)
+            return self._send(200, {"url": f"/object/upload/sign/{quote(bucket)}/{quote(path)}?token={token}"})
+        if rest[:2] == ["upload", "sign"] and self.command == "PUT":
+            bucket, path = rest[2], "/".join(rest[3:])
+            self._check_token(bucket, path, query.get("token") or "")
+            return self._put_object(bucket, path, self._body())
+        if rest[0] == "authenticated" and self.command in ("GET", "HEAD"):
+            return self._serve_object(rest[1], "/".join(rest[2:]))
+        if self.command in ("POST", "PUT") and len(rest) >= 2:
+            return self._put_object(rest[0], "/".join(rest[1:]), self._upload_body())
+        if self.command in ("GET", "HEAD") and len(rest) >= 2:
+            return self._serve_object(rest[0], "/".join(rest[1:]))
+        if self.command == "DELETE" and len(rest) == 1:
+            body = self._json_body() or {}
+            removed = []
+            with store.lock:
+                bucket = store.objects.get(rest[0], {})
+                for prefix in body.get("prefixes") or []:
+                    if bucket.pop(prefix, None) is not None:
+                        removed.append({"name": prefix})
+            return self._send(200, removed)
+        raise storage_error(404, "not_found", f"unsupported storage route {route}")
+
+    def _tus(self, rest: List[str]):
+        """TUS 1.0.0 core plus `creation`, as served by Storage's resumable endpoint."""
+        signed = rest[:1] == ["sign"]
+        rest = rest[1:] if signed else rest
+        tus_headers = {"Tus-Resumable": "1.0.0"}
+        if self.command == "OPTIONS":
+            return self._send(204, headers={**tus_headers, "Tus-Version": "1.0.0", "Tus-Extension": "creation"})
+        if self.command == "POST" and not rest:
+            self._body()
+            metadata = {}
+            for pair in (self.headers.get("Upload-Metadata") or "").split(","):
+                key, _, value = pair.strip().partition(" ")
+                if key:
+                    metadata[key] = base64.b64decode(value).decode("utf-8") if value else ""
+            bucket, path = metadata.get("bucketName"), metadata.get("objectName")
+            length = self.headers.get("Upload-Length")
+            if not bucket or not path or not (length or "").isdigit():
+                raise storage_error(400, "invalid_request", "Upload-Length and bucketName/objectName metadata are required")
+            if signed:
+                self._check_token(bucket, path, self.headers.get("x-signature") or "")
+            upload_id = uuid.uuid4().hex
+            with self.store.lock:
+                self.store.tus_uploads[upload_id] = {
+                    "bucket": bucket, "path": path, "length": int(length), "data": bytearray(),
+                    "signature": self.headers.get("x-signature") or "",
+                }
+            location = f"/storage/v1/upload/resumable/{'sign/' if signed else ''}{upload_id}"
+            return self._send(201, headers={**tus_headers, "Location": location, "Upload-Offset": "0"})
+        if len(rest) != 1:
+            raise storage_error(404, "not_found", "unsupported resumable route")
+        with self.store.lock:
+            upload = self.store.tus_uploads.get(rest[0])
+        if upload is None:
+            self._body()
+            return self._send(404, headers=tus_headers)
+        if signed and not hmac.compare_digest(self.headers.get("x-signature") or "", upload["signature"]):
+            self._body()
+            raise storage_error(403, "InvalidSignature", "x-signature does not match this upload")
+        if self.command == "HEAD":
+            return self._send(200, headers={
+                **tus_headers, "Upload-Offset": str(len(upload["data"])),
+                "Upload-Length": str(upload["length"]), "Cache-Control": "no-store",
+            })
+        if self.command == "PATCH":
+            chunk = self._body()
+            with self.store.lock:
+                offset = len(upload["data"])
+                if self.headers.get("Upload-Offset") != str(offset):
+                    return self._send(409, headers={**tus_headers, "Upload-Offset": str(offset)})
+                if offset + len(chunk) > upload["length"]:
+                    raise storage_error(413, "payload_too_large", "chunk exceeds Upload-Length")
+                upload["data"].extend(chunk)
+                offset = len(upload["data"])
+                if offset == upload["length"]:
+                    self.store.objects.setdefault(upload["bucket"], {})[upload["path"]] = bytes(upload["data"])
+            return self._send(204, headers={**tus_headers, "Upload-Offset": str(offset)})
+        raise storage_error(405, "method_not_allowed", f"{self.command} not supported for resumable uploads")
+
+    def _sign_token(self, bucket: str, path: str, expires: int) -> str:
+        exp = int(time.time()) + expires
+        msg = f"{bucket}/{path}|{exp}".encode("utf-8")
+        return f"{exp}.{_b64url(hmac.new(JWT_SECRET, msg, hashlib.sha256).digest())}"
+
+    def _check_token(self, bucket: str, path: str, token: str) -> None:
+        exp, _, sig = token.partition(".")
+        msg = f"{bucket}/{path}|{exp}".encode("utf-8")
+        expected = _b64url(hmac.new(JWT_SECRET, msg, hashlib.sha256).digest())
+        if not hmac.compare_digest(sig, expected) or not exp.isdigit() or int(exp) < time.time():
+            raise storage_error(400, "InvalidJWT", "invalid or expired signature")
+
+    def _upload_body(self) -> bytes:
+        """Raw upload body, or the `file` part of a multipart form as sent by the Python SDK."""
+        raw = self._body()
+        content_type = self.headers.get("Content-Type") or ""
+        if not content_type.startswith("multipart/form-data"):
+            return raw
+        message = BytesParser(policy=email_policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + raw
+        )
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                return part.get_payload(decode=True) or b""
+        raise storage_error(400, "invalid_request", "multipart upload without a file part")
+
+    def _put_object(self, bucket: str, path: str, data: bytes):
+        with self.store.lock:
+            self.store.objects.setdefault(bucket, {})[path] = data
+        return self._send(200, {"Key": f"{bucket}/{path}", "Id": str(uuid.uuid4())})
+
+    def _serve_object(self, bucket: str, path: str):
+        with self.store.lock:
+            data = self.store.objects.get(bucket, {}).get(path)
+        if data is None:
+            raise storage_error(404, "not_found", "Object not found")
+        headers = {
+            "Content-Type": "application/pdf" if path.endswith(".pdf") else "application/octet-stream",
+            "Accept-Ranges": "bytes",
+            "ETag": '"' + hashlib.md5(data).hexdigest() + '"',
+        }
+        m = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range") or "")
+        if m and (m.group(1) or m.group(2)):
+            size = len(data)
+            if m.group(1):
+                start = int(m.group(1))
+                end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            else:
+                start, end = max(0, size - int(m.group(2))), size - 1
+            if start >= size or start > end:
+                return self._send(416, raw=b"", headers={"Content-Range": f"bytes */{size}"})
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            return self._send(206, raw=data[start:end + 1], headers=headers)
+        return self._send(200, raw=data, headers=headers)
+
+    def _list(self, bucket_name: str, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        prefix = (body.get("prefix") or "").strip("/")
+        limit = int(body.get("limit") or 100)
+        offset = int(body.get("offset") or 0)
+        with self.store.lock:
+            bucket = self.store.objects.get(bucket_name)
+            if bucket is None:
+                raise storage_error(404, "not_found", "Bucket not found")
+            entries: Dict[str, Optional[bytes]] = {}
+            lead = f"{prefix}/" if prefix else ""
+            for path, data in bucket.items():
+                if not path.startswith(lead):
+                    continue
+                head, sep, _tail = path[len(lead):].partition("/")
+                entries.setdefault(head, None if sep else data)
+        out = []
+        for name in sorted(entries):
+            data = entries[name]
+            if data is None:
+                out.append({"name": name, "id": None, "updated_at": None, "created_at": None, "metadata": None})
+            else:
+                out.append({
+                    "name": name,
+                    "id": hashlib.md5(f"{bucket_name}/{lead}{name}".encode()).hexdigest(),
+                    "updated_at": _now_iso(),
+                    "created_at": _now_iso(),
+                    "metadata": {"size": len(data), "mimetype": "application/pdf"},
+                })
+        return out[offset: offset + limit]
+
+
+def _parse_fault(spec: str) -> Tuple[str, Dict[str, str]]:
+    service, _, settings = spec.partition(":")
+    values = dict(item.split("=", 1) for item in settings.split(",") if "=" in item)
+    return service, values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Base latency for every service")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform extra latency for every service")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 503")
+    parser.add_argument("--fault", action="append", default=[], help="Per-service override, e.g. storage:latency_ms=80,error_rate=0.05")
+    parser.add_argument("--modules", type=int, default=4)
+    parser.add_argument("--lessons", type=int, default=10)
+    parser.add_argument("--rows-per-lesson", type=int, default=5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    faults = Faults(args.seed)
+    for service in SERVICES:
+        faults.update(service, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    for spec in args.fault:
+        service, values = _parse_fault(spec)
+        faults.update(service, **values)
+
+    store = Store()
+    store.seed(args)
+
+    handler = type("Handler", (StandinHandler,), {"store": store, "faults": faults, "seed_args": args})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    server.verbose = args.verbose
+    print(
+        f"Supabase stand-in on http://{args.host}:{args.port} "
+        f"({len(store.tables['pdf_assets'])} pdf_assets, {len(store.users)} users)",
+        file=sys.stderr,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Re-hash the objects in the `content_objects` dedup index and check their digests.
+
+Usage:
+    python scripts/verify_content_hashes.py [--remove] [--workers 4]
+
+Reads SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY from the environment,
+streams every indexed object from storage and prints a JSON report of
+missing and mismatched objects with the manifest rows that carry their
+digest. Verified entries get `verified_at` stamped. `--remove` deletes bad
+entries from the index so no further upload is deduplicated against them;
+the rows themselves are left for an admin to fix.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.utils.content_store import verify_content_objects  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--remove", action="store_true", help="Delete missing/mismatched entries from the index")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent object downloads")
+    parser.add_argument("--page-size", type=int, default=1000, help="Index entries per query page")
+    args = parser.parse_args()
+
+    report = verify_content_objects(remove=args.remove, max_workers=args.workers, page_size=args.page_size)
+    print(json.dumps(report, indent=2))
+    return 1 if report["missing"] or report["mismatched"] or report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())